@@ -1,34 +1,110 @@
 # encoding: utf-8
 
 from __future__ import division, print_function, unicode_literals
+import io
 import objc
+import os
+import sys
+import tempfile
+import time
 import traceback
 
-from Foundation import NSArray, NSNotFound
-from AppKit import NSColor, NSFont, NSFontFeatureSettingsAttribute, NSFontFeatureTypeIdentifierKey, NSFontFeatureSelectorIdentifierKey
+from Foundation import NSArray, NSNotificationCenter, NSUndoManagerDidCloseUndoGroupNotification, NSUndoManagerDidUndoChangeNotification, NSUndoManagerDidRedoChangeNotification
+from AppKit import NSColor, NSFont, NSViewFrameDidChangeNotification, NSWindowDidChangeOcclusionStateNotification, NSMultipleValuesMarker, NSNoSelectionMarker, NSObservedKeyPathKey, NSOptionsKey, NSFontFeatureSettingsAttribute, NSFontFeatureTypeIdentifierKey, NSFontFeatureSelectorIdentifierKey
 from GlyphsApp import *
 from GlyphsApp.plugins import *
 
-# - Custom Column Implementation
+# Make the host-independent modules next to this file importable.
+if os.path.dirname(os.path.abspath(__file__)) not in sys.path:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from Foundation import NSSortDescriptor, NSString, NSValueTransformer
-from AppKit import NSTableColumn, NSValueBinding, NSMenuItem, NSValueTransformerBindingOption
+from vgpp import instrumentation
+from vgpp.bulk_edit import BulkEditResult, ChangeGate, PALETTE_LAYER_PROPERTIES, GLYPH_PROPERTIES, METRIC_OF_PROPERTY, apply_vertical_properties, set_layer_property, shared_value
+from vgpp.capabilities import LayerCapabilities
+from vgpp.columns import VerticalMetricsColumns, VERT_ORIGIN
+from vgpp.font_changes import FontChangeCounter
+from vgpp.dependencies import MetricsKeyCycleError, metrics_key_graph_from_font, refresh_metrics_key_graph, sync_vertical_metrics
+from vgpp.glyph_index import GlyphIndexMap
+from vgpp.interchange import InterchangeError, VerticalPropertiesDiff, VerticalPropertiesReader, export_vertical_properties, format_summary as format_interchange_summary
+from vgpp.kerning_groups import VerticalGroupIndex, TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP
+from vgpp.master_matrix import MasterMatrix, format_finding as format_master_matrix_finding
+from vgpp.metrics_keys import TSB, BSB, VERT_WIDTH
+from vgpp.scheduler import CoalescingScheduler
+from vgpp.selection import GlyphCounter, SelectionTracker
+from vgpp.vertical_bounds import LayerOutline, compute_vertical_bounds, format_report as format_vertical_bounds_report
+from vgpp.vkrn import compile_vertical_kerning, format_report, iter_kerning_pairs
 
-class VGPPDoubleToStringTransformer(NSValueTransformer):
+# - Font Changes
 
-    @classmethod
-    def transformedValueClass(cls):
-        return NSString
+# Counted per font from the notifications of its undo manager; see vgpp.font_changes.
+font_change_counter = FontChangeCounter(key=objc.pyobjc_id)
 
-    @classmethod
-    def allowsReverseTransformation(cls):
-        return False
+font_change_observers = {}
+
+class VGPPFontChangeObserver(NSObject):
+
+    notification_names = (NSUndoManagerDidCloseUndoGroupNotification, NSUndoManagerDidUndoChangeNotification, NSUndoManagerDidRedoChangeNotification)
+
+    def initWithFont_(self, font):
+        self = objc.super(VGPPFontChangeObserver, self).init()
+        if self is None: return None
+        self.font = font
+        undo_manager = font.undoManager()
+        if undo_manager:
+            for name in self.notification_names:
+                NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(self, 'undoManagerDidChange:', name, undo_manager)
+            font_change_counter.watch(font)
+        return self
+
+    @objc.python_method
+    def stop_observing(self):
+        NSNotificationCenter.defaultCenter().removeObserver_(self)
+
+    def undoManagerDidChange_(self, notification):
+        try:
+            note_font_change(self.font)
+        except:
+            LogError(traceback.format_exc())
+
+def watch_font_changes(font):
+    key = objc.pyobjc_id(font)
+    if key not in font_change_observers:
+        font_change_observers[key] = VGPPFontChangeObserver.alloc().initWithFont_(font)
+
+def note_font_change(font):
+    font_change_counter.bump(font)
+    font_id = objc.pyobjc_id(font)
+    for key, columns in vertical_metrics_columns.items():
+        if key[0] == font_id:
+            columns.advance()
+    # The cells of the columns changed by the host may have been redrawn before this; draw them once more.
+    if font_id in displayed_vertical_metrics_columns and font.fontView:
+        font.fontView.listViewTableview().setNeedsDisplay_(True)
+
+# The count of its font each cache below was last brought up to date at, by ('name of the cache', font id, ...).
+checked_font_change_counts = {}
+
+def needs_refresh(cache_key, font):
+    return font_change_counter.has_changed(font, checked_font_change_counts.get(cache_key))
 
-    def transformedValue_(self, value):
-        double_value = value.doubleValue()
-        if double_value > -1000000 and double_value < 1000000:
-            return '{0:.0f}'.format(double_value)
-        return ''
+def note_refreshed(cache_key, font):
+    checked_font_change_counts[cache_key] = font_change_counter.count(font)
+
+def note_own_font_change(font, count):
+    # After an edit of the palette, which patches the caches as it goes: the ones that were up to date at `count`
+    # still are, and don't need a pass over the change stamps for it.
+    if count is None:
+        return
+    font_id = objc.pyobjc_id(font)
+    current = font_change_counter.count(font)
+    for key, checked in list(checked_font_change_counts.items()):
+        if key[1] == font_id and checked == count:
+            checked_font_change_counts[key] = current
+
+# - Custom Column Implementation
+
+from Foundation import NSSortDescriptor
+from AppKit import NSTableColumn, NSValueBinding, NSMenuItem, NSValueTransformerBindingOption
 
 def is_table_column_visible(identifier):
     value = Glyphs.defaults["FontViewListColumnVisibe_{0}".format(identifier)]
@@ -36,7 +112,7 @@ def is_table_column_visible(identifier):
         return True
     return False
 
-def insert_new_column(font, title, key_path, identifier=None, base_identifier='Name', compare_selector=None, value_transformer_class=None, insert_before_identifier=None, insert_after_identifier=None):
+def insert_new_column(font, title, key_path, identifier=None, base_identifier='Name', compare_selector=None, value_transformer_class=None, insert_before_identifier=None, insert_after_identifier=None, sort_key_path=None):
 
     identifier = identifier or title
     controller = font.fontView
@@ -55,7 +131,7 @@ def insert_new_column(font, title, key_path, identifier=None, base_identifier='N
             new_column.setMaxWidth_(base_column.maxWidth())
             compare_selector = compare_selector or (base_column.sortDescriptorPrototype() and base_column.sortDescriptorPrototype().selector())
         compare_selector = compare_selector or 'compare:'
-        new_column.setSortDescriptorPrototype_(NSSortDescriptor.sortDescriptorWithKey_ascending_selector_(key_path, True, compare_selector))
+        new_column.setSortDescriptorPrototype_(NSSortDescriptor.sortDescriptorWithKey_ascending_selector_(sort_key_path or key_path, True, compare_selector))
         binding_option = None
         if value_transformer_class:
             binding_option = {NSValueTransformerBindingOption: value_transformer_class.alloc().init()}
@@ -95,31 +171,394 @@ def insert_new_column(font, title, key_path, identifier=None, base_identifier='N
                         new_index = i + 1
             menu.insertItem_atIndex_(menu_item, new_index)
 
+# Values and display strings come from a per-master columnar store rather than walking glyph -> layer0 -> property.
+# A cell asks the host for nothing: its glyph leads straight to the store of the master shown, and the rows are only
+# checked against the change stamps of their glyphs after note_font_change().
+
+vertical_metrics_columns = {}
+
+# The store of the master shown in the font view, by font, and by every glyph of the font shown so far.
+displayed_vertical_metrics_columns = {}
+displayed_vertical_metrics_columns_by_glyph = {}
+
+def read_vertical_metrics_row(glyph, master_id):
+    layer = glyph.layers[master_id]
+    if layer is None:
+        return (None, None, None, None, glyph.topKerningGroup, glyph.bottomKerningGroup)
+    methods = layer.pyobjc_instanceMethods
+    return (methods.vertOrigin(), methods.vertWidth(), methods.TSB(), methods.BSB(), glyph.topKerningGroup, glyph.bottomKerningGroup)
+
+def get_vertical_metrics_columns(font, master_id):
+    key = (objc.pyobjc_id(font), master_id)
+    columns = vertical_metrics_columns.get(key)
+    if columns is None:
+        columns = vertical_metrics_columns[key] = VerticalMetricsColumns(
+            lambda glyph: read_vertical_metrics_row(glyph, master_id),
+            change_stamp=lambda glyph: glyph.pyobjc_instanceMethods.lastChange(),
+            key=objc.pyobjc_id
+        )
+    return columns
+
+def note_vertical_metrics_change(layer):
+    glyph = layer.parent
+    font = glyph.parent if glyph is not None else None
+    if font is not None:
+        columns = vertical_metrics_columns.get((objc.pyobjc_id(font), layer.associatedMasterId))
+        if columns is not None:
+            columns.invalidate(glyph)
+
+def show_vertical_metrics_of_selected_master(font):
+    # Called on interface updates, which come with switching masters, rather than asking the font in every cell.
+    # Returns the store shown.
+    font_id = objc.pyobjc_id(font)
+    master = font.selectedFontMaster
+    if master is None:
+        return None
+    columns = get_vertical_metrics_columns(font, master.id)
+    shown = displayed_vertical_metrics_columns.get(font_id)
+    if shown is not columns:
+        displayed_vertical_metrics_columns[font_id] = columns
+        if shown is not None:
+            # The cells find their way to the new store one by one as they are drawn.
+            for glyph_key in shown.glyph_keys():
+                displayed_vertical_metrics_columns_by_glyph.pop(glyph_key, None)
+            if font.fontView:
+                font.fontView.listViewTableview().setNeedsDisplay_(True)
+    return columns
+
+def vertical_metrics_columns_for_glyph(glyph):
+    # Only a glyph shown for the first time costs a trip to its font.
+    glyph_key = objc.pyobjc_id(glyph)
+    columns = displayed_vertical_metrics_columns_by_glyph.get(glyph_key)
+    if columns is None:
+        font = glyph.parent
+        if font is None:
+            return None
+        columns = displayed_vertical_metrics_columns.get(objc.pyobjc_id(font))
+        if columns is None:
+            columns = show_vertical_metrics_of_selected_master(font)
+            if columns is None:
+                return None
+        displayed_vertical_metrics_columns_by_glyph[glyph_key] = columns
+    return columns
+
+class GSGlyph(objc.Category(GSGlyph)):
+
+    # Key paths for the list columns. Numbers are for sorting, strings for display. The key paths they depend on
+    # make the list redraw a row when the layer of the master shown changes, or when another master is shown.
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppVertOrigin(cls):
+        return set(['layer0.vertOrigin'])
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppTSB(cls):
+        return set(['layer0.TSB', 'layer0.vertOrigin'])
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppBSB(cls):
+        return set(['layer0.BSB', 'layer0.vertOrigin', 'layer0.vertWidth'])
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppVertOriginString(cls):
+        return set(['vgppVertOrigin'])
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppTSBString(cls):
+        return set(['vgppTSB'])
+
+    @classmethod
+    def keyPathsForValuesAffectingVgppBSBString(cls):
+        return set(['vgppBSB'])
+
+    def vgppVertOrigin(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.value(self, VERT_ORIGIN) if columns is not None else None
+
+    def vgppVertOriginString(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.string(self, VERT_ORIGIN) if columns is not None else ''
+
+    def vgppTSB(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.value(self, TSB) if columns is not None else None
+
+    def vgppTSBString(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.string(self, TSB) if columns is not None else ''
+
+    def vgppBSB(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.value(self, BSB) if columns is not None else None
+
+    def vgppBSBString(self):
+        columns = vertical_metrics_columns_for_glyph(self)
+        return columns.string(self, BSB) if columns is not None else ''
+
 def customize_table_view_in_font(font):
-    insert_new_column(font, 'Bottom Group',    'bottomKerningGroup', base_identifier='Right Group',    insert_after_identifier='Right Group')
-    insert_new_column(font, 'Top Group',       'topKerningGroup',    base_identifier='Left Group',     insert_after_identifier='Right Group')
-    insert_new_column(font, 'Vertical Origin', 'layer0.vertOrigin',  base_identifier='VerticalWidth',  insert_before_identifier='VerticalWidth', value_transformer_class=VGPPDoubleToStringTransformer)
+    # The native 'VerticalWidth' column already shows the vertical width.
+    insert_new_column(font, 'Bottom Group',    'bottomKerningGroup',   base_identifier='Right Group',    insert_after_identifier='Right Group')
+    insert_new_column(font, 'Top Group',       'topKerningGroup',      base_identifier='Left Group',     insert_after_identifier='Right Group')
+    insert_new_column(font, 'Vertical Origin', 'vgppVertOriginString', base_identifier='VerticalWidth',  insert_before_identifier='VerticalWidth', sort_key_path='vgppVertOrigin')
+    insert_new_column(font, 'BSB',             'vgppBSBString',        base_identifier='VerticalWidth',  insert_after_identifier='VerticalWidth',  sort_key_path='vgppBSB')
+    insert_new_column(font, 'TSB',             'vgppTSBString',        base_identifier='VerticalWidth',  insert_after_identifier='VerticalWidth',  sort_key_path='vgppTSB')
+
+# Once per font, when its document opens or comes to the front, instead of from the refresh path.
+
+customized_fonts = set()
+
+def customize_table_view_in_font_once(font):
+    key = objc.pyobjc_id(font)
+    if key in customized_fonts or not font.fontView:
+        return False
+    customize_table_view_in_font(font)
+    customized_fonts.add(key)
+    watch_font_changes(font)
+    return True
+
+# - Metrics Key Dependencies
+
+metrics_key_graphs = {}
+
+def get_metrics_key_graph(font, master_id):
+    # Built once per font and master and patched by the edits of the palette. Once the font has changed otherwise
+    # (the metrics fields of Glyphs, scripts, undo), the next call re-reads the glyphs whose lastChange moved.
+    key = (objc.pyobjc_id(font), master_id)
+    graph = metrics_key_graphs.get(key)
+    change_stamp = lambda glyph: glyph.pyobjc_instanceMethods.lastChange()
+    if graph is None:
+        graph = metrics_key_graphs[key] = metrics_key_graph_from_font(font, master_id, change_stamp)
+    elif needs_refresh(('metrics_key_graph',) + key, font):
+        refresh_metrics_key_graph(graph, font, master_id, change_stamp)
+    else:
+        return graph
+    note_refreshed(('metrics_key_graph',) + key, font)
+    return graph
+
+def note_metrics_key_change(layer, metric, key):
+    glyph = layer.parent
+    font = glyph.parent if glyph is not None else None
+    if font is not None:
+        graph = metrics_key_graphs.get((objc.pyobjc_id(font), layer.associatedMasterId))
+        if graph is not None:
+            graph.set_key(glyph.name, metric, key)
+
+# - Glyph Index
+
+glyph_index_maps = {}
+
+def get_glyph_index_map(font):
+    key = objc.pyobjc_id(font)
+    index_map = glyph_index_maps.get(key)
+    if index_map is None:
+        index_map = glyph_index_maps[key] = GlyphIndexMap(font.glyphs, font.glyphAtIndex_, key=objc.pyobjc_id)
+    return index_map
+
+# - Vertical Kerning Groups
+
+vertical_group_indexes = {}
+
+def get_vertical_group_index(font):
+    # Built once per font and patched by the edits of the palette. Once the font has changed otherwise (the
+    # Top/Bottom Group columns, Glyph Info, scripts), the next call re-reads the glyphs whose lastChange moved.
+    key = objc.pyobjc_id(font)
+    index = vertical_group_indexes.get(key)
+    change_stamp = lambda glyph: glyph.pyobjc_instanceMethods.lastChange()
+    if index is None:
+        index = vertical_group_indexes[key] = VerticalGroupIndex.from_glyphs(font.glyphs, key=objc.pyobjc_id, change_stamp=change_stamp)
+    elif needs_refresh(('vertical_group_index', key), font):
+        index.refresh(font.glyphs, change_stamp)
+    else:
+        return index
+    note_refreshed(('vertical_group_index', key), font)
+    return index
+
+def select_glyphs_in_vertical_group(font, side, group):
+    members = get_glyph_index_map(font).sorted(get_vertical_group_index(font).members(side, group))
+    font.selection = members
+    return members
+
+def compile_vertical_kerning_of_font(font, master_id):
+    def glyph_name_for(key):
+        glyph = font.glyphs[key] or font.glyphForId_(key)
+        return glyph.name if glyph else None
+    kerning = getattr(font, 'kerningVertical', None) or {}
+    return compile_vertical_kerning(
+        ((glyph.name, glyph.topKerningGroup, glyph.bottomKerningGroup) for glyph in font.glyphs),
+        iter_kerning_pairs(kerning.get(master_id, {}), glyph_name_for)
+    )
+
+# - Vertical Bounds
+
+def _stored_value(value):
+    return value if -1000000 < value < 1000000 else None
+
+def layer_outlines_of_font(font, master):
+    # The host knows the exact bounds already, components included, so a diagonal is all the engine needs.
+    for glyph in font.glyphs:
+        layer = glyph.layers[master.id]
+        if layer is None:
+            continue
+        bounds = layer.bounds
+        contours = []
+        if bounds.size.width > 0 or bounds.size.height > 0:
+            contours.append([
+                (bounds.origin.x, bounds.origin.y, 'l'),
+                (bounds.origin.x + bounds.size.width, bounds.origin.y + bounds.size.height, 'l'),
+            ])
+        methods = layer.pyobjc_instanceMethods
+        yield LayerOutline(glyph.name, contours, (), master.ascender, master.descender, _stored_value(methods.vertOrigin()), _stored_value(methods.vertWidth()))
+
+# - Master Matrix
+
+master_matrices = {}
+
+def weight_of_master(master):
+    # The first axis is the weight axis; Glyphs 2 has it as weightValue.
+    axes = getattr(master, 'axes', None)
+    if axes:
+        return axes[0]
+    return getattr(master, 'weightValue', 0)
+
+def get_master_matrix(font):
+    # Built once per font; later refreshes only re-read the glyphs whose lastChange moved.
+    key = objc.pyobjc_id(font)
+    matrix = master_matrices.get(key)
+    if matrix is None or matrix.master_ids != [master.id for master in font.masters]:
+        matrix = master_matrices[key] = MasterMatrix(
+            [(master.id, weight_of_master(master)) for master in font.masters],
+            change_stamp=lambda glyph: glyph.pyobjc_instanceMethods.lastChange()
+        )
+    matrix.refresh(font.glyphs)
+    return matrix
+
+def note_master_matrix_change(glyph):
+    font = glyph.parent
+    matrix = master_matrices.get(objc.pyobjc_id(font)) if font is not None else None
+    if matrix is not None:
+        matrix.invalidate(glyph.name)
+
+# - Closed Fonts
+
+def font_of_document_notification(notification):
+    # The document callbacks come with the GSDocument; tolerate the font itself as well.
+    obj = notification.object()
+    if isinstance(obj, GSFont):
+        return obj
+    return getattr(obj, 'font', None)
+
+def forget_font(font):
+    # The caches are keyed by pyobjc_id, which the next font opened may well reuse.
+    font_id = objc.pyobjc_id(font)
+    customized_fonts.discard(font_id)
+    observer = font_change_observers.pop(font_id, None)
+    if observer is not None:
+        observer.stop_observing()
+    font_change_counter.forget(font)
+    for key in [key for key in checked_font_change_counts if key[1] == font_id]:
+        del checked_font_change_counts[key]
+    displayed_vertical_metrics_columns.pop(font_id, None)
+    for key in [key for key in vertical_metrics_columns if key[0] == font_id]:
+        for glyph_key in vertical_metrics_columns[key].glyph_keys():
+            displayed_vertical_metrics_columns_by_glyph.pop(glyph_key, None)
+    for cache in (glyph_index_maps, vertical_group_indexes, master_matrices):
+        cache.pop(font_id, None)
+    for cache in (vertical_metrics_columns, metrics_key_graphs):
+        for key in [key for key in cache if key[0] == font_id]:
+            del cache[key]
+
+# - Bulk Edit
+
+# Posted once per bulk edit with the font as the object, even if the edit failed halfway, since the
+# KVO notifications it held back are replayed by the observers of this one.
+VERTICAL_PROPERTIES_DID_CHANGE = 'VGPPVerticalPropertiesDidChangeNotification'
+
+# Holds back the KVO feedback of the proxies while a bulk edit is running.
+layer_change_gate = ChangeGate(key=objc.pyobjc_id)
+
+def apply_vertical_properties_to_layers(font, layers, values, action_name=None):
+    # Assigns the values to every layer (or its glyph for the kerning groups) as a single undoable change.
+    # See vgpp.bulk_edit for the property names.
+    return apply_vertical_property_edits(font, [(layers, values)], action_name)
+
+def apply_vertical_property_edits(font, edits, action_name=None):
+    # Same for an iterable of (layers, values), each with values of its own, e.g. a VerticalPropertiesDiff.
+    count = font_change_counter.count(font)
+    undo_manager = font.undoManager()
+    if undo_manager:
+        undo_manager.beginUndoGrouping()
+    font.disableUpdateInterface()
+    layer_change_gate.close()
+    result = BulkEditResult()
+    index = vertical_group_indexes.get(objc.pyobjc_id(font))
+    try:
+        with instrumentation.span('apply_vertical_properties_to_layers'):
+            for layers, values in edits:
+                edit_result = apply_vertical_properties(layers, values, key=objc.pyobjc_id)
+                for layer in edit_result.layers:
+                    note_vertical_metrics_change(layer)
+                    if layer.parent is not None:
+                        note_master_matrix_change(layer.parent)
+                    for name, metric in METRIC_OF_PROPERTY.items():
+                        if name in values:
+                            note_metrics_key_change(layer, metric, values[name])
+                if index is not None:
+                    for glyph in edit_result.glyphs:
+                        index.refresh_glyph(glyph)
+                result.extend(edit_result)
+    finally:
+        held = layer_change_gate.open()
+        font.enableUpdateInterface()
+        if undo_manager:
+            undo_manager.setActionName_(action_name or Glyphs.localize({'en': 'Edit Vertical Properties'}))
+            undo_manager.endUndoGrouping()
+        note_own_font_change(font, count)
+        # A nested edit leaves the announcement to the outermost one.
+        if held is not None:
+            _, held_key_paths = held
+            NSNotificationCenter.defaultCenter().postNotificationName_object_userInfo_(VERTICAL_PROPERTIES_DID_CHANGE, font, {
+                'properties': sorted(set(result.changes) | held_key_paths),
+                'layers':     len(result.layers),
+                'glyphs':     len(result.glyphs),
+            })
+    return result
+
+# - Vertical Properties Interchange
+
+def export_vertical_properties_of_font(font, path):
+    # Returns the number of glyphs written. See vgpp.interchange for the format.
+    with io.open(path, 'w', encoding='utf-8') as stream:
+        return export_vertical_properties(stream, font)
+
+def import_vertical_properties_to_font(font, path):
+    # Applies only what differs from the font, as a single undoable change. Returns the diff and the edit result.
+    # The whole file is read and checked first; a broken block raises InterchangeError with the font untouched.
+    # The changes are then applied as the file is read again, so only one block is held at a time.
+    with io.open(path, encoding='utf-8') as stream:
+        VerticalPropertiesReader(stream).check()
+        stream.seek(0)
+        diff = VerticalPropertiesDiff(VerticalPropertiesReader(stream), font)
+        result = apply_vertical_property_edits(font, diff, Glyphs.localize({'en': 'Import Vertical Properties'}))
+    return diff, result
 
 # - Palette Implementation
 
 def get_selected_layers_from_font(font):
-    # Obtain currently selected layers in most situations, and wrap them with the proxy object.
+    # Obtain currently selected layers in most situations. Wrapping them with the proxy object is up to SelectionTracker.
     if font.currentTab:
         if len(font.selectedLayers) > 0:
-            return VGPPLayer.layersFromArray_(font.selectedLayers)
+            return font.selectedLayers
     if font.selection:
         master = font.selectedFontMaster
-        glyphs = sorted(set((e for e in font.selection if isinstance(e, GSGlyph))), key=lambda g: font.indexOfGlyph_(g))
-        return VGPPLayer.layersFromArray_((glyph.layers[master.id] for glyph in glyphs))
+        glyphs = get_glyph_index_map(font).sorted(set((e for e in font.selection if isinstance(e, GSGlyph))))
+        return [glyph.layers[master.id] for glyph in glyphs]
     return tuple()
 
 def get_glyphs_from_layers(layers):
-    return tuple((t[0] for t in sorted(set(((layer.parent, layer.parent.parent.indexOfGlyph_(layer.parent)) for layer in layers)), key=lambda t: t[1])))
-
-def is_placeholder_for_metrics_key_tag_in_layer(layer, tag):
-    # FIXME: - [GSLayer vertWidthMetricsKeyState] doesn't seems to set the GSMetricsKeysPlaceholder bit.
-    key = layer.plainMetricsKeyUI_(tag)
-    return layer.metricsValue_atHeight_(tag, 0x7fffffffffffffff) < 0.0;
+    glyphs = set((layer.parent for layer in layers))
+    if not glyphs:
+        return tuple()
+    return tuple(get_glyph_index_map(next(iter(glyphs)).parent).sorted(glyphs))
 
 class VGPPLayer(NSObject):
 
@@ -196,7 +635,18 @@ class VGPPLayer(NSObject):
             'vertWidthMetricsKeyUI': 'vertWidthMetricsKeyUI'
         }.get(key_path)
         if translated_key_path:
-            self.didChangeValueForKey_(translated_key_path)
+            with instrumentation.span('VGPPLayer.observeValueForKeyPath'):
+                note_vertical_metrics_change(object)
+                # The key may have been changed outside the palette; keep the dependency graph in step.
+                if key_path == 'topMetricsKeyUI':
+                    note_metrics_key_change(object, TSB, object.pyobjc_instanceMethods.topMetricsKeyUI())
+                elif key_path == 'bottomMetricsKeyUI':
+                    note_metrics_key_change(object, BSB, object.pyobjc_instanceMethods.bottomMetricsKeyUI())
+                elif key_path == 'vertWidthMetricsKeyUI' and self.capabilities:
+                    note_metrics_key_change(object, VERT_WIDTH, self.capabilities.vert_width_metrics_key_ui(object))
+                if layer_change_gate.hold(self, translated_key_path):
+                    return
+                self.didChangeValueForKey_(translated_key_path)
 
     @layer.setter
     def layer(self, value):
@@ -205,72 +655,60 @@ class VGPPLayer(NSObject):
         if self._layer:
             for key_path in key_paths:
                 self._layer.removeObserver_forKeyPath_(self, key_path)
+            instrumentation.count(instrumentation.OBSERVER_REMOVALS, len(key_paths))
         self._layer = value
+        # Selectors available differ between Glyphs 2 and 3; see vgpp.capabilities.
+        self.capabilities = LayerCapabilities.for_layer(value) if value else None
         if value:
             for key_path in key_paths:
                 self._layer.addObserver_forKeyPath_options_context_(self, key_path, 0, None)
+            instrumentation.count(instrumentation.OBSERVER_REGISTRATIONS, len(key_paths))
 
     @topMetricsKeyUI.getter
     def topMetricsKeyUI(self):
-        return self.layer.pyobjc_instanceMethods.topMetricsKeyUI()
+        with instrumentation.span('VGPPLayer.topMetricsKeyUI'):
+            return self.layer.pyobjc_instanceMethods.topMetricsKeyUI()
 
     @bottomMetricsKeyUI.getter
     def bottomMetricsKeyUI(self):
-        return self.layer.pyobjc_instanceMethods.bottomMetricsKeyUI()
+        with instrumentation.span('VGPPLayer.bottomMetricsKeyUI'):
+            return self.layer.pyobjc_instanceMethods.bottomMetricsKeyUI()
 
     @vertOriginUI.getter
     def vertOriginUI(self):
-        is_placeholder = False
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertOriginUIisPlaceholder:'):
-            _, is_placeholder = self.layer.pyobjc_instanceMethods.vertOriginUIisPlaceholder_(None)
-        if is_placeholder: return None
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertOriginKeyUI'):
-            return self.layer.pyobjc_instanceMethods.vertOriginKeyUI() if -1000000 < self.layer.pyobjc_instanceMethods.vertOrigin() < 1000000 else None
-        return "{0:.0f}".format(self.layer.pyobjc_instanceMethods.vertOrigin()) if -1000000 < self.layer.pyobjc_instanceMethods.vertOrigin() < 1000000 else None
+        with instrumentation.span('VGPPLayer.vertOriginUI'):
+            return self.capabilities.vert_origin_ui(self.layer)
 
     @vertWidthMetricsKeyUI.getter
     def vertWidthMetricsKeyUI(self):
-        # Return nil to prefer the placeholder string set in XIB for simplicity.
-        is_placeholder = False
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyState'):
-            is_placeholder = self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyState() & (1 << 2)
-            if not is_placeholder:
-                is_placeholder = is_placeholder_for_metrics_key_tag_in_layer(self.layer, 0x4)
-        elif self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyUIisPlaceholder:'):
-            _, is_placeholder = self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyUIisPlaceholder_(None)
-        return self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyUI() if not is_placeholder else None
+        with instrumentation.span('VGPPLayer.vertWidthMetricsKeyUI'):
+            # Return nil to prefer the placeholder string set in XIB for simplicity.
+            return self.capabilities.vert_width_metrics_key_ui(self.layer)
+
+    # Apart from the metrics key, resetting to nil resets the value behind it as well; see vgpp.bulk_edit.
 
     @topMetricsKeyUI.setter
     def topMetricsKeyUI(self, value):
-        self.layer.pyobjc_instanceMethods.setTopMetricsKeyUI_(value)
+        with instrumentation.span('VGPPLayer.set topMetricsKeyUI'):
+            set_layer_property(self.layer, self.capabilities, 'topMetricsKeyUI', value)
+            note_metrics_key_change(self.layer, TSB, value)
 
     @bottomMetricsKeyUI.setter
     def bottomMetricsKeyUI(self, value):
-        self.layer.pyobjc_instanceMethods.setBottomMetricsKeyUI_(value)
+        with instrumentation.span('VGPPLayer.set bottomMetricsKeyUI'):
+            set_layer_property(self.layer, self.capabilities, 'bottomMetricsKeyUI', value)
+            note_metrics_key_change(self.layer, BSB, value)
 
     @vertOriginUI.setter
     def vertOriginUI(self, value):
-        if value is not None:
-            if self.layer.pyobjc_instanceMethods.respondsToSelector_('setVertOriginKeyUI:'):
-                self.layer.pyobjc_instanceMethods.setVertOriginKeyUI_(value)
-            elif self.layer.pyobjc_instanceMethods.respondsToSelector_('setVertOriginUI:'):
-                self.layer.pyobjc_instanceMethods.setVertOriginUI_(value)
-        else:
-            # Apart from the metrics key, make sure to reset to the default value as well.
-            if self.layer.pyobjc_instanceMethods.respondsToSelector_('setVertOriginKeyUI:'):
-                self.layer.pyobjc_instanceMethods.setVertOriginKeyUI_('')
-            elif self.layer.pyobjc_instanceMethods.respondsToSelector_('setVertOriginUI:'):
-                self.layer.pyobjc_instanceMethods.setVertOriginUI_('')
-            self.layer.pyobjc_instanceMethods.setVertOrigin_(NSNotFound)
+        with instrumentation.span('VGPPLayer.set vertOriginUI'):
+            set_layer_property(self.layer, self.capabilities, 'vertOriginUI', value)
 
     @vertWidthMetricsKeyUI.setter
     def vertWidthMetricsKeyUI(self, value):
-        if value is not None:
-            self.layer.pyobjc_instanceMethods.setVertWidthMetricsKeyUI_(value)
-        else:
-            # Apart from the metrics key, make sure to reset to the default value as well.
-            self.layer.pyobjc_instanceMethods.setVertWidthMetricsKeyUI_('')
-            self.layer.pyobjc_instanceMethods.setVertWidth_(NSNotFound)
+        with instrumentation.span('VGPPLayer.set vertWidthMetricsKeyUI'):
+            set_layer_property(self.layer, self.capabilities, 'vertWidthMetricsKeyUI', value)
+            note_metrics_key_change(self.layer, VERT_WIDTH, value)
 
     @topMetricsKeyUI.validate
     def topMetricsKeyUI(self, value, error):
@@ -290,53 +728,40 @@ class VGPPLayer(NSObject):
 
     @vertWidthMetricsKeyUI.validate
     def vertWidthMetricsKeyUI(self, value, error):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyUI'):
+        if self.capabilities.has_vert_width_metrics_key_ui:
             return self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyUI()
         return self.layer.validateVertWidthMetricsKey_error_(value, None)
 
     @topMetricsKeyIsInSync.getter
     def topMetricsKeyIsInSync(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('leftMetricsKeyState'):
-            return not (self.layer.pyobjc_instanceMethods.leftMetricsKeyState() & (1 << 0))
-        elif self.layer.pyobjc_instanceMethods.topMetricsKey():
-            duplicated = self.layer.copy()
-            duplicated.syncTopMetrics()
-            return self.layer.pyobjc_instanceMethods.TSB() == duplicated.pyobjc_instanceMethods.TSB()
-        return True
+        with instrumentation.span('VGPPLayer.topMetricsKeyIsInSync'):
+            return self.capabilities.top_metrics_key_is_in_sync(self.layer)
 
     @bottomMetricsKeyIsInSync.getter
     def bottomMetricsKeyIsInSync(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('bottomMetricsKeyState'):
-            return not (self.layer.pyobjc_instanceMethods.bottomMetricsKeyState() & (1 << 0))
-        elif self.layer.pyobjc_instanceMethods.bottomMetricsKey():
-            duplicated = self.layer.copy()
-            duplicated.syncBottomMetrics()
-            return self.layer.pyobjc_instanceMethods.BSB() == duplicated.pyobjc_instanceMethods.BSB()
-        return True
+        with instrumentation.span('VGPPLayer.bottomMetricsKeyIsInSync'):
+            return self.capabilities.bottom_metrics_key_is_in_sync(self.layer)
 
     @vertWidthMetricsKeyIsInSync.getter
     def vertWidthMetricsKeyIsInSync(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyState'):
-            return not (self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyState() & (1 << 0))
-        elif self.layer.pyobjc_instanceMethods.respondsToSelector_('syncVertWidthMetrics'):
-            duplicated = self.layer.copy()
-            duplicated.syncVertWidthMetrics()
-            return self.layer.pyobjc_instanceMethods.vertWidth() == duplicated.pyobjc_instanceMethods.vertWidth()
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyIsInSync'):
-            return self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyIsInSync()
-        return True
+        with instrumentation.span('VGPPLayer.vertWidthMetricsKeyIsInSync'):
+            return self.capabilities.vert_width_metrics_key_is_in_sync(self.layer)
 
     @topMetricsKeyColor.getter
     def topMetricsKeyColor(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('colorForMetricsState:') and self.layer.pyobjc_instanceMethods.respondsToSelector_('topMetricsKeyState'):
-            return self.layer.pyobjc_instanceMethods.colorForMetricsState_(self.layer.pyobjc_instanceMethods.topMetricsKeyState())
-        return NSColor.controlTextColor() if self.topMetricsKeyIsInSync else NSColor.systemRedColor()
+        with instrumentation.span('VGPPLayer.topMetricsKeyColor'):
+            color_for_state = self.capabilities.top_metrics_key_color
+            if color_for_state:
+                return color_for_state(self.layer)
+            return NSColor.controlTextColor() if self.topMetricsKeyIsInSync else NSColor.systemRedColor()
 
     @bottomMetricsKeyColor.getter
     def bottomMetricsKeyColor(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('colorForMetricsState:') and self.layer.pyobjc_instanceMethods.respondsToSelector_('bottomMetricsKeyState'):
-            return self.layer.pyobjc_instanceMethods.colorForMetricsState_(self.layer.pyobjc_instanceMethods.bottomMetricsKeyState())
-        return NSColor.controlTextColor() if self.bottomMetricsKeyIsInSync else NSColor.systemRedColor()
+        with instrumentation.span('VGPPLayer.bottomMetricsKeyColor'):
+            color_for_state = self.capabilities.bottom_metrics_key_color
+            if color_for_state:
+                return color_for_state(self.layer)
+            return NSColor.controlTextColor() if self.bottomMetricsKeyIsInSync else NSColor.systemRedColor()
 
     @vertOriginColor.getter
     def vertOriginColor(self):
@@ -344,9 +769,107 @@ class VGPPLayer(NSObject):
 
     @vertWidthMetricsKeyColor.getter
     def vertWidthMetricsKeyColor(self):
-        if self.layer.pyobjc_instanceMethods.respondsToSelector_('colorForMetricsState:') and self.layer.pyobjc_instanceMethods.respondsToSelector_('vertWidthMetricsKeyState'):
-            return self.layer.pyobjc_instanceMethods.colorForMetricsState_(self.layer.pyobjc_instanceMethods.vertWidthMetricsKeyState())
-        return NSColor.controlTextColor() if self.vertWidthMetricsKeyIsInSync else NSColor.systemRedColor()
+        with instrumentation.span('VGPPLayer.vertWidthMetricsKeyColor'):
+            color_for_state = self.capabilities.vert_width_metrics_key_color
+            if color_for_state:
+                return color_for_state(self.layer)
+            return NSColor.controlTextColor() if self.vertWidthMetricsKeyIsInSync else NSColor.systemRedColor()
+
+def make_layer_proxy(layer):
+    return VGPPLayer.alloc().initWithLayer_(layer)
+
+def release_layer_proxy(proxy):
+    # Stop observing as soon as the layer leaves the selection rather than waiting for the deallocation.
+    # Only once the proxy is out of selectedLayers: its getters need the layer for as long as a binding can ask.
+    proxy.layer = None
+
+class VGPPSelectionEditor(NSObject):
+
+    # Stands in for - [NSArrayController selection] in the text field bindings. Reading goes through the proxies
+    # as before, but an edit is applied to the whole selection at once with apply_vertical_properties_to_layers()
+    # instead of being pushed into every proxy one by one.
+
+    color_key_paths = ('topMetricsKeyColor', 'bottomMetricsKeyColor', 'vertOriginColor', 'vertWidthMetricsKeyColor')
+
+    def initWithPalette_(self, palette):
+        self = objc.super(VGPPSelectionEditor, self).init()
+        if self is None: return None
+        self.palette = palette
+        # Closed while the selection is reshuffled, so that the fields read the selection once it has settled.
+        self.gate = ChangeGate(key=objc.pyobjc_id)
+        # Keep announcing the changes made outside of the palette, which the array controllers still observe.
+        self.observed = []
+        for controller, key_paths in (
+            (palette.selectedLayersArrayController, PALETTE_LAYER_PROPERTIES + self.color_key_paths),
+            (palette.selectedGlyphsArrayController, GLYPH_PROPERTIES),
+        ):
+            for key_path in key_paths:
+                controller.addObserver_forKeyPath_options_context_(self, 'selection.' + key_path, 0, None)
+                self.observed.append((controller, 'selection.' + key_path))
+        instrumentation.count(instrumentation.OBSERVER_REGISTRATIONS, len(self.observed))
+        return self
+
+    @objc.python_method
+    def stop_observing(self):
+        for controller, key_path in self.observed:
+            controller.removeObserver_forKeyPath_(self, key_path)
+        instrumentation.count(instrumentation.OBSERVER_REMOVALS, len(self.observed))
+        self.observed = []
+
+    @objc.python_method
+    def objects_for_key(self, key):
+        if key in GLYPH_PROPERTIES:
+            return self.palette.selectedGlyphs or ()
+        return self.palette.selectionTracker.proxies
+
+    def valueForUndefinedKey_(self, key):
+        return shared_value((obj.valueForKey_(key) for obj in self.objects_for_key(key)), NSNoSelectionMarker, NSMultipleValuesMarker)
+
+    def setValue_forUndefinedKey_(self, value, key):
+        try:
+            proxies = self.palette.selectionTracker.proxies
+            if key not in PALETTE_LAYER_PROPERTIES + GLYPH_PROPERTIES or not proxies:
+                return
+            font = proxies[0].layer.parent.parent
+            apply_vertical_properties_to_layers(font, [proxy.layer for proxy in proxies], {key: value})
+        except:
+            LogError(traceback.format_exc())
+
+    def observeValueForKeyPath_ofObject_change_context_(self, key_path, object, change, context):
+        with instrumentation.span('VGPPSelectionEditor.observeValueForKeyPath'):
+            key = key_path[len('selection.'):]
+            if not self.gate.hold(self, key):
+                self.announce([key])
+
+    @objc.python_method
+    def hold_announcements(self):
+        self.gate.close()
+
+    @objc.python_method
+    def release_announcements(self):
+        held = self.gate.open()
+        if held is not None and held[1]:
+            self.announce(sorted(held[1]))
+
+    @objc.python_method
+    def announce(self, keys=None):
+        for key in keys or (PALETTE_LAYER_PROPERTIES + GLYPH_PROPERTIES + self.color_key_paths):
+            self.willChangeValueForKey_(key)
+            self.didChangeValueForKey_(key)
+
+    @objc.python_method
+    def rebind(self, text_field):
+        # Move the bindings made to the selection of an array controller in XIB over to the editor.
+        for binding in ('value', 'textColor'):
+            info = text_field.infoForBinding_(binding)
+            if not info or not info[NSObservedKeyPathKey].startswith('selection.'):
+                continue
+            options = info[NSOptionsKey]
+            text_field.unbind_(binding)
+            text_field.bind_toObject_withKeyPath_options_(binding, self, info[NSObservedKeyPathKey][len('selection.'):], options)
+
+# Keyed by the name and size of the font they derive from; the text fields share them.
+slashed_zero_nsfonts = {}
 
 class VerticalGlyphPropertiesPalette(PalettePlugin):
 
@@ -369,19 +892,22 @@ class VerticalGlyphPropertiesPalette(PalettePlugin):
     selectedGlyphs = objc.object_property()
     selectedLayers = objc.object_property()
 
-    hasAddedCustomColumns = objc.object_property(typestr=objc._C_BOOL)
-
     @objc.python_method
     @staticmethod
     def make_slashed_zero_nsfont(nsfont):
         # Activate the same AAT feature as Glyphs to get the slashed zero effect.
         kStylisticAlternativesType = 35
         kStylisticAltSixOnSelector = 12
-        descriptor = nsfont.fontDescriptor().fontDescriptorByAddingAttributes_({NSFontFeatureSettingsAttribute: [{
-            NSFontFeatureTypeIdentifierKey:     kStylisticAlternativesType,
-            NSFontFeatureSelectorIdentifierKey: kStylisticAltSixOnSelector
-        }]})
-        return NSFont.fontWithDescriptor_size_(descriptor, nsfont.pointSize())
+        # The text fields share a few fonts at most, so derive each one once.
+        key = (nsfont.fontName(), nsfont.pointSize())
+        slashed_zero_nsfont = slashed_zero_nsfonts.get(key)
+        if slashed_zero_nsfont is None:
+            descriptor = nsfont.fontDescriptor().fontDescriptorByAddingAttributes_({NSFontFeatureSettingsAttribute: [{
+                NSFontFeatureTypeIdentifierKey:     kStylisticAlternativesType,
+                NSFontFeatureSelectorIdentifierKey: kStylisticAltSixOnSelector
+            }]})
+            slashed_zero_nsfont = slashed_zero_nsfonts[key] = NSFont.fontWithDescriptor_size_(descriptor, nsfont.pointSize())
+        return slashed_zero_nsfont
 
     @objc.python_method
     def settings(self):
@@ -390,8 +916,18 @@ class VerticalGlyphPropertiesPalette(PalettePlugin):
         self.editable = False
         self.selectedGlyphs = []
         self.selectedLayers = []
-        self.hasAddedCustomColumns = False
+        # Reuse the proxies (and their KVO registrations) across refreshes; keyed by the identity of the underlying GSLayer.
+        self.selectionTracker = SelectionTracker(make_layer_proxy, release_layer_proxy, key=objc.pyobjc_id)
+        self.selectedGlyphCounter = GlyphCounter(key=objc.pyobjc_id)
+        # Glyphs takes the view right after this method; the rest waits for the palette to be shown. See prepare_interface().
         self.loadNib('IBdialog', __file__)
+        self.selectionEditor = None
+
+    @objc.python_method
+    def prepare_interface(self):
+        # Done on the first refresh, which only happens once the palette is visible.
+        if self.selectionEditor is not None:
+            return
         # Enable keyboard navigation with the Tab key.
         self.topMetricsKeyTextField.setNextKeyView_(self.bottomMetricsKeyTextField)
         self.bottomMetricsKeyTextField.setNextKeyView_(self.vertOriginTextField)
@@ -399,6 +935,14 @@ class VerticalGlyphPropertiesPalette(PalettePlugin):
         self.vertWidthMetricsKeyTextField.setNextKeyView_(self.topKerningGroupTextField)
         self.topKerningGroupTextField.setNextKeyView_(self.bottomKerningGroupTextField)
         self.bottomKerningGroupTextField.setNextKeyView_(self.topMetricsKeyTextField)
+        # Complete existing group names (with Esc or F5) and count the members of the group in the tool tip.
+        for text_field in (self.topKerningGroupTextField, self.bottomKerningGroupTextField):
+            text_field.setDelegate_(self)
+            text_field.addToolTipRect_owner_userData_(text_field.bounds(), self, None)
+        # Edits apply to the whole selection in one go, with a single undo group and a single refresh.
+        self.selectionEditor = VGPPSelectionEditor.alloc().initWithPalette_(self)
+        for text_field in (self.topMetricsKeyTextField, self.bottomMetricsKeyTextField, self.vertOriginTextField, self.vertWidthMetricsKeyTextField, self.topKerningGroupTextField, self.bottomKerningGroupTextField):
+            self.selectionEditor.rebind(text_field)
         # Apply the same font style with Glyphs to the text fields.
         self.topMetricsKeyTextField.setFont_(self.make_slashed_zero_nsfont(self.topMetricsKeyTextField.font()))
         self.bottomMetricsKeyTextField.setFont_(self.make_slashed_zero_nsfont(self.bottomMetricsKeyTextField.font()))
@@ -409,44 +953,354 @@ class VerticalGlyphPropertiesPalette(PalettePlugin):
 
     @objc.python_method
     def start(self):
-        Glyphs.addCallback(self.update, UPDATEINTERFACE)
+        # Off unless asked for; see vgpp.instrumentation.
+        instrumentation.enable(instrumentation.is_requested(defaults=Glyphs.defaults))
+        # UPDATEINTERFACE fires on every redraw, keystroke and mouse drag; only refresh once per idle tick.
+        self.updateScheduler = CoalescingScheduler(self.update, self.schedule_update, self.is_visible)
+        Glyphs.addCallback(self.update_interface, UPDATEINTERFACE)
+        Glyphs.addCallback(self.document_did_open, DOCUMENTOPENED)
+        Glyphs.addCallback(self.document_did_open, DOCUMENTACTIVATED)
+        Glyphs.addCallback(self.document_did_close, DOCUMENTCLOSED)
+        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(self, 'verticalPropertiesDidChange:', VERTICAL_PROPERTIES_DID_CHANGE, None)
+        # The refresh skipped while the palette was hidden is made up for once it shows again: expanding the palette
+        # resizes its view, and a window coming back on screen changes its occlusion state.
+        self.dialog.setPostsFrameChangedNotifications_(True)
+        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(self, 'paletteVisibilityMayHaveChanged:', NSViewFrameDidChangeNotification, self.dialog)
+        NSNotificationCenter.defaultCenter().addObserver_selector_name_object_(self, 'paletteVisibilityMayHaveChanged:', NSWindowDidChangeOcclusionStateNotification, None)
+        for title, action in (
+            ('Sync Vertical Metrics',         'syncVerticalMetrics:'),
+            ('Select Glyphs in Top Group',    'selectGlyphsInTopGroup:'),
+            ('Select Glyphs in Bottom Group', 'selectGlyphsInBottomGroup:'),
+            ('Check Vertical Kerning',        'checkVerticalKerning:'),
+            ('Check Vertical Origins',        'checkVerticalOrigins:'),
+            ('Check Master Compatibility',    'checkMasterCompatibility:'),
+            ('Export Vertical Properties...', 'exportVerticalProperties:'),
+            ('Import Vertical Properties...', 'importVerticalProperties:'),
+        ) + ((('Dump Performance Trace', 'dumpPerformanceTrace:'),) if instrumentation.is_enabled() else ()):
+            menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(Glyphs.localize({'en': title}), action, '')
+            menu_item.setTarget_(self)
+            Glyphs.menu[GLYPH_MENU].append(menu_item)
+        # Fonts opened before the plugin was loaded.
+        for font in Glyphs.fonts:
+            customize_table_view_in_font_once(font)
 
     @objc.python_method
     def __del__(self):
-        Glyphs.removeCallback(self.update)
+        Glyphs.removeCallback(self.update_interface)
+        Glyphs.removeCallback(self.document_did_open)
+        Glyphs.removeCallback(self.document_did_close)
+        NSObject.cancelPreviousPerformRequestsWithTarget_(self)
+        NSNotificationCenter.defaultCenter().removeObserver_(self)
+        if self.selectionEditor is not None:
+            self.selectionEditor.stop_observing()
+
+    @objc.python_method
+    def document_did_open(self, notification):
+        try:
+            font = font_of_document_notification(notification)
+            if font is not None:
+                customize_table_view_in_font_once(font)
+        except:
+            LogError(traceback.format_exc())
+
+    @objc.python_method
+    def document_did_close(self, notification):
+        try:
+            font = font_of_document_notification(notification)
+            if font is None:
+                return
+            # Let go of the layers of the font before anything else.
+            proxies = self.selectionTracker.proxies
+            if proxies and objc.pyobjc_id(proxies[0].layer.parent.parent) == objc.pyobjc_id(font):
+                self.selectedLayers = []
+                self.selectedGlyphs = []
+                self.enabled = False
+                self.selectionTracker.clear()
+            forget_font(font)
+        except:
+            LogError(traceback.format_exc())
+
+    @objc.python_method
+    def update_interface(self, sender):
+        # Also comes with switching masters, which the list columns follow even while the palette is hidden.
+        try:
+            font = Glyphs.font
+            if font is not None and objc.pyobjc_id(font) in displayed_vertical_metrics_columns:
+                show_vertical_metrics_of_selected_master(font)
+        except:
+            LogError(traceback.format_exc())
+        self.updateScheduler.notify(sender)
+
+    @objc.python_method
+    def schedule_update(self):
+        # Perform requests are only served in the default run loop mode, so nothing happens while dragging in the edit view.
+        self.performSelector_withObject_afterDelay_('flushScheduledUpdate:', None, 0.0)
+
+    def flushScheduledUpdate_(self, sender):
+        with instrumentation.span('update'):
+            self.updateScheduler.flush()
+
+    def paletteVisibilityMayHaveChanged_(self, notification):
+        try:
+            self.updateScheduler.resume()
+        except:
+            LogError(traceback.format_exc())
+
+    def verticalPropertiesDidChange_(self, notification):
+        # One refresh for the whole bulk edit, whose per-layer KVO notifications were held back.
+        try:
+            if self.selectionEditor is None:
+                return
+            self.selectionEditor.announce()
+        except:
+            LogError(traceback.format_exc())
+
+    def syncVerticalMetrics_(self, sender):
+        # Sync the glyphs depending on the selected ones, or every glyph with a vertical metrics key if nothing is selected.
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            master_id = font.selectedFontMaster.id
+            glyph_names = [layer.parent.name for layer in get_selected_layers_from_font(font)] or None
+            graph = get_metrics_key_graph(font, master_id)
+            count = font_change_counter.count(font)
+            # One undo group for the whole sync, as for the bulk edits.
+            undo_manager = font.undoManager()
+            if undo_manager:
+                undo_manager.beginUndoGrouping()
+            font.disableUpdateInterface()
+            try:
+                sync_vertical_metrics(font, master_id, graph, glyph_names)
+            finally:
+                font.enableUpdateInterface()
+                if undo_manager:
+                    undo_manager.setActionName_(Glyphs.localize({'en': 'Sync Vertical Metrics'}))
+                    undo_manager.endUndoGrouping()
+                # The sync moves sidebearings and widths only, none of the keys or groups the caches are about.
+                note_own_font_change(font, count)
+        except MetricsKeyCycleError as error:
+            Message(title=Glyphs.localize({'en': 'Sync Vertical Metrics'}), message=str(error))
+        except:
+            LogError(traceback.format_exc())
+
+    @objc.python_method
+    def select_glyphs_in_group_of_selection(self, side):
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            layers = get_selected_layers_from_font(font)
+            group = getattr(layers[0].parent, side) if layers else None
+            if group:
+                select_glyphs_in_vertical_group(font, side, group)
+        except:
+            LogError(traceback.format_exc())
+
+    def selectGlyphsInTopGroup_(self, sender):
+        self.select_glyphs_in_group_of_selection(TOP_KERNING_GROUP)
+
+    def selectGlyphsInBottomGroup_(self, sender):
+        self.select_glyphs_in_group_of_selection(BOTTOM_KERNING_GROUP)
+
+    def checkVerticalKerning_(self, sender):
+        # Print the audit of the current master to the Macro panel.
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            master = font.selectedFontMaster
+            print('Vertical kerning of {0} ({1}):'.format(font.familyName, master.name))
+            for line in format_report(compile_vertical_kerning_of_font(font, master.id)):
+                print('  ' + line)
+            Glyphs.showMacroWindow()
+        except:
+            LogError(traceback.format_exc())
+
+    def checkVerticalOrigins_(self, sender):
+        # Print the glyphs of the current master whose vertical origin is off compared to the other glyphs of their
+        # top kerning group, or of the master, to the Macro panel.
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            master = font.selectedFontMaster
+            top_groups = dict((glyph.name, glyph.topKerningGroup) for glyph in font.glyphs)
+            lines = format_vertical_bounds_report(compute_vertical_bounds(layer_outlines_of_font(font, master)), group_of=top_groups.get)
+            print('Vertical origins of {0} ({1}), {2} to check:'.format(font.familyName, master.name, len(lines)))
+            for line in lines:
+                print('  ' + line)
+            Glyphs.showMacroWindow()
+        except:
+            LogError(traceback.format_exc())
+
+    def checkMasterCompatibility_(self, sender):
+        # Print the vertical metrics keys and values that don't interpolate across the masters to the Macro panel.
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            master_names = dict((master.id, master.name) for master in font.masters)
+            findings = list(get_master_matrix(font).findings())
+            print('Vertical properties across the masters of {0}, {1} to check:'.format(font.familyName, len(findings)))
+            for finding in findings:
+                print('  ' + format_master_matrix_finding(finding, master_names.get))
+            Glyphs.showMacroWindow()
+        except:
+            LogError(traceback.format_exc())
+
+    def exportVerticalProperties_(self, sender):
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            path = GetSaveFile(message=Glyphs.localize({'en': 'Export Vertical Properties'}), ProposedFileName='{0}.vertical.jsonl'.format(font.familyName), filetypes=['jsonl'])
+            if not path:
+                return
+            count = export_vertical_properties_of_font(font, path)
+            print('Vertical properties of {0} glyphs exported to {1}'.format(count, path))
+        except:
+            LogError(traceback.format_exc())
+
+    def importVerticalProperties_(self, sender):
+        # Apply the vertical properties exported from another font to the glyphs of the same name, master by master.
+        try:
+            font = Glyphs.font
+            if not font:
+                return
+            path = GetOpenFile(message=Glyphs.localize({'en': 'Import Vertical Properties'}), filetypes=['jsonl'])
+            if not path:
+                return
+            diff, result = import_vertical_properties_to_font(font, path)
+            print('Vertical properties imported from {0} into {1}:'.format(path, font.familyName))
+            for line in format_interchange_summary(diff, result):
+                print('  ' + line)
+            Glyphs.showMacroWindow()
+        except InterchangeError as error:
+            Message(title=Glyphs.localize({'en': 'Import Vertical Properties'}), message=str(error))
+        except:
+            LogError(traceback.format_exc())
+
+    def dumpPerformanceTrace_(self, sender):
+        # Print the timings collected so far to the Macro panel and write them as a Chrome trace next to it.
+        try:
+            path = instrumentation.dump_trace(os.path.join(tempfile.gettempdir(), 'VerticalGlyphProperties-{0}.trace.json'.format(time.strftime('%Y%m%d-%H%M%S'))))
+            print('Vertical Properties performance trace: {0}'.format(path))
+            for line in instrumentation.format_report(instrumentation.report()):
+                print('  ' + line)
+            scheduler = self.updateScheduler
+            print('  interface callbacks: {0} received, {1} coalesced, {2} skipped, {3} refreshes'.format(
+                scheduler.callbacks_received, scheduler.callbacks_coalesced, scheduler.callbacks_skipped, scheduler.refreshes_performed))
+            Glyphs.showMacroWindow()
+        except:
+            LogError(traceback.format_exc())
+
+    @objc.python_method
+    def kerning_group_side_of_control(self, control):
+        if control == self.topKerningGroupTextField:
+            return TOP_KERNING_GROUP
+        if control == self.bottomKerningGroupTextField:
+            return BOTTOM_KERNING_GROUP
+        return None
+
+    def control_textView_completions_forPartialWordRange_indexOfSelectedItem_(self, control, text_view, words, char_range, index):
+        side = self.kerning_group_side_of_control(control)
+        if side is None or not self.selectedGlyphs:
+            return (words, index)
+        completions = get_vertical_group_index(self.selectedGlyphs[0].parent).complete(side, text_view.string(), limit=100)
+        return (completions, -1)
+
+    def view_stringForToolTip_point_userData_(self, view, tag, point, data):
+        # Show how many glyphs belong to the group shared by the selection; counted when the tool tip is about to show.
+        try:
+            side = self.kerning_group_side_of_control(view)
+            if side is None or not self.selectedGlyphs:
+                return None
+            groups = set((getattr(glyph, side) for glyph in self.selectedGlyphs))
+            if len(groups) != 1 or None in groups:
+                return None
+            group = groups.pop()
+            index = get_vertical_group_index(self.selectedGlyphs[0].parent)
+            return Glyphs.localize({'en': '{0} glyphs in {1}'}).format(index.count(side, group), group)
+        except:
+            LogError(traceback.format_exc())
+            return None
+
+    @objc.python_method
+    def is_visible(self):
+        # Skip the refresh while the palette is collapsed or its window is hidden.
+        view = self.dialog
+        if view is None or view.isHiddenOrHasHiddenAncestor():
+            return False
+        window = view.window()
+        if window is None or not window.isVisible():
+            return False
+        return view.visibleRect().size.height > 0
 
     @objc.python_method
     def update(self, sender):
         try:
-            selected_layers = None
+            self.prepare_interface()
+            layers = ()
             if self.windowController():
-                font = None
                 if isinstance(sender.object(), (objc.lookUpClass('GSEditViewController'), objc.lookUpClass('GSFontViewController'))):
-                    selected_layers = VGPPLayer.layersFromArray_(sender.object().selectedLayers or [])
-                    font = sender.object().windowController().document().font
+                    layers = sender.object().selectedLayers or ()
                 else:
-                    font = sender.object()
-                    selected_layers = get_selected_layers_from_font(font)
-                if font and not self.hasAddedCustomColumns:
-                    customize_table_view_in_font(font)
-                    self.hasAddedCustomColumns = True
-            if selected_layers and len(selected_layers) > 0:
+                    layers = get_selected_layers_from_font(sender.object())
+            # Only the layers entering or leaving the selection cost anything here. The proxies leaving it are
+            # released once the array controllers have let go of them; see release_layer_proxy().
+            with instrumentation.span('update: selection'):
+                change = self.selectionTracker.update(layers, release=False)
+            if len(self.selectionTracker) > 0:
                 # Update the binding only when the selection is changed to prevent the possible perfomance degradation.
-                if self.selectedLayers != selected_layers:
-                    # Since the text field value are binded with - [NSArrayController selection] in XIB, make sure to select all the items available.
-                    selected_glyphs = get_glyphs_from_layers(selected_layers)
-                    self.selectedLayers = selected_layers
-                    self.selectedGlyphs = selected_glyphs
-                    self.selectedLayersArrayController.addSelectedObjects_(self.selectedLayersArrayController.arrangedObjects())
-                    self.selectedGlyphsArrayController.addSelectedObjects_(self.selectedGlyphsArrayController.arrangedObjects())
+                if self.enabled and len(change.added) + len(change.removed) < len(self.selectionTracker):
+                    if change.added or change.removed:
+                        with instrumentation.span('update: bindings, incremental'):
+                            self.update_bindings_incrementally(change)
+                elif change.changed or not self.enabled:
+                    with instrumentation.span('update: bindings'):
+                        # Since the text field value are binded with - [NSArrayController selection] in XIB, make sure to select all the items available.
+                        selected_layers = NSArray.arrayWithArray_(self.selectionTracker.proxies)
+                        selected_glyphs = get_glyphs_from_layers(selected_layers)
+                        self.selectedGlyphCounter.reset(proxy.layer.parent for proxy in selected_layers)
+                        self.selectedLayers = selected_layers
+                        self.selectedGlyphs = selected_glyphs
+                        self.selectedLayersArrayController.addSelectedObjects_(self.selectedLayersArrayController.arrangedObjects())
+                        self.selectedGlyphsArrayController.addSelectedObjects_(self.selectedGlyphsArrayController.arrangedObjects())
                     self.enabled = True
-            else:
+            elif change.changed or self.enabled:
                 self.selectedLayers = []
                 self.selectedGlyphs = []
                 self.enabled = False
+            self.selectionTracker.release(change.removed)
         except:
             LogError(traceback.format_exc())
 
+    @objc.python_method
+    def update_bindings_incrementally(self, change):
+        # Only the proxies and glyphs entering or leaving the selection go in or out of the array controllers, which
+        # select what they insert; the rest stays where it is, selected and observed, in the order it came in.
+        entering, leaving = self.selectedGlyphCounter.update(
+            [proxy.layer.parent for proxy in change.added],
+            [proxy.layer.parent for proxy in change.removed]
+        )
+        # Each of these changes the selection of a controller; the fields read the shared values once, at the end.
+        editor = self.selectionEditor
+        if editor is not None:
+            editor.hold_announcements()
+        try:
+            if change.removed:
+                self.selectedLayersArrayController.removeObjects_(change.removed)
+            if leaving:
+                self.selectedGlyphsArrayController.removeObjects_(leaving)
+            if change.added:
+                self.selectedLayersArrayController.addObjects_(change.added)
+            if entering:
+                self.selectedGlyphsArrayController.addObjects_(entering)
+        finally:
+            if editor is not None:
+                editor.release_announcements()
+
     @objc.python_method
     def __file__(self):
         """Please leave this method unchanged"""
@@ -0,0 +1,5 @@
+# encoding: utf-8
+
+# Host-independent building blocks of the palette.
+# Modules in this package must not import objc, Foundation, AppKit or GlyphsApp at module level
+# so that they can be exercised headless (see tests/).
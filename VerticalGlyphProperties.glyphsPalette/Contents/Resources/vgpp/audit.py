@@ -0,0 +1,190 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from .capabilities import LayerCapabilities
+from .glyphs_reader import NOT_FOUND, GlyphsFileError, read_glyphs_file
+from .kerning_groups import SIDES
+from .master_matrix import MISSING_KEY, NON_MONOTONIC, MasterMatrix, key_state
+from .metrics_keys import TSB, BSB, VERT_WIDTH
+
+# - Family Auditor
+
+# Checks that the vertical properties agree across every master of every weight of a family:
+#
+#   python -m vgpp.audit Family-*.glyphs > audit.jsonl
+#
+# Each file is read and checked by a worker process; a worker sends back one compact summary per file, so the
+# main process only compares tuples glyph by glyph. Findings are written as JSON lines as soon as they are known,
+# followed by a summary line. The exit status is 1 if there is anything to report.
+# Within a multi-master file, the masters are also checked for interpolation problems (see vgpp.master_matrix).
+
+MISSING_GLYPH  = 'missing-glyph'
+OUT_OF_SYNC    = 'out-of-sync'
+KEY_MISMATCH   = 'key-mismatch'
+GROUP_MISMATCH = 'group-mismatch'
+VALUE_MISMATCH = 'value-mismatch'
+FILE_ERROR     = 'file-error'
+
+# Within the masters of a file, see vgpp.master_matrix.
+KINDS = (FILE_ERROR, OUT_OF_SYNC, MISSING_KEY, NON_MONOTONIC, MISSING_GLYPH, KEY_MISMATCH, GROUP_MISMATCH, VALUE_MISMATCH)
+
+METRICS = (TSB, BSB, VERT_WIDTH)
+VALUES  = ('vertOrigin', 'vertWidth')
+
+def _value(value):
+    return None if value is None or value == NOT_FOUND else round(value, 2)
+
+def _is_in_sync(capabilities, metric):
+    return {
+        TSB:        capabilities.top_metrics_key_is_in_sync,
+        BSB:        capabilities.bottom_metrics_key_is_in_sync,
+        VERT_WIDTH: capabilities.vert_width_metrics_key_is_in_sync,
+    }[metric]
+
+def summarize_file(path):
+    # Runs in a worker. Returns (path, masters, glyphs, findings) where glyphs is a list of
+    # (glyph name, groups, {master id: (keys, values)}) in glyph order. Whatever goes wrong with one file
+    # becomes a finding for that file; raised in the worker, it would end the audit of the whole family.
+    try:
+        return _summarize_font(path, read_glyphs_file(path))
+    except (IOError, OSError, GlyphsFileError) as error:
+        return path, [], [], [{'kind': FILE_ERROR, 'file': path, 'detail': str(error)}]
+    except Exception as error:
+        return path, [], [], [{'kind': FILE_ERROR, 'file': path, 'detail': '{0}: {1}'.format(type(error).__name__, error)}]
+
+def _summarize_font(path, font):
+    masters = [(master.id, master.name) for master in font.masters]
+    master_names = dict(masters)
+    matrix = MasterMatrix([(master.id, master.axes[0] if master.axes else 0) for master in font.masters])
+    glyphs = []
+    findings = []
+    for glyph in font.glyphs:
+        layers = {}
+        for layer in glyph.layers:
+            if layer.layerId != layer.associatedMasterId or layer.associatedMasterId not in master_names:
+                # Brace and bracket layers follow their master.
+                continue
+            capabilities = LayerCapabilities.for_layer(layer)
+            keys = (layer.topMetricsKey(), layer.bottomMetricsKey(), layer.vertWidthMetricsKey())
+            for metric, key in zip(METRICS, keys):
+                if key and not _is_in_sync(capabilities, metric)(layer):
+                    findings.append({'kind': OUT_OF_SYNC, 'file': path, 'master': master_names[layer.associatedMasterId], 'glyph': glyph.name, 'metric': metric, 'key': key})
+            layers[layer.associatedMasterId] = (keys, (_value(layer.vert_origin), _value(layer.vert_width)))
+            if len(masters) > 1:
+                matrix.set(glyph.name, layer.associatedMasterId, (layer.vertOrigin(), layer.vertWidth(), layer.TSB(), layer.BSB(), key_state(*keys)))
+        glyphs.append((glyph.name, (glyph.topKerningGroup, glyph.bottomKerningGroup), layers))
+    for finding in matrix.findings():
+        finding['file'] = path
+        for name in ('with', 'without'):
+            if name in finding:
+                finding[name] = [master_names[master_id] for master_id in finding[name]]
+        if 'values' in finding:
+            finding['values'] = [[master_names[master_id], value] for master_id, value in finding['values']]
+        findings.append(finding)
+    return path, masters, glyphs, findings
+
+def _label(path, master_name):
+    return '{0}:{1}'.format(os.path.basename(path), master_name)
+
+def compare_summaries(summaries):
+    # Yields the findings about glyphs that differ between the files and their masters, in the glyph order of the files.
+    summaries = [summary for summary in summaries if summary[1]]
+    if not summaries:
+        return
+    order = []
+    seen = set()
+    tables = []
+    for path, masters, glyphs, _ in summaries:
+        table = {}
+        for name, groups, layers in glyphs:
+            table[name] = (groups, layers)
+            if name not in seen:
+                seen.add(name)
+                order.append(name)
+        tables.append((path, masters, table))
+    for name in order:
+        present = [(path, masters, table[name]) for path, masters, table in tables if name in table]
+        missing = [path for path, _, table in tables if name not in table]
+        if missing:
+            yield {'kind': MISSING_GLYPH, 'glyph': name, 'files': missing}
+        groups = {}
+        keys = {}
+        values = {}
+        for path, masters, (glyph_groups, layers) in present:
+            groups.setdefault(glyph_groups, []).append(path)
+            for master_id, master_name in masters:
+                layer = layers.get(master_id)
+                if layer is None:
+                    continue
+                label = _label(path, master_name)
+                layer_keys, layer_values = layer
+                keys.setdefault(layer_keys, []).append(label)
+                for value_name, value in zip(VALUES, layer_values):
+                    values.setdefault(value_name, {}).setdefault(value, []).append(label)
+        if len(groups) > 1:
+            yield {'kind': GROUP_MISMATCH, 'glyph': name, 'variants': [dict(zip(SIDES, glyph_groups), files=paths) for glyph_groups, paths in groups.items()]}
+        if len(keys) > 1:
+            yield {'kind': KEY_MISMATCH, 'glyph': name, 'variants': [dict(zip(METRICS, layer_keys), masters=labels) for layer_keys, labels in keys.items()]}
+        for value_name in VALUES:
+            variants = values.get(value_name, {})
+            if len(variants) > 1:
+                yield {'kind': VALUE_MISMATCH, 'glyph': name, 'property': value_name, 'variants': [{'value': value, 'masters': labels} for value, labels in variants.items()]}
+
+def audit(paths, jobs=None, ignore=()):
+    # Yields the findings as dicts, the ones within a file as the files come in, the ones across files at the end.
+    summaries = []
+    if jobs == 1 or len(paths) == 1:
+        results = (summarize_file(path) for path in paths)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap_unordered(summarize_file, paths)
+    try:
+        for summary in results:
+            summaries.append(summary)
+            for finding in summary[3]:
+                if finding['kind'] not in ignore:
+                    yield finding
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    # imap_unordered hands them out as they finish; compare in the order given.
+    index_of = dict((path, i) for i, path in enumerate(paths))
+    summaries.sort(key=lambda summary: index_of[summary[0]])
+    for finding in compare_summaries(summaries):
+        if finding['kind'] not in ignore:
+            yield finding
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m vgpp.audit', description='Audit the vertical properties of a font family.')
+    parser.add_argument('paths', nargs='+', metavar='FILE', help='.glyphs files of the family')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: one per core)')
+    parser.add_argument('-o', '--output', default=None, help='write the JSON lines to a file instead of stdout')
+    parser.add_argument('--ignore', action='append', default=[], choices=KINDS, help='leave out findings of this kind')
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    counts = dict((kind, 0) for kind in KINDS)
+    output = io.open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for finding in audit(args.paths, jobs=args.jobs, ignore=set(args.ignore)):
+            counts[finding['kind']] += 1
+            output.write(json.dumps(finding, sort_keys=True) + '\n')
+            output.flush()
+        output.write(json.dumps({'kind': 'summary', 'files': len(args.paths), 'findings': counts, 'seconds': round(time.time() - start, 3)}, sort_keys=True) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if any(counts.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+
+from .capabilities import LayerCapabilities
+from .kerning_groups import TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP
+from .metrics_keys import TSB, BSB, VERT_WIDTH
+
+# - Bulk Edit
+
+# Assigning a value to thousands of layers through the NSArrayController selection goes layer by layer,
+# and each write bounces back through KVO into every proxy. Here the writes are made straight to the layers
+# while the feedback is held back by a ChangeGate, leaving a single refresh to the caller.
+
+NOT_FOUND = 0x7fffffffffffffff
+
+TOP_METRICS_KEY_UI        = 'topMetricsKeyUI'
+BOTTOM_METRICS_KEY_UI     = 'bottomMetricsKeyUI'
+VERT_ORIGIN_UI            = 'vertOriginUI'
+VERT_WIDTH_METRICS_KEY_UI = 'vertWidthMetricsKeyUI'
+VERT_WIDTH_VALUE          = 'vertWidth'
+
+LAYER_PROPERTIES = (TOP_METRICS_KEY_UI, BOTTOM_METRICS_KEY_UI, VERT_ORIGIN_UI, VERT_WIDTH_METRICS_KEY_UI, VERT_WIDTH_VALUE)
+# The ones the palette shows; the layer proxies have no key for the plain vertWidth.
+PALETTE_LAYER_PROPERTIES = (TOP_METRICS_KEY_UI, BOTTOM_METRICS_KEY_UI, VERT_ORIGIN_UI, VERT_WIDTH_METRICS_KEY_UI)
+GLYPH_PROPERTIES = (TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP)
+
+# The metric whose metrics key a property holds.
+METRIC_OF_PROPERTY = {
+    TOP_METRICS_KEY_UI:        TSB,
+    BOTTOM_METRICS_KEY_UI:     BSB,
+    VERT_WIDTH_METRICS_KEY_UI: VERT_WIDTH,
+}
+
+def get_layer_property(layer, capabilities, name):
+    methods = layer.pyobjc_instanceMethods
+    if name == VERT_ORIGIN_UI:
+        return capabilities.vert_origin_ui(layer)
+    if name == VERT_WIDTH_METRICS_KEY_UI:
+        return capabilities.vert_width_metrics_key_ui(layer)
+    return getattr(methods, name)()
+
+def set_layer_property(layer, capabilities, name, value):
+    # Same semantics as the VGPPLayer setters: None resets the key and the value behind it.
+    methods = layer.pyobjc_instanceMethods
+    if name == TOP_METRICS_KEY_UI:
+        methods.setTopMetricsKeyUI_(value)
+    elif name == BOTTOM_METRICS_KEY_UI:
+        methods.setBottomMetricsKeyUI_(value)
+    elif name == VERT_ORIGIN_UI:
+        if value is not None:
+            capabilities.set_vert_origin_ui(layer, value)
+        else:
+            capabilities.set_vert_origin_ui(layer, '')
+            methods.setVertOrigin_(NOT_FOUND)
+    elif name == VERT_WIDTH_METRICS_KEY_UI:
+        if value is not None:
+            methods.setVertWidthMetricsKeyUI_(value)
+        else:
+            methods.setVertWidthMetricsKeyUI_('')
+            methods.setVertWidth_(NOT_FOUND)
+    elif name == VERT_WIDTH_VALUE:
+        methods.setVertWidth_(NOT_FOUND if value is None else value)
+    else:
+        raise KeyError(name)
+
+class ChangeGate(object):
+
+    # Observers ask the gate before forwarding a change. While it is closed the changes are only collected,
+    # so the whole batch can be announced once when it opens again. Closing nests.
+
+    def __init__(self, key=id):
+        self.key = key
+        self.depth = 0
+        self._objects = {}
+        self._key_paths = set()
+
+    @property
+    def closed(self):
+        return self.depth > 0
+
+    def close(self):
+        self.depth += 1
+
+    def open(self):
+        # Returns the collected (objects, key paths) when the outermost batch ends, None otherwise.
+        self.depth -= 1
+        if self.depth > 0:
+            return None
+        objects, key_paths = list(self._objects.values()), self._key_paths
+        self._objects = {}
+        self._key_paths = set()
+        return objects, key_paths
+
+    def hold(self, obj, key_path):
+        # True if the change has been collected and must not be forwarded.
+        if not self.depth:
+            return False
+        self._objects[self.key(obj)] = obj
+        self._key_paths.add(key_path)
+        return True
+
+class BulkEditResult(object):
+
+    def __init__(self):
+        self.layers = []
+        self.glyphs = []
+        self.changes = {}
+
+    def __len__(self):
+        return sum(self.changes.values())
+
+    def _count(self, name, count=1):
+        self.changes[name] = self.changes.get(name, 0) + count
+
+    def extend(self, other):
+        self.layers.extend(other.layers)
+        self.glyphs.extend(other.glyphs)
+        for name, count in other.changes.items():
+            self._count(name, count)
+
+def apply_vertical_properties(layers, values, key=id, capabilities_for=LayerCapabilities.for_layer):
+    # `values` maps properties from LAYER_PROPERTIES and GLYPH_PROPERTIES to the new values. Layers and glyphs
+    # already holding the value are left alone, so they don't end up in the undo group either.
+    unknown = set(values) - set(LAYER_PROPERTIES) - set(GLYPH_PROPERTIES)
+    if unknown:
+        raise KeyError(', '.join(sorted(unknown)))
+    layer_values = [(name, value) for name, value in values.items() if name in LAYER_PROPERTIES]
+    glyph_values = [(name, value or None) for name, value in values.items() if name in GLYPH_PROPERTIES]
+    result = BulkEditResult()
+    seen_glyphs = set()
+    for layer in layers:
+        changed = False
+        if layer_values:
+            capabilities = capabilities_for(layer)
+            for name, value in layer_values:
+                if get_layer_property(layer, capabilities, name) != value:
+                    set_layer_property(layer, capabilities, name, value)
+                    result._count(name)
+                    changed = True
+        if changed:
+            result.layers.append(layer)
+        glyph = layer.parent
+        if glyph_values and glyph is not None and key(glyph) not in seen_glyphs:
+            seen_glyphs.add(key(glyph))
+            glyph_changed = False
+            for name, value in glyph_values:
+                if (getattr(glyph, name) or None) != value:
+                    setattr(glyph, name, value)
+                    result._count(name)
+                    glyph_changed = True
+            if glyph_changed:
+                result.glyphs.append(glyph)
+    return result
+
+def shared_value(values, no_selection=None, multiple_values=None):
+    # What a field bound to the whole selection shows: the common value, or one of the markers.
+    iterator = iter(values)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return no_selection
+    for value in iterator:
+        if value != first:
+            return multiple_values
+    return first
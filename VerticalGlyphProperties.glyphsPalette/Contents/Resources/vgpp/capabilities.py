@@ -0,0 +1,235 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from operator import methodcaller
+
+from . import instrumentation
+from .metrics_keys import TSB, BSB, VERT_WIDTH, MetricsKeyError, glyph_name_test, metrics_key_is_in_sync
+
+# - Layer Capabilities
+
+# Glyphs 2 and Glyphs 3 expose the vertical metrics of GSLayer through different selectors.
+# Rather than asking - respondsToSelector: on every binding read, resolve once per layer class which
+# selectors are available and keep direct accessors for them in a dispatch table.
+
+METRICS_KEY_OUT_OF_SYNC   = 1 << 0
+METRICS_KEY_PLACEHOLDER   = 1 << 2
+
+VERT_WIDTH_METRICS_TAG = 0x4
+
+def is_placeholder_for_metrics_key_tag_in_layer(layer, tag):
+    # FIXME: - [GSLayer vertWidthMetricsKeyState] doesn't seems to set the GSMetricsKeysPlaceholder bit.
+    return layer.metricsValue_atHeight_(tag, 0x7fffffffffffffff) < 0.0
+
+def _is_in_range(value):
+    return -1000000 < value < 1000000
+
+def _vert_origin_key_ui(layer):
+    methods = layer.pyobjc_instanceMethods
+    return methods.vertOriginKeyUI() if _is_in_range(methods.vertOrigin()) else None
+
+def _vert_origin_number_ui(layer):
+    value = layer.pyobjc_instanceMethods.vertOrigin()
+    return '{0:.0f}'.format(value) if _is_in_range(value) else None
+
+def _without_vert_origin_placeholder(getter):
+    def vert_origin_ui(layer):
+        _, is_placeholder = layer.pyobjc_instanceMethods.vertOriginUIisPlaceholder_(None)
+        return None if is_placeholder else getter(layer)
+    return vert_origin_ui
+
+def _vert_width_metrics_key_ui_from_state(layer):
+    # Return nil to prefer the placeholder string set in XIB for simplicity.
+    methods = layer.pyobjc_instanceMethods
+    if methods.vertWidthMetricsKeyState() & METRICS_KEY_PLACEHOLDER:
+        return None
+    if is_placeholder_for_metrics_key_tag_in_layer(layer, VERT_WIDTH_METRICS_TAG):
+        return None
+    return methods.vertWidthMetricsKeyUI()
+
+def _vert_width_metrics_key_ui_from_placeholder(layer):
+    methods = layer.pyobjc_instanceMethods
+    _, is_placeholder = methods.vertWidthMetricsKeyUIisPlaceholder_(None)
+    return methods.vertWidthMetricsKeyUI() if not is_placeholder else None
+
+def _vert_width_metrics_key_ui(layer):
+    return layer.pyobjc_instanceMethods.vertWidthMetricsKeyUI()
+
+def _set_vert_origin_key_ui(layer, value):
+    layer.pyobjc_instanceMethods.setVertOriginKeyUI_(value)
+
+def _set_vert_origin_ui(layer, value):
+    layer.pyobjc_instanceMethods.setVertOriginUI_(value)
+
+def _set_nothing(layer, value):
+    pass
+
+def _top_metrics_key_state(layer):
+    return layer.pyobjc_instanceMethods.topMetricsKeyState()
+
+def _bottom_metrics_key_state(layer):
+    return layer.pyobjc_instanceMethods.bottomMetricsKeyState()
+
+def _vert_width_metrics_key_state(layer):
+    return layer.pyobjc_instanceMethods.vertWidthMetricsKeyState()
+
+def _in_sync_from_state(state):
+    def is_in_sync(layer):
+        return not (state(layer) & METRICS_KEY_OUT_OF_SYNC)
+    return is_in_sync
+
+def _color_from_state(state):
+    def color(layer):
+        return layer.pyobjc_instanceMethods.colorForMetricsState_(state(layer))
+    return color
+
+def reference_layer(layer, glyph_name):
+    # The layer of the same master in another glyph, or None.
+    if glyph_name is None:
+        return layer
+    glyph = layer.parent
+    font = glyph.parent if glyph is not None else None
+    if font is None:
+        return None
+    reference_glyph = font.glyphs[glyph_name]
+    if reference_glyph is None:
+        return None
+    return reference_glyph.layers[layer.associatedMasterId]
+
+def glyph_name_test_of_layer(layer):
+    # Tells the glyph names with a hyphen in the keys of the layer apart from a subtraction; see vgpp.metrics_keys.
+    glyph = layer.parent
+    font = glyph.parent if glyph is not None else None
+    return glyph_name_test(font) if font is not None else None
+
+def reference_metrics_lookup(layer):
+    def lookup(glyph_name, metric):
+        reference = reference_layer(layer, glyph_name)
+        if reference is None:
+            return None
+        return getattr(reference.pyobjc_instanceMethods, metric)()
+    return lookup
+
+def _in_sync_from_metrics_key(metric, key_name, fallback):
+    # Evaluate the key against the current metrics of the referenced glyphs. Only keys the evaluator
+    # doesn't understand go down the expensive path of syncing a copy of the layer.
+    metrics_key_of = methodcaller(key_name)
+    value_of = methodcaller(metric)
+    def is_in_sync(layer):
+        methods = layer.pyobjc_instanceMethods
+        key = metrics_key_of(methods)
+        if not key:
+            return True
+        try:
+            return metrics_key_is_in_sync(key, metric, value_of(methods), reference_metrics_lookup(layer), glyph_name_test_of_layer(layer))
+        except MetricsKeyError:
+            return fallback(layer)
+    return is_in_sync
+
+def _top_metrics_key_is_in_sync_by_copy(layer):
+    if layer.pyobjc_instanceMethods.topMetricsKey():
+        instrumentation.count(instrumentation.LAYER_COPIES)
+        duplicated = layer.copy()
+        duplicated.syncTopMetrics()
+        return layer.pyobjc_instanceMethods.TSB() == duplicated.pyobjc_instanceMethods.TSB()
+    return True
+
+def _bottom_metrics_key_is_in_sync_by_copy(layer):
+    if layer.pyobjc_instanceMethods.bottomMetricsKey():
+        instrumentation.count(instrumentation.LAYER_COPIES)
+        duplicated = layer.copy()
+        duplicated.syncBottomMetrics()
+        return layer.pyobjc_instanceMethods.BSB() == duplicated.pyobjc_instanceMethods.BSB()
+    return True
+
+def _vert_width_metrics_key_is_in_sync_by_copy(layer):
+    instrumentation.count(instrumentation.LAYER_COPIES)
+    duplicated = layer.copy()
+    duplicated.syncVertWidthMetrics()
+    return layer.pyobjc_instanceMethods.vertWidth() == duplicated.pyobjc_instanceMethods.vertWidth()
+
+def _vert_width_metrics_key_is_in_sync_by_host(layer):
+    return layer.pyobjc_instanceMethods.vertWidthMetricsKeyIsInSync()
+
+def _always_in_sync(layer):
+    return True
+
+def _sync_metrics(selector_name):
+    sync = methodcaller(selector_name)
+    def sync_metrics(layer):
+        sync(layer.pyobjc_instanceMethods)
+    return sync_metrics
+
+class LayerCapabilities(object):
+
+    _cache = {}
+
+    @classmethod
+    def for_layer(cls, layer):
+        layer_class = layer.__class__
+        capabilities = cls._cache.get(layer_class)
+        if capabilities is None:
+            capabilities = cls._cache[layer_class] = cls(layer_class.instancesRespondToSelector_)
+        return capabilities
+
+    def __init__(self, responds):
+        # vertOrigin
+        vert_origin_ui = _vert_origin_key_ui if responds('vertOriginKeyUI') else _vert_origin_number_ui
+        if responds('vertOriginUIisPlaceholder:'):
+            vert_origin_ui = _without_vert_origin_placeholder(vert_origin_ui)
+        self.vert_origin_ui = vert_origin_ui
+        if responds('setVertOriginKeyUI:'):
+            self.set_vert_origin_ui = _set_vert_origin_key_ui
+        elif responds('setVertOriginUI:'):
+            self.set_vert_origin_ui = _set_vert_origin_ui
+        else:
+            self.set_vert_origin_ui = _set_nothing
+
+        # Metrics key UI
+        if responds('vertWidthMetricsKeyState'):
+            self.vert_width_metrics_key_ui = _vert_width_metrics_key_ui_from_state
+        elif responds('vertWidthMetricsKeyUIisPlaceholder:'):
+            self.vert_width_metrics_key_ui = _vert_width_metrics_key_ui_from_placeholder
+        else:
+            self.vert_width_metrics_key_ui = _vert_width_metrics_key_ui
+        self.has_vert_width_metrics_key_ui = responds('vertWidthMetricsKeyUI')
+
+        # Metrics key state, None when the host doesn't know about it.
+        self.top_metrics_key_state        = _top_metrics_key_state        if responds('topMetricsKeyState')        else None
+        self.bottom_metrics_key_state     = _bottom_metrics_key_state     if responds('bottomMetricsKeyState')     else None
+        self.vert_width_metrics_key_state = _vert_width_metrics_key_state if responds('vertWidthMetricsKeyState') else None
+
+        # Sync state
+        if self.top_metrics_key_state:
+            self.top_metrics_key_is_in_sync = _in_sync_from_state(self.top_metrics_key_state)
+        else:
+            self.top_metrics_key_is_in_sync = _in_sync_from_metrics_key(TSB, 'topMetricsKeyUI', _top_metrics_key_is_in_sync_by_copy)
+        if self.bottom_metrics_key_state:
+            self.bottom_metrics_key_is_in_sync = _in_sync_from_state(self.bottom_metrics_key_state)
+        else:
+            self.bottom_metrics_key_is_in_sync = _in_sync_from_metrics_key(BSB, 'bottomMetricsKeyUI', _bottom_metrics_key_is_in_sync_by_copy)
+        if self.vert_width_metrics_key_state:
+            self.vert_width_metrics_key_is_in_sync = _in_sync_from_state(self.vert_width_metrics_key_state)
+        elif responds('syncVertWidthMetrics') and self.has_vert_width_metrics_key_ui:
+            self.vert_width_metrics_key_is_in_sync = _in_sync_from_metrics_key(VERT_WIDTH, 'vertWidthMetricsKeyUI', _vert_width_metrics_key_is_in_sync_by_copy)
+        elif responds('syncVertWidthMetrics'):
+            self.vert_width_metrics_key_is_in_sync = _vert_width_metrics_key_is_in_sync_by_copy
+        elif responds('vertWidthMetricsKeyIsInSync'):
+            self.vert_width_metrics_key_is_in_sync = _vert_width_metrics_key_is_in_sync_by_host
+        else:
+            self.vert_width_metrics_key_is_in_sync = _always_in_sync
+
+        # Syncing, None when the host can't do it.
+        self.sync_metrics = dict((metric, _sync_metrics(selector_name) if responds(selector_name) else None) for metric, selector_name in (
+            (TSB,        'syncTopMetrics'),
+            (BSB,        'syncBottomMetrics'),
+            (VERT_WIDTH, 'syncVertWidthMetrics'),
+        ))
+
+        # Color for state, None when the color has to be derived from the sync state instead.
+        has_color_for_state = responds('colorForMetricsState:')
+        def color(state):
+            return _color_from_state(state) if has_color_for_state and state else None
+        self.top_metrics_key_color        = color(self.top_metrics_key_state)
+        self.bottom_metrics_key_color     = color(self.bottom_metrics_key_state)
+        self.vert_width_metrics_key_color = color(self.vert_width_metrics_key_state)
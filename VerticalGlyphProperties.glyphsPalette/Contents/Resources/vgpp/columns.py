@@ -0,0 +1,121 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from array import array
+
+from .metrics_keys import TSB, BSB, VERT_WIDTH
+
+# - Vertical Metrics Columns
+
+# A per-master columnar store of the vertical metrics shown in the font view list. Values live in
+# array('d') columns (NaN for missing values) with their display strings formatted once, so the value a cell
+# or a sort descriptor asks for is an array lookup rather than a walk of glyph -> layer -> property and a
+# reformat. Rows are re-read lazily when they are invalidated explicitly, or when the glyph's change stamp has
+# moved; the stamp is only asked for once per row after each advance(), so a cell costs no call to the host
+# until something in the font has changed.
+
+VERT_ORIGIN          = 'vertOrigin'
+TOP_KERNING_GROUP    = 'topKerningGroup'
+BOTTOM_KERNING_GROUP = 'bottomKerningGroup'
+
+NUMERIC_COLUMNS = (VERT_ORIGIN, VERT_WIDTH, TSB, BSB)
+GROUP_COLUMNS   = (TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP)
+
+NAN = float('nan')
+
+def _number(value):
+    # Anything out of this range is a NSNotFound in disguise.
+    if value is None or not -1000000 < value < 1000000:
+        return NAN
+    return float(value)
+
+def format_number(value):
+    return '{0:.0f}'.format(value) if value == value else ''
+
+class VerticalMetricsColumns(object):
+
+    def __init__(self, read_row, change_stamp=None, key=id):
+        # `read_row(glyph)` returns (vertOrigin, vertWidth, TSB, BSB, topKerningGroup, bottomKerningGroup).
+        self.read_row = read_row
+        self.change_stamp = change_stamp
+        self.key = key
+        self._slots = {}
+        self._glyphs = []
+        self._stamps = []
+        self._stale = []
+        self._checked = []
+        self.generation = 0
+        self.values = dict((name, array('d')) for name in NUMERIC_COLUMNS)
+        self.strings = dict((name, []) for name in NUMERIC_COLUMNS)
+        self.groups = dict((name, []) for name in GROUP_COLUMNS)
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def _write(self, slot, glyph):
+        row = self.read_row(glyph)
+        for name, value in zip(NUMERIC_COLUMNS, row[:4]):
+            number = _number(value)
+            self.values[name][slot] = number
+            self.strings[name][slot] = format_number(number)
+        for name, value in zip(GROUP_COLUMNS, row[4:]):
+            self.groups[name][slot] = value or None
+        self._stamps[slot] = self.change_stamp(glyph) if self.change_stamp else None
+        self._stale[slot] = False
+        self._checked[slot] = self.generation
+
+    def slot_of(self, glyph):
+        glyph_key = self.key(glyph)
+        slot = self._slots.get(glyph_key)
+        if slot is None:
+            slot = self._slots[glyph_key] = len(self._glyphs)
+            self._glyphs.append(glyph)
+            self._stamps.append(None)
+            self._stale.append(True)
+            self._checked.append(None)
+            for name in NUMERIC_COLUMNS:
+                self.values[name].append(NAN)
+                self.strings[name].append('')
+            for name in GROUP_COLUMNS:
+                self.groups[name].append(None)
+        # A stale row is never checked at the current generation.
+        if self._checked[slot] != self.generation:
+            if self._stale[slot] or (self.change_stamp and self.change_stamp(glyph) != self._stamps[slot]):
+                self._write(slot, glyph)
+            else:
+                self._checked[slot] = self.generation
+        return slot
+
+    def __contains__(self, glyph):
+        return self.key(glyph) in self._slots
+
+    def glyph_keys(self):
+        return list(self._slots)
+
+    def value(self, glyph, name):
+        number = self.values[name][self.slot_of(glyph)]
+        return number if number == number else None
+
+    def string(self, glyph, name):
+        return self.strings[name][self.slot_of(glyph)]
+
+    def group(self, glyph, name):
+        return self.groups[name][self.slot_of(glyph)]
+
+    def invalidate(self, glyph):
+        slot = self._slots.get(self.key(glyph))
+        if slot is not None:
+            self._stale[slot] = True
+            self._checked[slot] = None
+
+    def invalidate_all(self):
+        self._stale = [True] * len(self._stale)
+        self._checked = [None] * len(self._checked)
+
+    def advance(self):
+        # Something in the font may have changed; check each row's change stamp once more when it is next asked for.
+        self.generation += 1
+
+    def fill(self, glyphs):
+        for glyph in glyphs:
+            self.slot_of(glyph)
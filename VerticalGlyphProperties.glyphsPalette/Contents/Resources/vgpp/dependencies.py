@@ -0,0 +1,222 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from collections import deque
+
+from .capabilities import LayerCapabilities
+from .metrics_keys import TSB, BSB, VERT_WIDTH, MetricsKeyError, glyph_name_test, metrics_key_references
+
+# - Metrics Key Dependencies
+
+# In CJK fonts thousands of ideographs key their vertical metrics to a handful of reference glyphs.
+# The graph below links every glyph to the glyphs its vertical metrics keys refer to, so that after
+# editing a reference glyph only its (transitive) dependents need to be synced, in dependency order.
+# Syncing any metric of a glyph may move its outline, so dependencies are tracked per glyph.
+
+METRICS = (TSB, BSB, VERT_WIDTH)
+
+class MetricsKeyCycleError(ValueError):
+
+    def __init__(self, glyph_names):
+        ValueError.__init__(self, 'Vertical metrics keys refer to each other: {0}'.format(', '.join(sorted(glyph_names))))
+        self.glyph_names = glyph_names
+
+class MetricsKeyGraph(object):
+
+    # `is_glyph_name` tells the glyph names with a hyphen in the keys apart from a subtraction; see vgpp.metrics_keys.
+
+    def __init__(self, is_glyph_name=None):
+        self.is_glyph_name = is_glyph_name
+        # Change stamps of the glyphs read by refresh_metrics_key_graph().
+        self.stamps = {}
+        self._keys = {}
+        self._references = {}
+        self._dependents = {}
+        self.invalid_keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys_of(self, glyph_name):
+        return self._keys.get(glyph_name, {})
+
+    def references_of(self, glyph_name):
+        return self._references.get(glyph_name, frozenset())
+
+    def dependents_of(self, glyph_name):
+        return self._dependents.get(glyph_name, frozenset())
+
+    def set_key(self, glyph_name, metric, key):
+        keys = dict(self._keys.get(glyph_name, {}))
+        if key:
+            keys[metric] = key
+        else:
+            keys.pop(metric, None)
+        self.set_keys(glyph_name, keys)
+
+    def set_keys(self, glyph_name, keys):
+        # Replaces the keys of the glyph, patching only the edges that touch it.
+        keys = dict((metric, key) for metric, key in keys.items() if key)
+        references = set()
+        for metric, key in keys.items():
+            try:
+                references.update(name for name, _ in metrics_key_references(key, self.is_glyph_name) if name is not None)
+            except MetricsKeyError:
+                self.invalid_keys[(glyph_name, metric)] = key
+            else:
+                self.invalid_keys.pop((glyph_name, metric), None)
+        references.discard(glyph_name)
+        previous = self._references.get(glyph_name, frozenset())
+        for name in previous - references:
+            dependents = self._dependents[name]
+            dependents.discard(glyph_name)
+            if not dependents:
+                del self._dependents[name]
+        for name in references - previous:
+            self._dependents.setdefault(name, set()).add(glyph_name)
+        if keys:
+            self._keys[glyph_name] = keys
+            self._references[glyph_name] = frozenset(references)
+        else:
+            self._keys.pop(glyph_name, None)
+            self._references.pop(glyph_name, None)
+
+    def remove_glyph(self, glyph_name):
+        self.set_keys(glyph_name, {})
+        for metric in METRICS:
+            self.invalid_keys.pop((glyph_name, metric), None)
+
+    def affected_by(self, glyph_names):
+        # The given glyphs and everything depending on them, in O(dependents).
+        affected = set(glyph_names)
+        queue = deque(affected)
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    queue.append(dependent)
+        return affected
+
+    def resync_order(self, glyph_names=None):
+        # Topological order of the glyphs to sync after the given ones have changed, or of the whole graph.
+        # Only glyphs with keys are returned since there's nothing to sync for the others.
+        affected = self.affected_by(glyph_names) if glyph_names is not None else set(self._keys) | set(self._dependents)
+        pending = {}
+        for name in affected:
+            pending[name] = sum(1 for reference in self._references.get(name, ()) if reference in affected)
+        queue = deque(name for name, count in pending.items() if count == 0)
+        order = []
+        while queue:
+            name = queue.popleft()
+            if name in self._keys:
+                order.append(name)
+            for dependent in self._dependents.get(name, ()):
+                if dependent in pending:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        queue.append(dependent)
+        if len(order) < sum(1 for name in affected if name in self._keys):
+            raise MetricsKeyCycleError(self._cyclic(affected))
+        return order
+
+    def cycles(self):
+        # Strongly connected components with more than one glyph (Tarjan's algorithm, iterative).
+        index_of = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+        counter = [0]
+        for root in list(self._references):
+            if root in index_of:
+                continue
+            work = [(root, iter(self._references.get(root, ())))]
+            index_of[root] = low[root] = counter[0]
+            counter[0] += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, references = work[-1]
+                advanced = False
+                for reference in references:
+                    if reference not in index_of:
+                        index_of[reference] = low[reference] = counter[0]
+                        counter[0] += 1
+                        stack.append(reference)
+                        on_stack.add(reference)
+                        work.append((reference, iter(self._references.get(reference, ()))))
+                        advanced = True
+                        break
+                    elif reference in on_stack:
+                        low[node] = min(low[node], index_of[reference])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        components.append(component)
+        return components
+
+    def _cyclic(self, affected):
+        return set(name for component in self.cycles() for name in component if name in affected)
+
+def read_metrics_keys(layer):
+    methods = layer.pyobjc_instanceMethods
+    return {
+        TSB:        methods.topMetricsKeyUI(),
+        BSB:        methods.bottomMetricsKeyUI(),
+        VERT_WIDTH: LayerCapabilities.for_layer(layer).vert_width_metrics_key_ui(layer),
+    }
+
+def metrics_key_graph_from_font(font, master_id, change_stamp=None):
+    # Walks every layer of the master once.
+    graph = MetricsKeyGraph(glyph_name_test(font))
+    refresh_metrics_key_graph(graph, font, master_id, change_stamp)
+    return graph
+
+def refresh_metrics_key_graph(graph, font, master_id, change_stamp=None):
+    # Re-reads the keys of the glyphs that are new or whose change stamp moved, and drops the glyphs that are gone,
+    # so that keys changed by any means are picked up. Returns the number of glyphs read.
+    stamps = graph.stamps
+    seen = set()
+    count = 0
+    for glyph in font.glyphs:
+        name = glyph.name
+        seen.add(name)
+        stamp = change_stamp(glyph) if change_stamp else None
+        if change_stamp and name in stamps and stamps[name] == stamp:
+            continue
+        layer = glyph.layers[master_id]
+        graph.set_keys(name, read_metrics_keys(layer) if layer is not None else {})
+        if change_stamp:
+            stamps[name] = stamp
+        count += 1
+    for name in [name for name in set(stamps) | set(graph._keys) if name not in seen]:
+        graph.remove_glyph(name)
+        stamps.pop(name, None)
+    return count
+
+def sync_vertical_metrics(font, master_id, graph, glyph_names=None):
+    # Syncs the glyphs depending on the given ones (or all of them) in dependency order. Returns the synced glyph names.
+    order = graph.resync_order(glyph_names)
+    for name in order:
+        glyph = font.glyphs[name]
+        layer = glyph.layers[master_id] if glyph is not None else None
+        if layer is None:
+            continue
+        capabilities = LayerCapabilities.for_layer(layer)
+        keys = graph.keys_of(name)
+        for metric in METRICS:
+            sync = capabilities.sync_metrics[metric]
+            if sync and metric in keys:
+                sync(layer)
+    return order
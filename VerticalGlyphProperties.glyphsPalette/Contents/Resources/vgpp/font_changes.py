@@ -0,0 +1,35 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+
+# - Font Change Counter
+
+# A cheap answer to "has anything in this font changed since I last looked?". Every edit in Glyphs goes through
+# the undo manager of the font, so the plugin bumps the count of a font whenever its undo manager closes a group,
+# undoes or redoes. The caches keep the count they were last checked at and only walk the change stamps of the
+# glyphs once it has moved, instead of on every call.
+
+class FontChangeCounter(object):
+
+    def __init__(self, key=id):
+        self.key = key
+        self._counts = {}
+
+    def watch(self, font):
+        self._counts.setdefault(self.key(font), 0)
+
+    def forget(self, font):
+        self._counts.pop(self.key(font), None)
+
+    def bump(self, font):
+        font_key = self.key(font)
+        if font_key in self._counts:
+            self._counts[font_key] += 1
+
+    def count(self, font):
+        # None for a font that isn't watched; its caches have to check every time.
+        return self._counts.get(self.key(font))
+
+    def has_changed(self, font, count):
+        current = self.count(font)
+        return current is None or current != count
@@ -0,0 +1,59 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+
+# - Glyph Index Map
+
+# - [GSFont indexOfGlyph:] is a linear search, so ordering a selection with it costs O(n^2).
+# This map is built once per font and answers the same question with a dictionary lookup.
+# Every answer is double-checked against the font with an O(1) `glyph_at_index`, and the map rebuilds
+# itself when glyphs have been reordered or the glyph count has changed behind its back. A glyph that
+# isn't in the font costs a rebuild only when the count has changed, or once per sorted() call.
+
+NOT_FOUND = 0x7fffffffffffffff
+
+class GlyphIndexMap(object):
+
+    def __init__(self, glyphs, glyph_at_index=None, key=id):
+        self.glyphs = glyphs
+        self.glyph_at_index = glyph_at_index or glyphs.__getitem__
+        self.key = key
+        self.rebuilds = 0
+        self._indexes = {}
+        self.rebuild()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def rebuild(self):
+        key = self.key
+        self._indexes = dict((key(glyph), index) for index, glyph in enumerate(self.glyphs))
+        self.rebuilds += 1
+
+    def _is_valid(self, index, glyph_key):
+        try:
+            glyph = self.glyph_at_index(index)
+        except IndexError:
+            return False
+        return glyph is not None and self.key(glyph) == glyph_key
+
+    def index_of(self, glyph):
+        glyph_key = self.key(glyph)
+        index = self._indexes.get(glyph_key)
+        if index is not None and self._is_valid(index, glyph_key):
+            return index
+        # A stale index means the glyphs were reordered; an unknown glyph, that they were added or removed.
+        if index is not None or len(self.glyphs) != len(self._indexes):
+            self.rebuild()
+            index = self._indexes.get(glyph_key)
+        return index if index is not None else NOT_FOUND
+
+    def sorted(self, glyphs):
+        glyphs = list(glyphs)
+        rebuilds = self.rebuilds
+        indexes = [self.index_of(glyph) for glyph in glyphs]
+        if NOT_FOUND in indexes and self.rebuilds == rebuilds:
+            # The same glyph count, but a glyph may have been replaced by another one.
+            self.rebuild()
+            indexes = [self.index_of(glyph) for glyph in glyphs]
+        return [glyphs[i] for i in sorted(range(len(glyphs)), key=indexes.__getitem__)]
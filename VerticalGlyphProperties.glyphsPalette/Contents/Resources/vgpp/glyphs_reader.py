@@ -0,0 +1,629 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import copy
+import io
+import math
+import re
+
+from .capabilities import glyph_name_test_of_layer, reference_metrics_lookup
+from .metrics_keys import TSB, BSB, VERT_WIDTH, MetricsKeyError, evaluate_metrics_key
+from .outlines import contour_bounds, default_vert_width, transform_bounds, union_bounds, vertical_sidebearings
+
+# - Streaming .glyphs Reader
+
+# Pulls the vertical properties out of .glyphs files (format 2 and 3) without building the plist tree:
+# the file is tokenized chunk by chunk, the glyphs are handed out one at a time and everything the
+# palette doesn't care about is skipped over without being materialized.
+#
+# The objects it returns answer the same accessors VGPPLayer uses on GSLayer (through
+# `pyobjc_instanceMethods`), so LayerCapabilities and the metrics key evaluator run on them unchanged.
+
+NOT_FOUND = 0x7fffffffffffffff
+
+CHUNK_SIZE = 1 << 16
+
+_TOKEN = re.compile(r'\s*(?:([{}()=;,])|"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s{}()=;,"<>]+)|<([0-9A-Fa-f\s]*)>)')
+_KEY = re.compile(r'\s*(?:"([^"\\]*(?:\\.[^"\\]*)*)"|([^\s{}()=;,"<>]+))\s*=')
+_SEMICOLON = re.compile(r'\s*;')
+_SKIP = re.compile(r'(?:[^"{}()]+|"[^"\\]*(?:\\.[^"\\]*)*")+|[{}()]')
+_ESCAPE = re.compile(r'\\(U[0-9A-Fa-f]{4}|[0-7]{3}|.)', re.DOTALL)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+try:
+    _unichr = unichr
+except NameError:
+    _unichr = chr
+
+class GlyphsFileError(ValueError):
+    pass
+
+def _unescape_match(match):
+    escape = match.group(1)
+    if escape[0] == 'U' and len(escape) == 5:
+        return _unichr(int(escape[1:], 16))
+    if len(escape) == 3 and escape.isdigit():
+        return _unichr(int(escape, 8))
+    return _ESCAPES.get(escape, escape)
+
+def _unescape(text):
+    return _ESCAPE.sub(_unescape_match, text) if '\\' in text else text
+
+class _Tokenizer(object):
+
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the memory stays bounded by the chunk size.
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def next(self):
+        # Returns a punctuation character, or ('string', value) / ('data', value). None at the end.
+        while True:
+            match = _TOKEN.match(self.buffer, self.position)
+            if match is None or (match.end() == len(self.buffer) and not self.eof):
+                if self._fill():
+                    continue
+                if match is None:
+                    if self.buffer[self.position:].strip():
+                        raise GlyphsFileError('Unexpected input: {0!r}'.format(self.buffer[self.position:self.position + 20]))
+                    return None
+            self.position = match.end()
+            punctuation, quoted, bare, data = match.groups()
+            if punctuation:
+                return punctuation
+            if quoted is not None:
+                return ('string', _unescape(quoted))
+            if bare is not None:
+                return ('string', bare)
+            return ('data', data)
+
+    def expect(self, expected):
+        token = self.next()
+        if token is None:
+            raise GlyphsFileError('Unexpected end of file')
+        if token != expected:
+            raise GlyphsFileError('Expected {0!r} but got {1!r}'.format(expected, token))
+
+    def skip_nested(self, depth=1, pieces=None):
+        # Skips to the bracket closing an already consumed opening one, matching whole runs at a time.
+        # The skipped text is appended to `pieces` if given.
+        start = self.position
+        while depth:
+            match = _SKIP.match(self.buffer, self.position)
+            if match is None:
+                if pieces is not None:
+                    pieces.append(self.buffer[start:self.position])
+                if not self._fill():
+                    raise GlyphsFileError('Unexpected end of file')
+                start = self.position
+                continue
+            self.position = match.end()
+            text = match.group()
+            if text in ('{', '('):
+                depth += 1
+            elif text in ('}', ')'):
+                depth -= 1
+        if pieces is not None:
+            pieces.append(self.buffer[start:self.position])
+
+    def capture_value(self):
+        # The source text of the next bracketed value, for the caller to parse as it sees fit.
+        token = self.next()
+        if token not in ('{', '('):
+            raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+        pieces = [token]
+        self.skip_nested(pieces=pieces)
+        return ''.join(pieces)
+
+    def parse_value(self, token=None):
+        token = token if token is not None else self.next()
+        if token == '{':
+            result = {}
+            while True:
+                token = self.next()
+                if token == '}':
+                    return result
+                if token is None:
+                    raise GlyphsFileError('Unexpected end of file')
+                if not isinstance(token, tuple):
+                    raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+                key = token[1]
+                self.expect('=')
+                result[key] = self.parse_value()
+                self.expect(';')
+        if token == '(':
+            result = []
+            token = self.next()
+            while token != ')':
+                if token is None:
+                    raise GlyphsFileError('Unexpected end of file')
+                result.append(self.parse_value(token))
+                token = self.next()
+                if token == ',':
+                    token = self.next()
+            return result
+        if isinstance(token, tuple):
+            return token[1]
+        if token is None:
+            raise GlyphsFileError('Unexpected end of file')
+        raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+
+    def skip_value(self):
+        token = self.next()
+        if token in ('{', '('):
+            self.skip_nested()
+        elif not isinstance(token, tuple):
+            raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+
+    def iter_dict(self):
+        # Yields the keys of a dictionary whose '{' has been consumed; the caller must consume each value.
+        while True:
+            # Most of the time the key and the '=' come in one piece.
+            match = _KEY.match(self.buffer, self.position)
+            if match is not None:
+                self.position = match.end()
+                quoted, key = match.groups()
+                key = key if quoted is None else _unescape(quoted)
+            else:
+                token = self.next()
+                if token == '}':
+                    return
+                if token is None:
+                    raise GlyphsFileError('Unexpected end of file')
+                if not isinstance(token, tuple):
+                    raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+                self.expect('=')
+                key = token[1]
+            yield key
+            match = _SEMICOLON.match(self.buffer, self.position)
+            if match is not None:
+                self.position = match.end()
+            else:
+                self.expect(';')
+
+    def iter_list(self):
+        # Yields the first token of every item of a list whose '(' has been consumed; the caller must consume the item.
+        token = self.next()
+        while token != ')':
+            if token is None:
+                raise GlyphsFileError('Unexpected end of file')
+            yield token
+            token = self.next()
+            if token == ',':
+                token = self.next()
+
+def _number(value, default=None):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+# Format 2 and format 3 spell the same things differently.
+
+_GLYPH_KEYS = {
+    'topKerningGroup':     'topKerningGroup',
+    'kernTop':             'topKerningGroup',
+    'bottomKerningGroup':  'bottomKerningGroup',
+    'kernBottom':          'bottomKerningGroup',
+}
+
+_METRICS_KEYS = {
+    'topMetricsKey':       TSB,
+    'metricTop':           TSB,
+    'bottomMetricsKey':    BSB,
+    'metricBottom':        BSB,
+    'vertWidthMetricsKey': VERT_WIDTH,
+    'metricVertWidth':     VERT_WIDTH,
+}
+
+_NODE_TYPES = {'LINE': 'l', 'CURVE': 'c', 'QCURVE': 'q', 'OFFCURVE': 'o', 'l': 'l', 'c': 'c', 'q': 'q', 'o': 'o'}
+
+# Nodes of the paths found straight in the source text: "x y TYPE" in format 2, (x,y,type) in format 3.
+_NODES = re.compile(r'\bnodes\s*=\s*\(')
+_NODE = re.compile(r'"(-?[\d.]+) (-?[\d.]+) ([A-Z]+)|\((-?[\d.]+),(-?[\d.]+),([lcoq])s?\b')
+
+def _contours_from_source(text):
+    contours = []
+    for source in _NODES.split(text)[1:]:
+        contour = []
+        for match in _NODE.finditer(source):
+            x2, y2, type2, x3, y3, type3 = match.groups()
+            if type2:
+                contour.append((float(x2), float(y2), _NODE_TYPES.get(type2, 'l')))
+            else:
+                contour.append((float(x3), float(y3), type3))
+        contours.append(contour)
+    return contours
+
+def _parse_node(node):
+    if isinstance(node, list):
+        # Format 3: (x,y,type[s])
+        x, y, node_type = node[0], node[1], node[2]
+    else:
+        # Format 2: "x y TYPE [SMOOTH]"
+        x, y, node_type = node.split()[:3]
+    node_type = node_type[:-1] if node_type.endswith('s') and len(node_type) == 2 else node_type
+    return (float(x), float(y), _NODE_TYPES.get(node_type, 'l'))
+
+def _add_shapes(shapes, contours, components):
+    for shape in shapes:
+        if 'nodes' in shape:
+            contours.append([_parse_node(node) for node in shape['nodes']])
+        elif 'ref' in shape or 'name' in shape:
+            components.append((shape.get('ref') or shape.get('name'), _component_transform(shape)))
+
+def _component_transform(component):
+    if 'transform' in component:
+        values = [float(v) for v in component['transform'].strip('{}').split(',')]
+        if len(values) == 6:
+            return tuple(values)
+    x, y = (_number(v, 0.0) for v in component.get('pos', (0, 0)))
+    scale_x, scale_y = (_number(v, 1.0) for v in component.get('scale', (1, 1)))
+    angle = math.radians(_number(component.get('angle'), 0.0))
+    cos, sin = math.cos(angle), math.sin(angle)
+    return (scale_x * cos, scale_x * sin, -scale_y * sin, scale_y * cos, x, y)
+
+# - Headless Objects
+
+class HeadlessMaster(object):
+
+    def __init__(self, master_id, name, ascender, descender, axes):
+        self.id = master_id
+        self.name = name
+        self.ascender = ascender
+        self.descender = descender
+        self.axes = axes
+
+    def __repr__(self):
+        return '<HeadlessMaster {0}>'.format(self.name)
+
+class HeadlessGlyphs(object):
+
+    # font.glyphs: indexable by position or name, None for unknown names like GlyphsApp does.
+
+    def __init__(self):
+        self._list = []
+        self._by_name = {}
+
+    def append(self, glyph):
+        self._list.append(glyph)
+        self._by_name[glyph.name] = glyph
+
+    def __len__(self):
+        return len(self._list)
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._list[key]
+        return self._by_name.get(key)
+
+class HeadlessLayers(object):
+
+    # glyph.layers: by position or layer id.
+
+    def __init__(self):
+        self._list = []
+        self._by_id = {}
+
+    def append(self, layer):
+        self._list.append(layer)
+        self._by_id.setdefault(layer.layerId, layer)
+
+    def __len__(self):
+        return len(self._list)
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._list[key]
+        return self._by_id.get(key)
+
+class HeadlessFont(object):
+
+    def __init__(self, path=None):
+        self.path = path
+        self.familyName = None
+        self.unitsPerEm = None
+        self.masters = []
+        self.glyphs = HeadlessGlyphs()
+        self.kerningVertical = {}
+        self.format_version = 2
+
+    def master_for_id(self, master_id):
+        for master in self.masters:
+            if master.id == master_id:
+                return master
+        return None
+
+class HeadlessGlyph(object):
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.topKerningGroup = None
+        self.bottomKerningGroup = None
+        self.metrics_keys = {}
+        self.layers = HeadlessLayers()
+
+    def __repr__(self):
+        return '<HeadlessGlyph {0}>'.format(self.name)
+
+class HeadlessLayer(object):
+
+    def __init__(self, layer_id, associated_master_id=None, parent=None):
+        self.layerId = layer_id
+        self.associatedMasterId = associated_master_id or layer_id
+        self.parent = parent
+        self.name = None
+        self.metrics_keys = {}
+        self.vert_origin = None
+        self.vert_width = None
+        self.outline_bounds = None
+        self.components = []
+        self.contours = None
+
+    def __repr__(self):
+        return '<HeadlessLayer {0} {1}>'.format(self.parent.name if self.parent else None, self.layerId)
+
+    @classmethod
+    def instancesRespondToSelector_(cls, selector):
+        if isinstance(selector, bytes):
+            selector = selector.decode('ascii')
+        return hasattr(cls, selector.replace(':', '_'))
+
+    @property
+    def pyobjc_instanceMethods(self):
+        return self
+
+    @property
+    def master(self):
+        glyph = self.parent
+        font = glyph.parent if glyph is not None else None
+        return font.master_for_id(self.associatedMasterId) if font is not None else None
+
+    def bounds(self, _seen=None):
+        # Including components, resolved against the same master of the referenced glyphs.
+        if not self.components:
+            return self.outline_bounds
+        bounds = [self.outline_bounds]
+        font = self.parent.parent if self.parent is not None else None
+        if self.components and font is not None:
+            seen = (_seen or set()) | set([self.parent.name])
+            for name, transform in self.components:
+                glyph = font.glyphs[name]
+                layer = glyph.layers[self.associatedMasterId] if glyph is not None and name not in seen else None
+                if layer is not None:
+                    bounds.append(transform_bounds(layer.bounds(seen), transform))
+        return union_bounds(bounds)
+
+    # GSLayer look-alike accessors.
+
+    def _metrics_key(self, metric):
+        key = self.metrics_keys.get(metric)
+        if not key and self.parent is not None:
+            key = self.parent.metrics_keys.get(metric)
+        return key or None
+
+    def topMetricsKey(self):
+        return self._metrics_key(TSB)
+
+    def bottomMetricsKey(self):
+        return self._metrics_key(BSB)
+
+    def vertWidthMetricsKey(self):
+        return self._metrics_key(VERT_WIDTH)
+
+    topMetricsKeyUI = topMetricsKey
+    bottomMetricsKeyUI = bottomMetricsKey
+    vertWidthMetricsKeyUI = vertWidthMetricsKey
+
+    def vertOrigin(self):
+        return self.vert_origin if self.vert_origin is not None else NOT_FOUND
+
+    def vertWidth(self):
+        if self.vert_width is not None:
+            return self.vert_width
+        master = self.master
+        return default_vert_width(master.ascender, master.descender) if master else NOT_FOUND
+
+    def _sidebearings(self):
+        bounds = self.bounds()
+        master = self.master
+        if bounds is None or master is None:
+            return (None, None)
+        return vertical_sidebearings(bounds[1], bounds[3], master.ascender, master.descender, self.vert_origin, self.vert_width)
+
+    def TSB(self):
+        return self._sidebearings()[0]
+
+    def BSB(self):
+        return self._sidebearings()[1]
+
+    def copy(self):
+        duplicated = copy.copy(self)
+        duplicated.metrics_keys = dict(self.metrics_keys)
+        return duplicated
+
+    def syncVertWidthMetrics(self):
+        # The sidebearings would need the outline to be moved, only the vertical width can be synced here.
+        key = self.vertWidthMetricsKey()
+        if not key:
+            return
+        try:
+            value = evaluate_metrics_key(key, VERT_WIDTH, reference_metrics_lookup(self), glyph_name_test_of_layer(self))
+        except MetricsKeyError:
+            return
+        if value is not None:
+            self.vert_width = value
+
+# - Reader
+
+class GlyphsFileReader(object):
+
+    def __init__(self, path, with_outlines=False, with_kerning=False, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.with_outlines = with_outlines
+        self.with_kerning = with_kerning
+        self.chunk_size = chunk_size
+        self.font = HeadlessFont(path)
+
+    def iter_glyphs(self, retain=False):
+        # Yields the glyphs one by one. Unless `retain` is set they are not kept in font.glyphs, so the memory
+        # doesn't grow with the file, but lookups of other glyphs (metrics keys, components) won't resolve.
+        font = self.font
+        with io.open(self.path, 'r', encoding='utf-8') as stream:
+            tokenizer = _Tokenizer(stream, self.chunk_size)
+            tokenizer.expect('{')
+            metrics = None
+            master_dicts = None
+            for key in tokenizer.iter_dict():
+                if key == '.formatVersion':
+                    font.format_version = int(tokenizer.parse_value())
+                elif key in ('familyName', 'unitsPerEm'):
+                    value = tokenizer.parse_value()
+                    setattr(font, key, value if key == 'familyName' else _number(value))
+                elif key == 'fontMaster':
+                    master_dicts = tokenizer.parse_value()
+                elif key == 'metrics':
+                    metrics = tokenizer.parse_value()
+                elif key in ('kerningVertical', 'vertKerning') and self.with_kerning:
+                    font.kerningVertical = dict((master_id, dict((first, dict((second, _number(value, 0.0)) for second, value in seconds.items())) for first, seconds in pairs.items())) for master_id, pairs in tokenizer.parse_value().items())
+                elif key == 'glyphs':
+                    if master_dicts is not None:
+                        if font.format_version >= 3 and metrics is None:
+                            metrics = _read_trailing_metrics(self.path)
+                        font.masters = [_make_master(master, metrics) for master in master_dicts]
+                    tokenizer.expect('(')
+                    for token in tokenizer.iter_list():
+                        if token != '{':
+                            raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+                        glyph = self._read_glyph(tokenizer)
+                        if retain:
+                            font.glyphs.append(glyph)
+                        yield glyph
+                else:
+                    tokenizer.skip_value()
+            if not font.masters and master_dicts is not None:
+                font.masters = [_make_master(master, metrics) for master in master_dicts]
+
+    def read(self):
+        # Reads the whole file into font.glyphs, keeping only the vertical properties around.
+        for _ in self.iter_glyphs(retain=True):
+            pass
+        return self.font
+
+    def _read_glyph(self, tokenizer):
+        glyph = HeadlessGlyph(None, self.font)
+        for key in tokenizer.iter_dict():
+            if key == 'glyphname':
+                glyph.name = tokenizer.parse_value()
+            elif key in _GLYPH_KEYS:
+                setattr(glyph, _GLYPH_KEYS[key], tokenizer.parse_value())
+            elif key in _METRICS_KEYS:
+                glyph.metrics_keys[_METRICS_KEYS[key]] = tokenizer.parse_value()
+            elif key == 'layers':
+                tokenizer.expect('(')
+                for token in tokenizer.iter_list():
+                    if token != '{':
+                        raise GlyphsFileError('Unexpected token {0!r}'.format(token))
+                    glyph.layers.append(self._read_layer(tokenizer, glyph))
+            else:
+                tokenizer.skip_value()
+        return glyph
+
+    def _read_layer(self, tokenizer, glyph):
+        values = {}
+        metrics_keys = {}
+        contours = []
+        components = []
+        for key in tokenizer.iter_dict():
+            if key in ('layerId', 'associatedMasterId', 'name', 'vertOrigin', 'vertWidth'):
+                values[key] = tokenizer.parse_value()
+            elif key in _METRICS_KEYS:
+                metrics_keys[_METRICS_KEYS[key]] = tokenizer.parse_value()
+            elif key in ('paths', 'shapes'):
+                source = tokenizer.capture_value()
+                if 'ref =' in source or 'name =' in source:
+                    # Components among the paths, take the long way.
+                    _add_shapes(_Tokenizer(io.StringIO(source)).parse_value(), contours, components)
+                else:
+                    contours.extend(_contours_from_source(source))
+            elif key == 'components':
+                _add_shapes(tokenizer.parse_value(), contours, components)
+            else:
+                tokenizer.skip_value()
+        layer = HeadlessLayer(values.get('layerId'), values.get('associatedMasterId'), glyph)
+        layer.name = values.get('name')
+        layer.vert_origin = _number(values.get('vertOrigin'))
+        layer.vert_width = _number(values.get('vertWidth'))
+        layer.metrics_keys = dict((metric, key) for metric, key in metrics_keys.items() if key)
+        layer.outline_bounds = union_bounds(contour_bounds(contour) for contour in contours)
+        layer.components = components
+        if self.with_outlines:
+            layer.contours = contours
+        return layer
+
+def _make_master(master, metrics):
+    if 'metricValues' in master and metrics:
+        # Format 3: the values line up with the font wide list of metrics.
+        positions = {}
+        for metric, value in zip(metrics, master['metricValues']):
+            positions.setdefault(metric.get('type'), _number(value.get('pos'), 0.0))
+        ascender = positions.get('ascender', 800.0)
+        descender = positions.get('descender', -200.0)
+    else:
+        ascender = _number(master.get('ascender'), 800.0)
+        descender = _number(master.get('descender'), -200.0)
+    if 'axesValues' in master:
+        axes = tuple(_number(value, 0.0) for value in master['axesValues'])
+    else:
+        axes = tuple(_number(master.get(key), 0.0) for key in ('weightValue', 'widthValue', 'customValue') if key in master) or (_number(master.get('weightValue'), 100.0),)
+    name = master.get('name') or ' '.join(master.get(key) for key in ('weight', 'width', 'custom') if master.get(key)) or master.get('id')
+    return HeadlessMaster(master.get('id'), name, ascender, descender, axes)
+
+def _read_trailing_metrics(path, chunk_size=CHUNK_SIZE):
+    # Format 3 writes the font wide 'metrics' after the glyphs. Look for it from the end of the file instead
+    # of tokenizing all the glyphs twice.
+    needle = b'\nmetrics = ('
+    with io.open(path, 'rb') as stream:
+        stream.seek(0, io.SEEK_END)
+        end = stream.tell()
+        tail = b''
+        offset = end
+        while offset > 0:
+            offset = max(0, offset - chunk_size)
+            stream.seek(offset)
+            tail = stream.read(min(chunk_size, end - offset)) + tail[:len(needle)]
+            index = tail.rfind(needle)
+            if index >= 0:
+                stream.seek(offset + index + len(needle) - 1)
+                tokenizer = _Tokenizer(io.TextIOWrapper(stream, encoding='utf-8'), chunk_size)
+                return tokenizer.parse_value()
+            end = offset + len(needle)
+    return None
+
+def read_glyphs_file(path, with_outlines=False, with_kerning=False):
+    return GlyphsFileReader(path, with_outlines=with_outlines, with_kerning=with_kerning).read()
+
+def iter_glyphs_file(path, with_outlines=False):
+    reader = GlyphsFileReader(path, with_outlines=with_outlines)
+    return reader.iter_glyphs()
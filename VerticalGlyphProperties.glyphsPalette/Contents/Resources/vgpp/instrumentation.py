@@ -0,0 +1,192 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from collections import deque
+import io
+import json
+import os
+import threading
+import time
+
+# - Instrumentation
+
+# Opt-in timings for the hot paths of the palette: the refresh, the proxy getters and setters, the KVO fan-out and
+# the sync checks that fall back to copying layers. Wrap a block in `with span('name'):` and bump counters with
+# `count('name')`. While turned off (the default) `span()` hands out a shared do-nothing context manager and
+# `count()` returns right away, so the instrumented code pays for one function call and a flag check.
+#
+# Turn it on with VGPP_INSTRUMENTATION=1 in the environment of Glyphs, or with the Glyphs default below:
+#
+#   Glyphs.defaults['jp.co.morisawa.VerticalGlyphProperties.instrumentation'] = True
+#
+# `report()` summarizes the call counts, cumulative and p95 timings, and `dump_trace(path)` writes the spans in the
+# Chrome trace event format, to be opened in chrome://tracing or https://ui.perfetto.dev.
+
+ENVIRONMENT_VARIABLE = 'VGPP_INSTRUMENTATION'
+DEFAULTS_KEY = 'jp.co.morisawa.VerticalGlyphProperties.instrumentation'
+
+LAYER_COPIES = 'layer copies'
+OBSERVER_REGISTRATIONS = 'observer registrations'
+OBSERVER_REMOVALS = 'observer removals'
+
+# Durations kept per span for the percentiles, and spans kept for the trace; the oldest ones go first.
+SAMPLE_SIZE = 1000
+TRACE_SIZE = 100000
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+class _NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class SpanStats(object):
+
+    def __init__(self, name, sample_size=SAMPLE_SIZE):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def add(self, duration):
+        self.calls += 1
+        self.total += duration
+        if duration > self.maximum:
+            self.maximum = duration
+        self.samples.append(duration)
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+class _Span(object):
+
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = _clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.record(self.name, self.start, _clock() - self.start)
+        return False
+
+class Recorder(object):
+
+    def __init__(self, sample_size=SAMPLE_SIZE, trace_size=TRACE_SIZE):
+        self.enabled = False
+        self.sample_size = sample_size
+        self.stats = {}
+        self.counters = {}
+        self.events = deque(maxlen=trace_size)
+        self.origin = _clock()
+
+    def reset(self):
+        self.stats = {}
+        self.counters = {}
+        self.events.clear()
+        self.origin = _clock()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name, start, duration):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = SpanStats(name, self.sample_size)
+        stats.add(duration)
+        self.events.append((name, start, duration, threading.current_thread().ident))
+
+    def report(self):
+        # One dict per span, the most expensive first, then the counters. Times are in milliseconds.
+        spans = [{
+            'name':     stats.name,
+            'calls':    stats.calls,
+            'total_ms': stats.total * 1e3,
+            'mean_ms':  stats.total / stats.calls * 1e3,
+            'p95_ms':   stats.percentile(0.95) * 1e3,
+            'max_ms':   stats.maximum * 1e3,
+        } for stats in self.stats.values()]
+        spans.sort(key=lambda span: span['total_ms'], reverse=True)
+        return {'spans': spans, 'counters': dict(self.counters)}
+
+    def trace(self):
+        pid = os.getpid()
+        events = [{
+            'name': name,
+            'ph':   'X',
+            'ts':   (start - self.origin) * 1e6,
+            'dur':  duration * 1e6,
+            'pid':  pid,
+            'tid':  tid,
+        } for name, start, duration, tid in self.events]
+        now = (_clock() - self.origin) * 1e6
+        for name, value in sorted(self.counters.items()):
+            events.append({'name': name, 'ph': 'C', 'ts': now, 'pid': pid, 'tid': 0, 'args': {'count': value}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.report()}
+
+    def dump_trace(self, path):
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.trace()))
+        return path
+
+def format_report(report):
+    lines = ['{0:<40} {1:>8} {2:>10} {3:>9} {4:>9}'.format('span', 'calls', 'total ms', 'p95 ms', 'max ms')]
+    for span in report['spans']:
+        lines.append('{name:<40} {calls:>8} {total_ms:>10.2f} {p95_ms:>9.3f} {max_ms:>9.3f}'.format(**span))
+    for name, value in sorted(report['counters'].items()):
+        lines.append('{0:<40} {1:>8}'.format(name, value))
+    return lines
+
+# The process-wide recorder used by the palette.
+
+recorder = Recorder()
+
+def span(name):
+    return recorder.span(name) if recorder.enabled else NULL_SPAN
+
+def count(name, n=1):
+    if recorder.enabled:
+        recorder.count(name, n)
+
+def is_enabled():
+    return recorder.enabled
+
+def enable(enabled=True):
+    recorder.enabled = bool(enabled)
+
+def is_requested(environ=None, defaults=None):
+    # From the environment first, then from a mapping like Glyphs.defaults.
+    value = (os.environ if environ is None else environ).get(ENVIRONMENT_VARIABLE)
+    if value is not None:
+        return value.strip().lower() not in ('', '0', 'no', 'false', 'off')
+    if defaults is not None:
+        try:
+            return bool(defaults[DEFAULTS_KEY])
+        except KeyError:
+            return False
+    return False
+
+def report():
+    return recorder.report()
+
+def dump_trace(path):
+    return recorder.dump_trace(path)
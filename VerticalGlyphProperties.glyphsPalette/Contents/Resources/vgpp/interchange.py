@@ -0,0 +1,328 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import json
+
+from .bulk_edit import TOP_METRICS_KEY_UI, BOTTOM_METRICS_KEY_UI, VERT_ORIGIN_UI, VERT_WIDTH_METRICS_KEY_UI, VERT_WIDTH_VALUE, get_layer_property
+from .capabilities import LayerCapabilities
+from .kerning_groups import TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP
+
+# - Vertical Properties Interchange
+
+# Moves what the palette edits (the vertical kerning groups, the metrics keys, vertOrigin and vertWidth) from one
+# font to another. The file is JSON lines: a header naming the masters, then blocks of up to BLOCK_SIZE glyphs stored
+# column by column, one column per glyph property and one per layer property and master. Strings are dictionary
+# encoded; a block only carries the strings not seen before, and the columns refer to them by index. Both ends
+# hold one block at a time plus the string table, whatever the number of glyphs. An import reads the file twice:
+# once to check every block, so that a broken one doesn't leave half of the changes applied, then again to apply.
+#
+#     {"format": "vgpp-vertical-properties", "version": 1, "masters": ["Light", "Bold"], "glyphFields": [...], "layerFields": [...]}
+#     {"glyphs": ["uni4E00", ...], "strings": ["=uni4E00", ...], "layers": [3, ...], "topKerningGroup": [0, null, ...], "topMetricsKeyUI": [[...], [...]], ...}
+#
+# `layers` is a bitmask per glyph of the masters it has a layer for.
+
+FORMAT  = 'vgpp-vertical-properties'
+VERSION = 1
+
+BLOCK_SIZE = 1024
+
+GLYPH_FIELDS = (TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP)
+# Same properties as bulk_edit.LAYER_PROPERTIES; the value comes last so that it is written after the key that may reset it.
+LAYER_FIELDS = (TOP_METRICS_KEY_UI, BOTTOM_METRICS_KEY_UI, VERT_WIDTH_METRICS_KEY_UI, VERT_ORIGIN_UI, VERT_WIDTH_VALUE)
+
+NUMBER_FIELDS = (VERT_WIDTH_VALUE,)
+
+_VERT_WIDTH_METRICS_KEY_INDEX = LAYER_FIELDS.index(VERT_WIDTH_METRICS_KEY_UI)
+
+class InterchangeError(ValueError):
+    pass
+
+_string_type = type('')
+
+def _normalized(name, value):
+    # None for anything unset: empty strings, and the NSNotFound in disguise of numbers.
+    if name in NUMBER_FIELDS:
+        return value if value is not None and -1000000 < value < 1000000 else None
+    return value or None
+
+def read_glyph_values(glyph):
+    return tuple(getattr(glyph, name) or None for name in GLYPH_FIELDS)
+
+def read_layer_values(layer, capabilities_for=LayerCapabilities.for_layer):
+    if layer is None:
+        return None
+    capabilities = capabilities_for(layer)
+    return tuple(_normalized(name, get_layer_property(layer, capabilities, name)) for name in LAYER_FIELDS)
+
+# - Writer
+
+class VerticalPropertiesWriter(object):
+
+    def __init__(self, stream, master_names, block_size=BLOCK_SIZE):
+        self.stream = stream
+        self.master_names = list(master_names)
+        self.block_size = block_size
+        self.count = 0
+        self._string_indexes = {}
+        self._new_strings = []
+        self._names = []
+        self._masks = []
+        self._glyph_columns = [[] for _ in GLYPH_FIELDS]
+        self._layer_columns = [[[] for _ in self.master_names] for _ in LAYER_FIELDS]
+        self._write({
+            'format': FORMAT,
+            'version': VERSION,
+            'masters': self.master_names,
+            'glyphFields': list(GLYPH_FIELDS),
+            'layerFields': list(LAYER_FIELDS),
+        })
+
+    def _write(self, obj):
+        self.stream.write(json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def _encode(self, value):
+        if value is None:
+            return None
+        index = self._string_indexes.get(value)
+        if index is None:
+            index = self._string_indexes[value] = len(self._string_indexes)
+            self._new_strings.append(value)
+        return index
+
+    def add(self, glyph_name, glyph_values, layer_values):
+        # `glyph_values` as from read_glyph_values(), `layer_values` a read_layer_values() result per master.
+        for column, value in zip(self._glyph_columns, glyph_values):
+            column.append(self._encode(value))
+        mask = 0
+        for i, values in enumerate(layer_values):
+            if values is not None:
+                mask |= 1 << i
+            for name, columns, value in zip(LAYER_FIELDS, self._layer_columns, values or (None,) * len(LAYER_FIELDS)):
+                columns[i].append(value if name in NUMBER_FIELDS else self._encode(value))
+        self._names.append(glyph_name)
+        self._masks.append(mask)
+        self.count += 1
+        if len(self._names) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        if not self._names:
+            return
+        block = {'glyphs': self._names, 'strings': self._new_strings, 'layers': self._masks}
+        for name, column in zip(GLYPH_FIELDS, self._glyph_columns):
+            block[name] = column
+        for name, columns in zip(LAYER_FIELDS, self._layer_columns):
+            block[name] = columns
+        self._write(block)
+        self._new_strings = []
+        self._names = []
+        self._masks = []
+        self._glyph_columns = [[] for _ in GLYPH_FIELDS]
+        self._layer_columns = [[[] for _ in self.master_names] for _ in LAYER_FIELDS]
+
+    def close(self):
+        self.flush()
+
+def export_vertical_properties(stream, font, block_size=BLOCK_SIZE, capabilities_for=LayerCapabilities.for_layer):
+    # Writes every glyph of the font in its order. Returns the number of glyphs written.
+    master_ids = [master.id for master in font.masters]
+    writer = VerticalPropertiesWriter(stream, [master.name for master in font.masters], block_size)
+    for glyph in font.glyphs:
+        layers = glyph.layers
+        writer.add(glyph.name, read_glyph_values(glyph), [read_layer_values(layers[master_id], capabilities_for) for master_id in master_ids])
+    writer.close()
+    return writer.count
+
+# - Reader
+
+class VerticalPropertiesReader(object):
+
+    # Iterating yields (glyph name, glyph values, layer values per master) with the values in the order of
+    # GLYPH_FIELDS and LAYER_FIELDS, and None for the masters the glyph has no layer in.
+
+    def __init__(self, stream):
+        self.stream = stream
+        line = stream.readline()
+        try:
+            header = json.loads(line)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != FORMAT:
+            raise InterchangeError('Not a vertical properties file')
+        if header.get('version') != VERSION:
+            raise InterchangeError('Unsupported version {0}'.format(header.get('version')))
+        self.masters = header['masters']
+
+    def __iter__(self):
+        # Columns unknown to this version are skipped, missing ones read as None. A block is decoded and checked
+        # as a whole before any of its glyphs is yielded.
+        for records in self._blocks(self._decode_block):
+            for record in records:
+                yield record
+
+    def check(self):
+        # Reads the rest of the stream, raising InterchangeError at the first broken block. Returns the number of
+        # glyphs. The columns are decoded as for iterating, without putting the records together.
+        return sum(len(names) for names, _, _, _ in self._blocks(self._decode_columns))
+
+    def _blocks(self, decode):
+        strings = []
+        for line_number, line in enumerate(self.stream, 2):
+            if not line.strip():
+                continue
+            try:
+                decoded = decode(json.loads(line), strings)
+            except (ValueError, KeyError, TypeError, IndexError):
+                raise InterchangeError('Broken block at line {0}'.format(line_number))
+            yield decoded
+
+    def _decode_block(self, block, strings):
+        names, masks, glyph_columns, layer_columns = self._decode_columns(block, strings)
+        glyph_rows = list(zip(*glyph_columns))
+        layer_rows = [list(zip(*[columns[m] for columns in layer_columns])) for m in range(len(self.masters))]
+        records = []
+        for i, glyph_name in enumerate(names):
+            layer_values = [rows[i] if masks[i] & (1 << m) else None for m, rows in enumerate(layer_rows)]
+            records.append((glyph_name, glyph_rows[i], layer_values))
+        return records
+
+    def _decode_columns(self, block, strings):
+        # Returns the glyph names, the layer masks, the glyph columns and the layer columns per master, decoded.
+        master_count = len(self.masters)
+        new_strings = block['strings']
+        if not all(isinstance(string, _string_type) for string in new_strings):
+            raise TypeError('strings')
+        strings.extend(new_strings)
+        names = block['glyphs']
+        masks = block['layers']
+        count = len(names)
+        if len(masks) != count or not all(isinstance(name, _string_type) for name in names):
+            raise ValueError('glyphs')
+        if not all(isinstance(mask, int) and not isinstance(mask, bool) for mask in masks):
+            raise TypeError('layers')
+        def string_at(index):
+            if index is None:
+                return None
+            if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+                raise TypeError(index)
+            return strings[index]
+        def number(value):
+            if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool)):
+                raise TypeError(value)
+            return value
+        def decoded(column, decode):
+            if column is None:
+                return [None] * count
+            if len(column) < count:
+                raise IndexError(len(column))
+            return [decode(value) for value in column[:count]]
+        glyph_columns = [decoded(block.get(name) or None, string_at) for name in GLYPH_FIELDS]
+        layer_columns = []
+        for name in LAYER_FIELDS:
+            columns = block.get(name) or [None] * master_count
+            decode = number if name in NUMBER_FIELDS else string_at
+            layer_columns.append([decoded(columns[m], decode) for m in range(master_count)])
+        return names, masks, glyph_columns, layer_columns
+
+# - Import
+
+def match_masters(source_names, target_masters):
+    # The id of the target master for each source master, or None. By name first, then by position.
+    target_ids = [master.id for master in target_masters]
+    by_name = dict((master.name, master.id) for master in reversed(list(target_masters)))
+    matched = [by_name.get(name) for name in source_names]
+    taken = set(master_id for master_id in matched if master_id is not None)
+    for i, master_id in enumerate(matched):
+        if master_id is None and i < len(target_ids) and target_ids[i] not in taken:
+            matched[i] = target_ids[i]
+            taken.add(target_ids[i])
+    return matched
+
+def layer_changes(source, target):
+    # The properties of `source` that differ from `target`, in LAYER_FIELDS order. A vertical width that follows
+    # from a metrics key is left to the key.
+    changes = []
+    for name, source_value, target_value in zip(LAYER_FIELDS, source, target):
+        if name == VERT_WIDTH_VALUE:
+            if source[_VERT_WIDTH_METRICS_KEY_INDEX] is not None:
+                continue
+            # Resetting the key of the target resets the value behind it as well, so the value is written again then.
+            if source_value == target_value and target[_VERT_WIDTH_METRICS_KEY_INDEX] is None:
+                continue
+        elif source_value == target_value:
+            continue
+        changes.append((name, source_value))
+    return changes
+
+class VerticalPropertiesDiff(object):
+
+    # Iterating compares the records of a reader to the font and yields ([layer], values) for every layer or glyph
+    # that differs, ready for bulk_edit.apply_vertical_properties(). Glyphs missing from the font are counted and
+    # skipped; so are the layers of masters that don't match any master of the font, and the kerning groups of
+    # glyphs without any layer to apply them through.
+
+    def __init__(self, reader, font, capabilities_for=LayerCapabilities.for_layer):
+        self.reader = reader
+        self.font = font
+        self.capabilities_for = capabilities_for
+        self.master_ids = match_masters(reader.masters, font.masters)
+        self.records = 0
+        self.changed_records = 0
+        self.missing_glyphs = 0
+        self.missing_layers = 0
+        self.skipped_groups = 0
+
+    @property
+    def unmatched_masters(self):
+        return [name for name, master_id in zip(self.reader.masters, self.master_ids) if master_id is None]
+
+    def __iter__(self):
+        glyphs = self.font.glyphs
+        for glyph_name, glyph_values, layer_values in self.reader:
+            self.records += 1
+            glyph = glyphs[glyph_name]
+            if glyph is None:
+                self.missing_glyphs += 1
+                continue
+            edits = []
+            first_layer = None
+            for master_id, source in zip(self.master_ids, layer_values):
+                if master_id is None or source is None:
+                    continue
+                layer = glyph.layers[master_id]
+                if layer is None:
+                    self.missing_layers += 1
+                    continue
+                first_layer = first_layer or layer
+                changes = layer_changes(source, read_layer_values(layer, self.capabilities_for))
+                if changes:
+                    edits.append(([layer], dict(changes)))
+            glyph_changes = [(name, value) for name, value, current in zip(GLYPH_FIELDS, glyph_values, read_glyph_values(glyph)) if value != current]
+            if glyph_changes:
+                # The kerning groups go to the glyph of the layers, through any layer when no master matched.
+                if edits:
+                    edits[0][1].update(glyph_changes)
+                else:
+                    layer = first_layer if first_layer is not None else next(iter(glyph.layers), None)
+                    if layer is not None:
+                        edits.append(([layer], dict(glyph_changes)))
+                    else:
+                        self.skipped_groups += 1
+            if edits:
+                self.changed_records += 1
+            for edit in edits:
+                yield edit
+
+def format_summary(diff, result=None):
+    lines = ['{0} glyphs read, {1} changed'.format(diff.records, diff.changed_records)]
+    if result is not None and result.changes:
+        lines.append(', '.join('{0} {1}'.format(count, name) for name, count in sorted(result.changes.items())))
+    if diff.missing_glyphs:
+        lines.append('{0} glyphs not in the font'.format(diff.missing_glyphs))
+    if diff.missing_layers:
+        lines.append('{0} layers not in the font'.format(diff.missing_layers))
+    if diff.skipped_groups:
+        lines.append('{0} glyphs without a layer for their kerning groups'.format(diff.skipped_groups))
+    if diff.unmatched_masters:
+        lines.append('no master for {0}'.format(', '.join(diff.unmatched_masters)))
+    return lines
@@ -0,0 +1,125 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from bisect import bisect_left
+
+# - Vertical Kerning Group Index
+
+# Maps every vertical kerning group to its members and back, maintained glyph by glyph so that
+# completion, member counts and selecting a whole group don't need to read the groups of font.glyphs.
+# With a change stamp, refresh() re-reads only the glyphs that changed since, by whatever means.
+
+TOP_KERNING_GROUP    = 'topKerningGroup'
+BOTTOM_KERNING_GROUP = 'bottomKerningGroup'
+
+SIDES = (TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP)
+
+class VerticalGroupIndex(object):
+
+    def __init__(self, key=id):
+        self.key = key
+        self._group_of = dict((side, {}) for side in SIDES)
+        self._members = dict((side, {}) for side in SIDES)
+        self._sorted_groups = dict((side, None) for side in SIDES)
+        self._stamps = {}
+
+    @classmethod
+    def from_glyphs(cls, glyphs, key=id, change_stamp=None):
+        index = cls(key=key)
+        if change_stamp:
+            index.refresh(glyphs, change_stamp)
+        else:
+            for glyph in glyphs:
+                index.refresh_glyph(glyph)
+        return index
+
+    def refresh(self, glyphs, change_stamp):
+        # Re-reads the glyphs that are new or whose change stamp moved, and drops the glyphs that are gone.
+        # Returns the number of glyphs read.
+        key = self.key
+        stamps = self._stamps
+        seen = set()
+        count = 0
+        for glyph in glyphs:
+            glyph_key = key(glyph)
+            seen.add(glyph_key)
+            stamp = change_stamp(glyph)
+            if glyph_key in stamps and stamps[glyph_key] == stamp:
+                continue
+            self.refresh_glyph(glyph)
+            stamps[glyph_key] = stamp
+            count += 1
+        for glyph_key in [glyph_key for glyph_key in stamps if glyph_key not in seen]:
+            del stamps[glyph_key]
+            self._forget(glyph_key)
+        return count
+
+    def refresh_glyph(self, glyph):
+        # Re-reads both groups of the glyph.
+        for side in SIDES:
+            self.assign(glyph, side, getattr(glyph, side))
+
+    def assign(self, glyph, side, group):
+        group = group or None
+        glyph_key = self.key(glyph)
+        group_of = self._group_of[side]
+        previous = group_of.get(glyph_key)
+        if previous == group:
+            if group is not None:
+                # Keep the latest wrapper around.
+                self._members[side][group][glyph_key] = glyph
+            return
+        members = self._members[side]
+        if previous is not None:
+            del group_of[glyph_key]
+            previous_members = members[previous]
+            del previous_members[glyph_key]
+            if not previous_members:
+                del members[previous]
+                self._sorted_groups[side] = None
+        if group is not None:
+            group_of[glyph_key] = group
+            if group not in members:
+                members[group] = {}
+                self._sorted_groups[side] = None
+            members[group][glyph_key] = glyph
+
+    def remove_glyph(self, glyph):
+        self._stamps.pop(self.key(glyph), None)
+        self._forget(self.key(glyph))
+
+    def _forget(self, glyph_key):
+        for side in SIDES:
+            group = self._group_of[side].pop(glyph_key, None)
+            if group is None:
+                continue
+            members = self._members[side]
+            del members[group][glyph_key]
+            if not members[group]:
+                del members[group]
+                self._sorted_groups[side] = None
+
+    def group_of(self, glyph, side):
+        return self._group_of[side].get(self.key(glyph))
+
+    def members(self, side, group):
+        return list(self._members[side].get(group, {}).values())
+
+    def count(self, side, group):
+        return len(self._members[side].get(group, ()))
+
+    def groups(self, side):
+        sorted_groups = self._sorted_groups[side]
+        if sorted_groups is None:
+            sorted_groups = self._sorted_groups[side] = sorted(self._members[side])
+        return sorted_groups
+
+    def complete(self, side, prefix, limit=None):
+        # Existing group names starting with the prefix, in order.
+        groups = self.groups(side)
+        completions = []
+        for i in range(bisect_left(groups, prefix), len(groups)):
+            if not groups[i].startswith(prefix) or (limit is not None and len(completions) >= limit):
+                break
+            completions.append(groups[i])
+        return completions
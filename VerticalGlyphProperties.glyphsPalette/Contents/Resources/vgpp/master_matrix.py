@@ -0,0 +1,250 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from array import array
+
+from .capabilities import LayerCapabilities
+from .metrics_keys import TSB, BSB, VERT_WIDTH
+
+# - Master Matrix
+
+# The palette only ever looks at the layers of the selected master, so vertical metrics drifting apart between
+# masters go unnoticed until someone clicks through all of them. This is a glyph x master matrix of vertOrigin,
+# vertWidth, TSB, BSB (array('d'), NaN for missing values) and of which metrics keys are set (array('B') bitmasks),
+# row-major with one row per glyph. Rows are written one glyph at a time, and re-read only when the glyph's change
+# stamp moves, so the checks below look at the arrays and never walk the layers again.
+
+VERT_ORIGIN = 'vertOrigin'
+
+FIELDS = (VERT_ORIGIN, VERT_WIDTH, TSB, BSB)
+
+TOP_METRICS_KEY        = 1 << 0
+BOTTOM_METRICS_KEY     = 1 << 1
+VERT_WIDTH_METRICS_KEY = 1 << 2
+HAS_LAYER              = 1 << 7
+
+KEY_BITS = ((TSB, TOP_METRICS_KEY), (BSB, BOTTOM_METRICS_KEY), (VERT_WIDTH, VERT_WIDTH_METRICS_KEY))
+
+MISSING_KEY   = 'missing-key'
+NON_MONOTONIC = 'non-monotonic'
+
+NAN = float('nan')
+
+def _number(value):
+    # Anything out of this range is a NSNotFound in disguise.
+    if value is None or not -1000000 < value < 1000000:
+        return NAN
+    return float(value)
+
+def key_state(top_metrics_key, bottom_metrics_key, vert_width_metrics_key):
+    state = HAS_LAYER
+    for key, bit in zip((top_metrics_key, bottom_metrics_key, vert_width_metrics_key), (TOP_METRICS_KEY, BOTTOM_METRICS_KEY, VERT_WIDTH_METRICS_KEY)):
+        if key:
+            state |= bit
+    return state
+
+def read_layer_row(layer):
+    # (vertOrigin, vertWidth, TSB, BSB, key state) of a GSLayer, or of a headless layer alike.
+    if layer is None:
+        return None
+    methods = layer.pyobjc_instanceMethods
+    return (methods.vertOrigin(), methods.vertWidth(), methods.TSB(), methods.BSB(), key_state(
+        methods.topMetricsKeyUI(),
+        methods.bottomMetricsKeyUI(),
+        LayerCapabilities.for_layer(layer).vert_width_metrics_key_ui(layer),
+    ))
+
+def _direction(values):
+    # 1 if the values only go up, -1 if they only go down, 0 if they stay put and None if they go both ways.
+    direction = 0
+    previous = None
+    for value in values:
+        if value != value:
+            continue
+        if previous is not None and value != previous:
+            step = 1 if value > previous else -1
+            if direction and step != direction:
+                return None
+            direction = step
+        previous = value
+    return direction
+
+class MasterMatrix(object):
+
+    def __init__(self, masters, read_row=None, change_stamp=None):
+        # `masters` is a sequence of (master id, position on the weight axis). `read_row(glyph, master_id)` returns
+        # (vertOrigin, vertWidth, TSB, BSB, key state) or None if the glyph has no layer for the master.
+        self.master_ids = [master_id for master_id, _ in masters]
+        self.positions = [position for _, position in masters]
+        self.read_row = read_row or (lambda glyph, master_id: read_layer_row(glyph.layers[master_id]))
+        self.change_stamp = change_stamp
+        self._columns = dict((master_id, column) for column, master_id in enumerate(self.master_ids))
+        # Master columns in weight order, for the monotonicity check.
+        self._by_weight = sorted(range(len(self.master_ids)), key=lambda column: self.positions[column])
+        self._rows = {}
+        self._stamps = {}
+        self.glyph_names = []
+        self.values = dict((name, array('d')) for name in FIELDS)
+        self.keys = array('B')
+        # Findings per glyph, recomputed for the rows written since the last query.
+        self._findings = {}
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self.glyph_names)
+
+    def __contains__(self, glyph_name):
+        return glyph_name in self._rows
+
+    def _offset(self, glyph_name, master_id):
+        row = self._rows.get(glyph_name)
+        if row is None:
+            row = self._rows[glyph_name] = len(self.glyph_names)
+            self.glyph_names.append(glyph_name)
+            width = len(self.master_ids)
+            for name in FIELDS:
+                self.values[name].extend([NAN] * width)
+            self.keys.extend([0] * width)
+        self._dirty.add(glyph_name)
+        return row * len(self.master_ids) + self._columns[master_id]
+
+    # Writing
+
+    def set(self, glyph_name, master_id, row):
+        # `row` as returned by `read_row`, None for a missing layer.
+        offset = self._offset(glyph_name, master_id)
+        if row is None:
+            for name in FIELDS:
+                self.values[name][offset] = NAN
+            self.keys[offset] = 0
+            return
+        for name, value in zip(FIELDS, row[:4]):
+            self.values[name][offset] = _number(value)
+        self.keys[offset] = row[4]
+
+    def set_value(self, glyph_name, master_id, name, value):
+        self.values[name][self._offset(glyph_name, master_id)] = _number(value)
+
+    def set_key(self, glyph_name, master_id, metric, key):
+        offset = self._offset(glyph_name, master_id)
+        bit = dict(KEY_BITS)[metric]
+        self.keys[offset] = (self.keys[offset] | bit) if key else (self.keys[offset] & ~bit)
+
+    def read_glyph(self, glyph):
+        for master_id in self.master_ids:
+            self.set(glyph.name, master_id, self.read_row(glyph, master_id))
+        if self.change_stamp:
+            self._stamps[glyph.name] = self.change_stamp(glyph)
+
+    def invalidate(self, glyph_name):
+        # The next refresh re-reads the glyph.
+        self._stamps.pop(glyph_name, None)
+
+    def refresh(self, glyphs):
+        # Re-reads the glyphs that are new or whose change stamp moved, and drops the rows of the glyphs that are gone.
+        # Returns the number of glyphs read.
+        seen = set()
+        count = 0
+        for glyph in glyphs:
+            name = glyph.name
+            seen.add(name)
+            if name not in self._stamps or not self.change_stamp or self._stamps[name] != self.change_stamp(glyph):
+                self.read_glyph(glyph)
+                count += 1
+        for name in [name for name in self.glyph_names if name not in seen]:
+            self.remove(name)
+        return count
+
+    def remove(self, glyph_name):
+        row = self._rows.pop(glyph_name, None)
+        if row is None:
+            return
+        width = len(self.master_ids)
+        for name in FIELDS:
+            del self.values[name][row * width:(row + 1) * width]
+        del self.keys[row * width:(row + 1) * width]
+        del self.glyph_names[row]
+        for name in self.glyph_names[row:]:
+            self._rows[name] -= 1
+        self._stamps.pop(glyph_name, None)
+        self._findings.pop(glyph_name, None)
+        self._dirty.discard(glyph_name)
+
+    # Reading
+
+    def _row_slice(self, glyph_name):
+        row = self._rows[glyph_name]
+        width = len(self.master_ids)
+        return slice(row * width, (row + 1) * width)
+
+    def value(self, glyph_name, master_id, name):
+        value = self.values[name][self._rows[glyph_name] * len(self.master_ids) + self._columns[master_id]]
+        return value if value == value else None
+
+    def row(self, glyph_name, name):
+        # The values of every master, in master order.
+        return [value if value == value else None for value in self.values[name][self._row_slice(glyph_name)]]
+
+    def key_states(self, glyph_name):
+        return list(self.keys[self._row_slice(glyph_name)])
+
+    # Checks
+
+    def _check(self, glyph_name):
+        findings = []
+        master_ids = self.master_ids
+        states = self.keys[self._row_slice(glyph_name)]
+        present = [column for column, state in enumerate(states) if state & HAS_LAYER]
+        for metric, bit in KEY_BITS:
+            with_key = [master_ids[column] for column in present if states[column] & bit]
+            if with_key and len(with_key) < len(present):
+                findings.append({
+                    'kind':    MISSING_KEY,
+                    'glyph':   glyph_name,
+                    'metric':  metric,
+                    'with':    with_key,
+                    'without': [master_ids[column] for column in present if not states[column] & bit],
+                })
+        if len(present) > 2:
+            by_weight = [column for column in self._by_weight if states[column] & HAS_LAYER]
+            for name in FIELDS:
+                values = self.values[name][self._row_slice(glyph_name)]
+                if _direction(values[column] for column in by_weight) is None:
+                    findings.append({
+                        'kind':     NON_MONOTONIC,
+                        'glyph':    glyph_name,
+                        'property': name,
+                        'values':   [(master_ids[column], values[column] if values[column] == values[column] else None) for column in by_weight],
+                    })
+        return findings
+
+    def findings(self, kinds=None):
+        # Yields the interpolation problems in glyph order, optionally only the given kinds.
+        for glyph_name in self._dirty:
+            self._findings[glyph_name] = self._check(glyph_name)
+        self._dirty.clear()
+        for glyph_name in self.glyph_names:
+            for finding in self._findings.get(glyph_name, ()):
+                if kinds is None or finding['kind'] in kinds:
+                    yield finding
+
+    def findings_of(self, glyph_name):
+        if glyph_name in self._dirty:
+            self._findings[glyph_name] = self._check(glyph_name)
+            self._dirty.discard(glyph_name)
+        return list(self._findings.get(glyph_name, ()))
+
+def master_matrix_from_headless_font(font):
+    # The first axis is the weight axis in both file formats.
+    masters = [(master.id, master.axes[0] if master.axes else 0) for master in font.masters]
+    matrix = MasterMatrix(masters)
+    matrix.refresh(font.glyphs)
+    return matrix
+
+def format_finding(finding, name_of_master=None):
+    name_of_master = name_of_master or (lambda master_id: master_id)
+    if finding['kind'] == MISSING_KEY:
+        return '{0}: {1} key only in {2}, not in {3}'.format(
+            finding['glyph'], finding['metric'], ', '.join(map(name_of_master, finding['with'])), ', '.join(map(name_of_master, finding['without'])))
+    return '{0}: {1} goes up and down across weights ({2})'.format(
+        finding['glyph'], finding['property'], ', '.join('{0} {1}'.format(name_of_master(master_id), '-' if value is None else '{0:g}'.format(value)) for master_id, value in finding['values']))
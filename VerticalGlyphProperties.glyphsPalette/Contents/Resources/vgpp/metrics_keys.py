@@ -0,0 +1,208 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import re
+
+# - Metrics Key Evaluation
+
+# A small evaluator for the vertical metrics keys, e.g. '=H', '=|n', '=uni4E00+20', '=H*0.5' or '=40'.
+# It computes the value a key asks for from the metrics of the referenced glyphs, so telling whether
+# a layer is in sync doesn't need a copy of the layer to run - syncTopMetrics and friends on.
+
+TSB        = 'TSB'
+BSB        = 'BSB'
+VERT_WIDTH = 'vertWidth'
+
+OPPOSITE_METRIC = {TSB: BSB, BSB: TSB, VERT_WIDTH: VERT_WIDTH}
+
+# Values within half a unit are considered equal, which is the rounding the host applies when syncing.
+# Inclusive: a key giving 50.5 is in sync whether the host rounded it to 50 or to 51.
+SYNC_TOLERANCE = 0.5
+
+class MetricsKeyError(ValueError):
+    pass
+
+_TOKEN_PATTERN = re.compile(r'\s*(?:(?P<number>\d+(?:\.\d*)?|\.\d+)|(?P<name>[A-Za-z_][A-Za-z0-9_.]*(?:-[A-Za-z0-9_.]+)*)|(?P<operator>[-+*/()|]))')
+
+# Names with a hyphen in them, e.g. 'a-cy' or 'uni4E00-20'. Whether the hyphen is a minus depends on the font.
+_HYPHENATED_NAME_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_.]*(?:-[A-Za-z0-9_.]+)+')
+_NAME_START_PATTERN = re.compile(r'[A-Za-z_]')
+
+def _hyphenated_names(text):
+    # Every name with a hyphen the key could refer to: 'a-cy-x' gives 'a-cy', 'a-cy-x' and 'cy-x'.
+    names = []
+    for match in _HYPHENATED_NAME_PATTERN.finditer(text):
+        parts = match.group().split('-')
+        for start in range(len(parts) - 1):
+            if _NAME_START_PATTERN.match(parts[start]):
+                names.extend('-'.join(parts[start:end]) for end in range(start + 2, len(parts) + 1))
+    return tuple(names)
+
+def _tokenize(text, glyph_names=frozenset()):
+    # Like Glyphs, a name runs up to the longest hyphenated name in `glyph_names`; otherwise it ends at the
+    # first hyphen, which is a minus: '=a-cy' refers to a-cy if the font has it and is a minus cy otherwise.
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise MetricsKeyError('Unexpected character in metrics key: {0!r}'.format(text[position:]))
+        position = match.end()
+        if match.group('number'):
+            tokens.append(('number', float(match.group('number'))))
+        elif match.group('name'):
+            name = match.group('name')
+            if '-' in name:
+                parts = name.split('-')
+                count = len(parts)
+                while count > 1 and '-'.join(parts[:count]) not in glyph_names:
+                    count -= 1
+                name = '-'.join(parts[:count])
+                position = match.start('name') + len(name)
+            tokens.append(('name', name))
+        else:
+            tokens.append(('operator', match.group('operator')))
+    return tokens
+
+class _Parser(object):
+
+    # expression := term (('+' | '-') term)*
+    # term       := factor (('*' | '/') factor)*
+    # factor     := number | ['|'] name | '|' | '(' expression ')' | '-' factor
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        expression = self.expression()
+        if self.position != len(self.tokens):
+            raise MetricsKeyError('Unexpected token in metrics key: {0!r}'.format(self.peek()[1]))
+        return expression
+
+    def expression(self):
+        node = self.term()
+        while self.peek() in (('operator', '+'), ('operator', '-')):
+            node = (self.take()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() in (('operator', '*'), ('operator', '/')):
+            node = (self.take()[1], node, self.factor())
+        return node
+
+    def factor(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return ('number', value)
+        if kind == 'name':
+            return ('ref', value, False)
+        if (kind, value) == ('operator', '|'):
+            if self.peek()[0] == 'name':
+                return ('ref', self.take()[1], True)
+            # A bare '|' refers to the opposite side of the glyph itself.
+            return ('ref', None, True)
+        if (kind, value) == ('operator', '('):
+            node = self.expression()
+            if self.take() != ('operator', ')'):
+                raise MetricsKeyError('Unbalanced parenthesis in metrics key')
+            return node
+        if (kind, value) == ('operator', '-'):
+            return ('neg', self.factor())
+        raise MetricsKeyError('Unexpected end of metrics key' if kind is None else 'Unexpected token in metrics key: {0!r}'.format(value))
+
+# Parsed keys by key, then by which of its hyphenated names are glyphs. Cleared when it grows past the limit.
+_parsed_keys = {}
+PARSED_KEYS_LIMIT = 10000
+
+def glyph_name_test(font):
+    # For the `is_glyph_name` arguments below.
+    glyphs = font.glyphs
+    return lambda name: glyphs[name] is not None
+
+def parse_metrics_key(key, is_glyph_name=None):
+    # Returns the expression tree of the key, or None if there is no key. Parsed keys are memoized
+    # since the same handful of keys are shared by thousands of glyphs in CJK fonts.
+    # `is_glyph_name(name)` tells the names with a hyphen apart from a subtraction; without it, a hyphen is a minus.
+    entry = _parsed_keys.get(key)
+    if entry is None:
+        text = (key or '').strip()
+        if not text:
+            return None
+        if not text.startswith('=') or text.startswith('=='):
+            raise MetricsKeyError('Unsupported metrics key: {0!r}'.format(key))
+        if len(_parsed_keys) >= PARSED_KEYS_LIMIT:
+            _parsed_keys.clear()
+        entry = _parsed_keys[key] = (_hyphenated_names(text), {})
+    names, expressions = entry
+    glyph_names = tuple(name for name in names if is_glyph_name(name)) if names and is_glyph_name else ()
+    try:
+        return expressions[glyph_names]
+    except KeyError:
+        pass
+    expression = expressions[glyph_names] = _Parser(_tokenize(key.strip()[1:], frozenset(glyph_names))).parse()
+    return expression
+
+def iter_references(node):
+    # Yields (glyph name, is_opposite) for every glyph the expression refers to. The name is None for the glyph itself.
+    if node is None or node[0] == 'number':
+        return
+    if node[0] == 'ref':
+        yield node[1], node[2]
+    elif node[0] == 'neg':
+        for reference in iter_references(node[1]):
+            yield reference
+    else:
+        for reference in iter_references(node[1]):
+            yield reference
+        for reference in iter_references(node[2]):
+            yield reference
+
+def metrics_key_references(key, is_glyph_name=None):
+    return list(iter_references(parse_metrics_key(key, is_glyph_name)))
+
+def _evaluate(node, metric, lookup):
+    kind = node[0]
+    if kind == 'ref':
+        return lookup(node[1], OPPOSITE_METRIC[metric] if node[2] else metric)
+    if kind == 'number':
+        return node[1]
+    if kind == 'neg':
+        value = _evaluate(node[1], metric, lookup)
+        return -value if value is not None else None
+    lhs = _evaluate(node[1], metric, lookup)
+    rhs = _evaluate(node[2], metric, lookup)
+    if lhs is None or rhs is None:
+        return None
+    if kind == '+':
+        return lhs + rhs
+    if kind == '-':
+        return lhs - rhs
+    if kind == '*':
+        return lhs * rhs
+    return lhs / rhs if rhs else None
+
+def evaluate_metrics_key(key, metric, lookup, is_glyph_name=None):
+    # `lookup(glyph_name, metric)` returns the current value of the metric in the referenced glyph
+    # (glyph_name is None for the glyph itself), or None if it doesn't exist.
+    # Returns None when the key can't be resolved, in which case syncing wouldn't change anything.
+    expression = parse_metrics_key(key, is_glyph_name)
+    if expression is None:
+        return None
+    return _evaluate(expression, metric, lookup)
+
+def metrics_key_is_in_sync(key, metric, value, lookup, is_glyph_name=None):
+    expected = evaluate_metrics_key(key, metric, lookup, is_glyph_name)
+    if expected is None or value is None:
+        return True
+    return abs(expected - value) <= SYNC_TOLERANCE
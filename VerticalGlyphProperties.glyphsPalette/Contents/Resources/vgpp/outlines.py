@@ -0,0 +1,96 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+
+# - Outline Geometry
+
+# Just enough geometry to derive the vertical sidebearings outside of the app: exact bounds of contours
+# made of lines and cubic curves, and the relation between bounds and the vertical metrics.
+# Nodes are (x, y, type) with type 'l' (line), 'c' (curve), 'q' (quadratic curve) or 'o' (off-curve).
+
+OFF_CURVE = 'o'
+
+def _cubic_extrema(p0, p1, p2, p3):
+    # Values of the cubic Bezier at the roots of its derivative within (0, 1).
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    if abs(a) < 1e-12:
+        roots = [-c / b] if abs(b) > 1e-12 else []
+    else:
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            roots = []
+        else:
+            root = discriminant ** 0.5
+            roots = [(-b + root) / (2 * a), (-b - root) / (2 * a)]
+    values = []
+    for t in roots:
+        if 0 < t < 1:
+            u = 1 - t
+            values.append(u * u * u * p0 + 3 * u * u * t * p1 + 3 * u * t * t * p2 + t * t * t * p3)
+    return values
+
+def iter_cubic_segments(nodes):
+    # Yields the indexes (start, control1, control2, end) of every cubic segment of a contour, wrapping around.
+    count = len(nodes)
+    if count < 4:
+        return
+    for i, node in enumerate(nodes):
+        if node[2] == 'c':
+            if nodes[i - 1][2] == OFF_CURVE and nodes[i - 2][2] == OFF_CURVE and nodes[i - 3][2] != OFF_CURVE:
+                yield (i - 3) % count, (i - 2) % count, (i - 1) % count, i
+
+def contour_bounds(nodes):
+    # (xMin, yMin, xMax, yMax) of a contour, or None if it has no nodes.
+    # Off-curve points of anything but a cubic segment count as they are, which errs on the larger side.
+    if not nodes:
+        return None
+    on_curve = [node for node in nodes if node[2] != OFF_CURVE] or nodes
+    xs = [node[0] for node in on_curve]
+    ys = [node[1] for node in on_curve]
+    in_cubic = set()
+    for i0, i1, i2, i3 in iter_cubic_segments(nodes):
+        in_cubic.add(i1)
+        in_cubic.add(i2)
+        p0, p1, p2, p3 = nodes[i0], nodes[i1], nodes[i2], nodes[i3]
+        xs.extend(_cubic_extrema(p0[0], p1[0], p2[0], p3[0]))
+        ys.extend(_cubic_extrema(p0[1], p1[1], p2[1], p3[1]))
+    for i, node in enumerate(nodes):
+        if node[2] == OFF_CURVE and i not in in_cubic:
+            xs.append(node[0])
+            ys.append(node[1])
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def union_bounds(bounds):
+    bounds = [b for b in bounds if b is not None]
+    if not bounds:
+        return None
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+def transform_bounds(bounds, transform):
+    # Bounds of the transformed box; `transform` is (a, b, c, d, tx, ty) as in an affine matrix.
+    if bounds is None:
+        return None
+    a, b, c, d, tx, ty = transform
+    corners = [(x, y) for x in (bounds[0], bounds[2]) for y in (bounds[1], bounds[3])]
+    xs = [a * x + c * y + tx for x, y in corners]
+    ys = [b * x + d * y + ty for x, y in corners]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+# - Vertical Metrics
+
+# The vertical origin is stored as an offset down from the ascender, and the vertical width defaults to
+# the distance between the ascender and the descender.
+
+def default_vert_width(ascender, descender):
+    return ascender - descender
+
+def origin_y(ascender, vert_origin):
+    return ascender - (vert_origin or 0.0)
+
+def vertical_sidebearings(y_min, y_max, ascender, descender, vert_origin=None, vert_width=None):
+    # Returns (TSB, BSB).
+    top = origin_y(ascender, vert_origin)
+    bottom = top - (vert_width if vert_width is not None else default_vert_width(ascender, descender))
+    return (top - y_max, y_min - bottom)
@@ -0,0 +1,83 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+
+# - Update Scheduling
+
+class CoalescingScheduler(object):
+
+    # Merges bursts of interface update callbacks into a single refresh.
+    # `schedule()` is expected to make the host call `flush()` once on its next idle tick, e.g. with
+    # - [NSObject performSelector:withObject:afterDelay:] which is also deferred while the mouse is being dragged.
+    # `is_visible()` lets the refresh be skipped entirely while nobody can see the result; the host calls
+    # `resume()` when that may have changed, which schedules the refresh skipped meanwhile, if any.
+
+    def __init__(self, refresh, schedule, is_visible=None):
+        self.refresh = refresh
+        self.schedule = schedule
+        self.is_visible = is_visible
+        self.is_pending = False
+        self.pending_sender = None
+        self.is_skipped = False
+        self.skipped_sender = None
+        self.callbacks_received = 0
+        self.callbacks_coalesced = 0
+        self.callbacks_skipped = 0
+        self.refreshes_performed = 0
+
+    def notify(self, sender):
+        self.callbacks_received += 1
+        if self.is_visible is not None and not self.is_visible():
+            self.callbacks_skipped += 1
+            self._skip(sender)
+            return
+        if self.is_pending:
+            self.callbacks_coalesced += 1
+        self._request(sender)
+
+    def flush(self):
+        if not self.is_pending:
+            return False
+        sender = self.pending_sender
+        self.is_pending = False
+        self.pending_sender = None
+        if self.is_visible is not None and not self.is_visible():
+            self._skip(sender)
+            return False
+        self.refreshes_performed += 1
+        self.refresh(sender)
+        return True
+
+    def resume(self):
+        # Returns True if a skipped refresh has been scheduled.
+        if not self.is_skipped or (self.is_visible is not None and not self.is_visible()):
+            return False
+        self._request(self.skipped_sender)
+        return True
+
+    def cancel(self):
+        self.is_pending = False
+        self.pending_sender = None
+        self.is_skipped = False
+        self.skipped_sender = None
+
+    def _request(self, sender):
+        # The latest sender wins; it reflects the most recent state anyway, skipped ones included.
+        self.pending_sender = sender
+        self.is_skipped = False
+        self.skipped_sender = None
+        if not self.is_pending:
+            self.is_pending = True
+            self.schedule()
+
+    def _skip(self, sender):
+        self.is_skipped = True
+        self.skipped_sender = sender
+
+    def stats(self):
+        return {
+            'callbacks_received':  self.callbacks_received,
+            'callbacks_coalesced': self.callbacks_coalesced,
+            'callbacks_skipped':   self.callbacks_skipped,
+            'refreshes_performed': self.refreshes_performed,
+        }
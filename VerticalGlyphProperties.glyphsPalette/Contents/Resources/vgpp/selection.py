@@ -0,0 +1,126 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from collections import namedtuple
+
+# - Selection Tracking
+
+class SelectionChange(namedtuple('SelectionChange', ('added', 'removed', 'reordered'))):
+
+    # The difference between two consecutive selections. `added` and `removed` hold proxies, not layers.
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed or self.reordered)
+
+NO_CHANGE = SelectionChange((), (), False)
+
+class SelectionTracker(object):
+
+    # Keeps one proxy per selected layer, keyed by layer identity, so that an interface refresh with an unchanged
+    # (or slightly changed) selection doesn't allocate proxies nor (un)register KVO observers again.
+    # `make_proxy(layer)` is called only for layers entering the selection, `release_proxy(proxy)` only for the ones leaving it.
+    # Pass `release=False` to update() to release them later with release(), e.g. once nothing else holds them.
+
+    def __init__(self, make_proxy, release_proxy=None, key=id):
+        self.make_proxy = make_proxy
+        self.release_proxy = release_proxy
+        self.key = key
+        self._proxies = {}
+        self._order = []
+
+    def __len__(self):
+        return len(self._order)
+
+    @property
+    def proxies(self):
+        # Proxies in selection order.
+        proxies = self._proxies
+        return [proxies[k] for k in self._order]
+
+    def proxy_for_layer(self, layer):
+        return self._proxies.get(self.key(layer))
+
+    def update(self, layers, release=True):
+        key = self.key
+        old_proxies = self._proxies
+        old_order = self._order
+        new_proxies = {}
+        new_order = []
+        added = []
+        hits = 0
+        for layer in layers:
+            k = key(layer)
+            if k in new_proxies:
+                continue
+            proxy = old_proxies.get(k)
+            if proxy is None:
+                proxy = self.make_proxy(layer)
+                added.append(proxy)
+            else:
+                hits += 1
+            new_proxies[k] = proxy
+            new_order.append(k)
+        removed = []
+        if hits != len(old_proxies):
+            # Only walk the previous selection when some of its layers are gone.
+            for k in old_order:
+                if k not in new_proxies:
+                    removed.append(old_proxies[k])
+        if not added and not removed:
+            if new_order == old_order:
+                return NO_CHANGE
+            self._order = new_order
+            return SelectionChange((), (), True)
+        self._proxies = new_proxies
+        self._order = new_order
+        if release:
+            self.release(removed)
+        return SelectionChange(tuple(added), tuple(removed), False)
+
+    def release(self, proxies):
+        if self.release_proxy:
+            for proxy in proxies:
+                self.release_proxy(proxy)
+
+    def clear(self, release=True):
+        return self.update((), release)
+
+class GlyphCounter(object):
+
+    # The glyphs of the selected layers, with how many of their layers are selected, so that the glyphs entering
+    # and leaving the selection follow from the layers that do without walking the whole selection again.
+
+    def __init__(self, key=id):
+        self.key = key
+        self._counts = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def reset(self, glyphs):
+        self._counts = {}
+        return self.update(glyphs, ())
+
+    def update(self, added, removed):
+        # Takes the glyphs of the layers added and removed; returns the glyphs (entering, leaving) the selection.
+        key = self.key
+        counts = self._counts
+        entering = []
+        leaving = []
+        for glyph in added:
+            k = key(glyph)
+            entry = counts.get(k)
+            if entry is None:
+                counts[k] = [glyph, 1]
+                entering.append(glyph)
+            else:
+                entry[1] += 1
+        for glyph in removed:
+            k = key(glyph)
+            entry = counts[k]
+            entry[1] -= 1
+            if not entry[1]:
+                del counts[k]
+                leaving.append(glyph)
+        return entering, leaving
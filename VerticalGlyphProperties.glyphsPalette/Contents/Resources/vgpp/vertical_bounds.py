@@ -0,0 +1,323 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from array import array
+from collections import namedtuple
+
+from .outlines import OFF_CURVE, contour_bounds, transform_bounds, union_bounds
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# - Vertical Bounds Engine
+
+# Derives the vertical bounds, TSB and BSB of every layer of a font in one pass, and suggests the vertOrigin
+# which centers the outline in the vertical advance. Few CJK glyphs are exactly centered, so the check only
+# reports the layers whose offset from the centered vertOrigin stands out from the typical one of their group.
+# With NumPy the node coordinates of all layers are packed into flat arrays and reduced per layer; without it
+# the same numbers come out of a plain loop, only slower.
+#
+# Layers come in as LayerOutline records; the contours are lists of (x, y, type) nodes as in vgpp.outlines
+# and the components (key of the referenced layer, (a, b, c, d, tx, ty)).
+
+LayerOutline = namedtuple('LayerOutline', ('key', 'contours', 'components', 'ascender', 'descender', 'vert_origin', 'vert_width'))
+
+VerticalBounds = namedtuple('VerticalBounds', ('key', 'y_min', 'y_max', 'TSB', 'BSB', 'vert_origin', 'vert_width', 'suggested_vert_origin', 'suggested_vert_width'))
+
+NAN = float('nan')
+
+COLUMNS = ('x_min', 'y_min', 'x_max', 'y_max')
+
+# In font units.
+DEFAULT_TOLERANCE = 20.0
+
+# Smaller groups are compared with the typical offset of all the layers instead.
+MIN_GROUP_SIZE = 3
+
+def _float(value):
+    return NAN if value is None else float(value)
+
+class PackedOutlines(object):
+
+    # The nodes of every layer in flat arrays: coordinates, one type character per node, and the offsets of the
+    # first node of every contour and of every layer.
+
+    def __init__(self):
+        self.xs = array('d')
+        self.ys = array('d')
+        self.types = []
+        self.contour_offsets = array('l')
+        self.layer_offsets = array('l')
+        self._count = 0
+
+    def __len__(self):
+        return len(self.layer_offsets)
+
+    def add(self, contours):
+        self.layer_offsets.append(self._count)
+        for nodes in contours:
+            if not nodes:
+                continue
+            xs, ys, types = tuple(zip(*nodes))[:3]
+            self.contour_offsets.append(self._count)
+            self.xs.extend(xs)
+            self.ys.extend(ys)
+            self.types.append(''.join(types))
+            self._count += len(nodes)
+
+    def arrays(self):
+        count = self._count
+        xs = numpy.frombuffer(self.xs, dtype=numpy.float64) if count else numpy.empty(0)
+        ys = numpy.frombuffer(self.ys, dtype=numpy.float64) if count else numpy.empty(0)
+        types = numpy.frombuffer(''.join(self.types).encode('ascii'), dtype='S1') if count else numpy.empty(0, dtype='S1')
+        return xs, ys, types
+
+def _cubic_extrema_arrays(p0, p1, p2, p3):
+    # Values at both roots of the derivative of every segment, NaN where the root isn't within (0, 1).
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        linear = numpy.abs(a) < 1e-12
+        root = numpy.sqrt(b * b - 4 * a * c)
+        t1 = numpy.where(linear, -c / b, (-b + root) / (2 * a))
+        t2 = numpy.where(linear, NAN, (-b - root) / (2 * a))
+        t = numpy.stack((t1, t2), axis=1)
+        t[~((t > 0) & (t < 1))] = NAN
+        u = 1 - t
+        return u * u * u * p0[:, None] + 3 * u * u * t * p1[:, None] + 3 * u * t * t * p2[:, None] + t * t * t * p3[:, None]
+
+def _reduce(function, values, offsets, count):
+    # function.reduceat() per layer, leaving NaN for the layers without any values.
+    result = numpy.full(count, NAN)
+    if not len(values):
+        return result
+    offsets = numpy.asarray(offsets, dtype=numpy.intp)
+    ends = numpy.append(offsets[1:], len(values))
+    present = ends > offsets
+    if present.any():
+        result[present] = function.reduceat(values, offsets[present])
+    return result
+
+def _outline_bounds_numpy(packed):
+    # Same rules as vgpp.outlines.contour_bounds(), for all the contours at once.
+    count = len(packed)
+    xs, ys, types = packed.arrays()
+    node_count = len(xs)
+    bounds = dict((name, numpy.full(count, NAN)) for name in COLUMNS)
+    if not node_count:
+        return bounds
+
+    # The position of every node within its contour, to look back at the previous nodes with wrap around.
+    contour_offsets = numpy.asarray(packed.contour_offsets, dtype=numpy.intp)
+    contour_lengths = numpy.diff(numpy.append(contour_offsets, node_count))
+    starts = numpy.repeat(contour_offsets, contour_lengths)
+    lengths = numpy.repeat(contour_lengths, contour_lengths)
+    index = numpy.arange(node_count)
+    def previous(k):
+        return starts + (index - starts - k) % lengths
+    off_curve = types == OFF_CURVE.encode('ascii')
+    p1, p2, p0 = previous(1), previous(2), previous(3)
+    is_cubic_end = (types == b'c') & (lengths >= 4) & off_curve[p1] & off_curve[p2] & ~off_curve[p0]
+    is_control = numpy.zeros(node_count, dtype=bool)
+    is_control[p1[is_cubic_end]] = True
+    is_control[p2[is_cubic_end]] = True
+    # Off-curve points of the cubic segments are replaced by the extrema of the curves.
+    counted = ~(off_curve & is_control)
+    # Contours made of off-curve points only count them all.
+    has_on_curve = numpy.add.reduceat(~off_curve, contour_offsets) > 0
+    counted |= ~numpy.repeat(has_on_curve, contour_lengths)
+
+    layer_offsets = numpy.asarray(packed.layer_offsets, dtype=numpy.intp)
+    for axis, values in (('x', xs), ('y', ys)):
+        points = numpy.where(counted, values, NAN)
+        bounds[axis + '_min'] = _reduce(numpy.fmin, points, layer_offsets, count)
+        bounds[axis + '_max'] = _reduce(numpy.fmax, points, layer_offsets, count)
+
+    ends = numpy.nonzero(is_cubic_end)[0]
+    if len(ends):
+        layer_of_segment = numpy.searchsorted(layer_offsets, ends, side='right') - 1
+        for axis, values in (('x', xs), ('y', ys)):
+            extrema = _cubic_extrema_arrays(values[p0[ends]], values[p1[ends]], values[p2[ends]], values[ends])
+            low, high = numpy.fmin.reduce(extrema, axis=1), numpy.fmax.reduce(extrema, axis=1)
+            numpy.fmin.at(bounds[axis + '_min'], layer_of_segment, low)
+            numpy.fmax.at(bounds[axis + '_max'], layer_of_segment, high)
+    return bounds
+
+def _outline_bounds_python(layers):
+    bounds = dict((name, array('d')) for name in COLUMNS)
+    for layer in layers:
+        layer_bounds = union_bounds(contour_bounds(nodes) for nodes in layer.contours) or (NAN, NAN, NAN, NAN)
+        for name, value in zip(COLUMNS, layer_bounds):
+            bounds[name].append(value)
+    return bounds
+
+class VerticalBoundsResult(object):
+
+    def __init__(self, keys, columns):
+        self.keys = keys
+        self.columns = columns
+        self._index_of = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, key):
+        if self._index_of is None:
+            self._index_of = dict((k, i) for i, k in enumerate(self.keys))
+        return self.row(self._index_of[key])
+
+    def row(self, i):
+        values = [self.columns[name][i] for name in VerticalBounds._fields[1:]]
+        return VerticalBounds(self.keys[i], *(None if value != value else float(value) for value in values))
+
+    def rows(self):
+        for i in range(len(self.keys)):
+            yield self.row(i)
+
+    def differences(self, tolerance=DEFAULT_TOLERANCE, group_of=None):
+        # Layers with an outline whose vertOrigin (defaults included) is off from the centered one by more than
+        # `tolerance` beyond the typical offset of the layers in the same group, or whose vertWidth differs from
+        # the suggestion. `group_of(key)` returns the group of a layer, e.g. its vertical kerning group, or None.
+        # The suggested vertOrigin of the rows is moved by the typical offset, in line with the rest of the group.
+        columns = self.columns
+        vert_origin, vert_width = columns['effective_vert_origin'], columns['effective_vert_width']
+        suggested_vert_origin, suggested_vert_width = columns['suggested_vert_origin'], columns['suggested_vert_width']
+        offsets = {}
+        groups = {}
+        for i, key in enumerate(self.keys):
+            if suggested_vert_origin[i] == suggested_vert_origin[i]:
+                offsets[i] = float(vert_origin[i] - suggested_vert_origin[i])
+                group = group_of(key) if group_of else None
+                if group is not None:
+                    groups.setdefault(group, []).append(offsets[i])
+        everything = _round(_median(list(offsets.values())))
+        typical = dict((group, _round(_median(values))) for group, values in groups.items() if len(values) >= MIN_GROUP_SIZE)
+        for i, key in enumerate(self.keys):
+            offset = offsets.get(i)
+            if offset is None:
+                continue
+            typical_offset = typical.get(group_of(key), everything) if group_of else everything
+            if abs(offset - typical_offset) > tolerance or abs(vert_width[i] - suggested_vert_width[i]) > tolerance:
+                row = self.row(i)
+                yield row._replace(suggested_vert_origin=row.suggested_vert_origin + typical_offset)
+
+def compute_vertical_bounds(layers, keep_vert_width=True, use_numpy=None):
+    # `layers` is a sequence of LayerOutline. The suggested vertWidth is the stored one if `keep_vert_width`
+    # and the layer has one, else the distance between the ascender and the descender.
+    layers = list(layers)
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy:
+        packed = PackedOutlines()
+        for layer in layers:
+            packed.add(layer.contours)
+        bounds = _outline_bounds_numpy(packed)
+    else:
+        bounds = _outline_bounds_python(layers)
+
+    # Components take the bounds of the layers they refer to; these are few, resolve them one by one.
+    index_of = dict((layer.key, i) for i, layer in enumerate(layers))
+    resolved = {}
+    def resolve(i, seen):
+        if i in resolved:
+            return resolved[i]
+        layer = layers[i]
+        own = tuple(float(bounds[name][i]) for name in COLUMNS)
+        parts = [own if own[0] == own[0] else None]
+        for key, transform in layer.components:
+            j = index_of.get(key)
+            if j is not None and j not in seen:
+                parts.append(transform_bounds(resolve(j, seen | set([i])), transform))
+        resolved[i] = union_bounds(parts)
+        return resolved[i]
+    for i, layer in enumerate(layers):
+        if layer.components:
+            layer_bounds = resolve(i, set([i])) or (NAN, NAN, NAN, NAN)
+            for name, value in zip(COLUMNS, layer_bounds):
+                bounds[name][i] = value
+
+    # Vertical metrics of every layer. Missing stored values default to the ascender as the origin (0)
+    # and the distance between the ascender and the descender as the advance.
+    ascender = [_float(layer.ascender) for layer in layers]
+    descender = [_float(layer.descender) for layer in layers]
+    stored_vert_origin = [_float(layer.vert_origin) for layer in layers]
+    stored_vert_width = [_float(layer.vert_width) for layer in layers]
+    if use_numpy:
+        ascender, descender = numpy.array(ascender), numpy.array(descender)
+        stored_vert_origin, stored_vert_width = numpy.array(stored_vert_origin), numpy.array(stored_vert_width)
+        y_min, y_max = bounds['y_min'], bounds['y_max']
+        default_vert_width = ascender - descender
+        vert_origin = numpy.where(numpy.isnan(stored_vert_origin), 0.0, stored_vert_origin)
+        vert_width = numpy.where(numpy.isnan(stored_vert_width), default_vert_width, stored_vert_width)
+        top = ascender - vert_origin
+        suggested_vert_width = vert_width if keep_vert_width else default_vert_width
+        suggested_vert_origin = numpy.round(ascender - (y_max + y_min + suggested_vert_width) / 2)
+        columns = {
+            'TSB': top - y_max,
+            'BSB': y_min - (top - vert_width),
+            'suggested_vert_width': suggested_vert_width,
+            'suggested_vert_origin': suggested_vert_origin,
+        }
+    else:
+        y_min, y_max = bounds['y_min'], bounds['y_max']
+        default_vert_width = [a - d for a, d in zip(ascender, descender)]
+        vert_origin = [0.0 if v != v else v for v in stored_vert_origin]
+        vert_width = [d if v != v else v for v, d in zip(stored_vert_width, default_vert_width)]
+        top = [a - v for a, v in zip(ascender, vert_origin)]
+        suggested_vert_width = vert_width if keep_vert_width else default_vert_width
+        suggested_vert_origin = [_round(a - (high + low + w) / 2) for a, high, low, w in zip(ascender, y_max, y_min, suggested_vert_width)]
+        columns = {
+            'TSB': [t - high for t, high in zip(top, y_max)],
+            'BSB': [low - (t - w) for low, t, w in zip(y_min, top, vert_width)],
+            'suggested_vert_width': suggested_vert_width,
+            'suggested_vert_origin': suggested_vert_origin,
+        }
+    columns.update({
+        'y_min': y_min,
+        'y_max': y_max,
+        'vert_origin': stored_vert_origin,
+        'vert_width': stored_vert_width,
+        'effective_vert_origin': vert_origin,
+        'effective_vert_width': vert_width,
+    })
+    return VerticalBoundsResult([layer.key for layer in layers], columns)
+
+def _median(values):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def _round(value):
+    # Like numpy.round: halves go to the even neighbour; NaN stays.
+    return float(round(value)) if value == value else value
+
+def outlines_from_headless_font(font):
+    # LayerOutline records of the master layers of a font from vgpp.glyphs_reader, read with_outlines.
+    masters = dict((master.id, master) for master in font.masters)
+    for glyph in font.glyphs:
+        for layer in glyph.layers:
+            master = masters.get(layer.associatedMasterId)
+            if master is None or layer.layerId != layer.associatedMasterId:
+                continue
+            yield LayerOutline(
+                (glyph.name, master.id),
+                layer.contours or (),
+                [((name, master.id), transform) for name, transform in layer.components],
+                master.ascender, master.descender, layer.vert_origin, layer.vert_width,
+            )
+
+def format_report(result, tolerance=DEFAULT_TOLERANCE, name_of=None, group_of=None):
+    lines = []
+    for row in result.differences(tolerance, group_of):
+        name = name_of(row.key) if name_of else row.key
+        lines.append('{0}: vertOrigin {1} -> {2:.0f}, vertWidth {3} -> {4:.0f} (TSB {5:.0f}, BSB {6:.0f})'.format(
+            name,
+            'default' if row.vert_origin is None else '{0:.0f}'.format(row.vert_origin), row.suggested_vert_origin,
+            'default' if row.vert_width is None else '{0:.0f}'.format(row.vert_width), row.suggested_vert_width,
+            row.TSB, row.BSB))
+    return lines
@@ -0,0 +1,264 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+from array import array
+from collections import namedtuple
+
+from .kerning_groups import TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP
+
+# - Vertical Kerning Compiler
+
+# Turns the vertical kerning groups and pairs of a master into what a 'vkrn' class pair lookup would hold:
+# integer coded classes, a flat array('h') class x class matrix, the glyph x class pairs and the glyph level
+# exceptions, plus an audit of everything that doesn't add up. It is meant to be cheap enough to run before every export.
+#
+# Like '@MMK_L_' / '@MMK_R_' horizontally, the class keys are named after the position in the pair:
+# the upper glyph of a pair is kerned by its bottom group ('@MMK_T_'), the lower one by its top group ('@MMK_B_').
+#
+# As in Glyphs, a glyph x glyph pair wins over a pair with a class on one side, which wins over the class pair.
+# Pairs with a class on one side stay single entries of their own subtable rather than being expanded per member.
+
+FIRST_CLASS_PREFIX  = '@MMK_T_'
+SECOND_CLASS_PREFIX = '@MMK_B_'
+
+FIRST_GROUP  = BOTTOM_KERNING_GROUP
+SECOND_GROUP = TOP_KERNING_GROUP
+
+# Subtable offsets are 16 bit, larger class pair matrices have to be split.
+MAX_SUBTABLE_SIZE = 0xFFFF
+
+MISSING_GROUP       = 'missing-group'
+UNKNOWN_GLYPH       = 'unknown-glyph'
+REDUNDANT_EXCEPTION = 'redundant-exception'
+VALUE_OVERFLOW      = 'value-overflow'
+FRACTIONAL_VALUE    = 'fractional-value'
+
+Conflict = namedtuple('Conflict', ('kind', 'first', 'second', 'value', 'detail'))
+
+class VerticalKerningTable(object):
+
+    def __init__(self, glyph_names, first_classes, second_classes, first_class_of_glyph, second_class_of_glyph, matrix, glyph_class_pairs, class_glyph_pairs, exceptions, conflicts, unreferenced_groups):
+        self.glyph_names = glyph_names
+        self.first_classes = first_classes
+        self.second_classes = second_classes
+        self.first_class_of_glyph = first_class_of_glyph
+        self.second_class_of_glyph = second_class_of_glyph
+        self.matrix = matrix
+        # {(first glyph, second group): value} and {(first group, second glyph): value}
+        self.glyph_class_pairs = glyph_class_pairs
+        self.class_glyph_pairs = class_glyph_pairs
+        self.exceptions = exceptions
+        self.conflicts = conflicts
+        self.unreferenced_groups = unreferenced_groups
+
+    @property
+    def first_class_count(self):
+        # Including class 0 for everything else.
+        return len(self.first_classes) + 1
+
+    @property
+    def second_class_count(self):
+        return len(self.second_classes) + 1
+
+    def class_value(self, first_class, second_class):
+        return self.matrix[first_class * self.second_class_count + second_class]
+
+    def value(self, first_glyph, second_glyph):
+        # What a shaper would apply to the glyph pair; exceptions win over glyph x class pairs, which win over classes.
+        exception = self.exceptions.get((first_glyph, second_glyph))
+        if exception is not None:
+            return exception
+        index_of = self._glyph_indexes()
+        first, second = index_of.get(first_glyph), index_of.get(second_glyph)
+        if first is None or second is None:
+            return 0
+        first_class, second_class = self.first_class_of_glyph[first], self.second_class_of_glyph[second]
+        if second_class:
+            value = self.glyph_class_pairs.get((first_glyph, self._second_groups()[second_class]))
+            if value is not None:
+                return value
+        if first_class:
+            value = self.class_glyph_pairs.get((self._first_groups()[first_class], second_glyph))
+            if value is not None:
+                return value
+        return self.class_value(first_class, second_class)
+
+    def _glyph_indexes(self):
+        try:
+            return self._index_of
+        except AttributeError:
+            self._index_of = dict((name, i) for i, name in enumerate(self.glyph_names))
+            return self._index_of
+
+    def _first_groups(self):
+        try:
+            return self._first_group_of_class
+        except AttributeError:
+            self._first_group_of_class = dict((code, group) for group, code in self.first_classes.items())
+            return self._first_group_of_class
+
+    def _second_groups(self):
+        try:
+            return self._second_group_of_class
+        except AttributeError:
+            self._second_group_of_class = dict((code, group) for group, code in self.second_classes.items())
+            return self._second_group_of_class
+
+    @property
+    def referenced_groups(self):
+        return {FIRST_GROUP: sorted(self.first_classes), SECOND_GROUP: sorted(self.second_classes)}
+
+    def estimated_size(self):
+        # A rough size in bytes of the GPOS subtables, assuming YAdvance only value records.
+        value_record_size = 2
+        def class_pair_subtable(first_covered, first_class_count, second_covered, second_class_count):
+            return 16 + (4 + 2 * first_covered) + (4 + 6 * first_covered) + (4 + 6 * second_covered) + first_class_count * second_class_count * value_record_size
+        def covered_by(class_of_glyph, groups, classes):
+            codes = set(classes[group] for group in groups)
+            return sum(1 for c in class_of_glyph if c in codes)
+        first_covered = sum(1 for c in self.first_class_of_glyph if c)
+        second_covered = sum(1 for c in self.second_class_of_glyph if c)
+        class_pairs = class_pair_subtable(first_covered, self.first_class_count, second_covered, self.second_class_count)
+        # Each side of glyph x class pairs is one subtable, in which every glyph is a class of its own.
+        glyph_class_subtables = []
+        if self.glyph_class_pairs:
+            firsts = set(first for first, _ in self.glyph_class_pairs)
+            groups = set(group for _, group in self.glyph_class_pairs)
+            glyph_class_subtables.append(class_pair_subtable(len(firsts), len(firsts) + 1, covered_by(self.second_class_of_glyph, groups, self.second_classes), len(groups) + 1))
+        if self.class_glyph_pairs:
+            groups = set(group for group, _ in self.class_glyph_pairs)
+            seconds = set(second for _, second in self.class_glyph_pairs)
+            glyph_class_subtables.append(class_pair_subtable(covered_by(self.first_class_of_glyph, groups, self.first_classes), len(groups) + 1, len(seconds), len(seconds) + 1))
+        glyph_class_pairs = sum(glyph_class_subtables)
+        firsts = set(first for first, _ in self.exceptions)
+        glyph_pairs = (10 + (4 + 2 * len(firsts)) + 2 * len(firsts) + 2 * len(firsts) + len(self.exceptions) * (2 + value_record_size)) if self.exceptions else 0
+        return {
+            'class_pairs':       class_pairs,
+            'glyph_class_pairs': glyph_class_pairs,
+            'glyph_pairs':       glyph_pairs,
+            'total':             class_pairs + glyph_class_pairs + glyph_pairs,
+            'overflows':         max([class_pairs, glyph_pairs] + glyph_class_subtables) > MAX_SUBTABLE_SIZE,
+        }
+
+def _class_codes(glyph_groups, referenced):
+    # Class 0 is everything not in a referenced group.
+    classes = dict((group, code) for code, group in enumerate(sorted(referenced), 1))
+    return classes, array('H', (classes.get(group, 0) for group in glyph_groups))
+
+def compile_vertical_kerning(glyphs, pairs):
+    # `glyphs` yields (glyph name, top group, bottom group) in glyph order,
+    # `pairs` yields (first, second, value) with class keys or glyph names.
+    glyph_names = []
+    first_groups = []
+    second_groups = []
+    for name, top_group, bottom_group in glyphs:
+        glyph_names.append(name)
+        first_groups.append(bottom_group or None)
+        second_groups.append(top_group or None)
+    known_glyphs = set(glyph_names)
+    known_first_groups = set(first_groups)
+    known_second_groups = set(second_groups)
+
+    conflicts = []
+    class_pairs = {}
+    glyph_pairs = []
+    referenced_first = set()
+    referenced_second = set()
+    for first, second, value in pairs:
+        # The host and vgpp.glyphs_reader hand over floats; the table holds integers.
+        rounded = int(round(value))
+        if rounded != value:
+            conflicts.append(Conflict(FRACTIONAL_VALUE, first, second, value, 'rounded to {0}'.format(rounded)))
+        value = rounded
+        if not -0x8000 <= value <= 0x7FFF:
+            conflicts.append(Conflict(VALUE_OVERFLOW, first, second, value, 'does not fit in 16 bits'))
+            continue
+        valid = True
+        first_group = first[len(FIRST_CLASS_PREFIX):] if first.startswith(FIRST_CLASS_PREFIX) else None
+        second_group = second[len(SECOND_CLASS_PREFIX):] if second.startswith(SECOND_CLASS_PREFIX) else None
+        for key, group, known_groups, side in ((first, first_group, known_first_groups, FIRST_GROUP), (second, second_group, known_second_groups, SECOND_GROUP)):
+            if group is not None:
+                if group not in known_groups:
+                    conflicts.append(Conflict(MISSING_GROUP, first, second, value, 'no glyph has {0} {1!r}'.format(side, group)))
+                    valid = False
+            elif key not in known_glyphs:
+                conflicts.append(Conflict(UNKNOWN_GLYPH, first, second, value, 'no glyph named {0!r}'.format(key)))
+                valid = False
+        if not valid:
+            continue
+        if first_group is not None:
+            referenced_first.add(first_group)
+        if second_group is not None:
+            referenced_second.add(second_group)
+        if first_group is not None and second_group is not None:
+            class_pairs[(first_group, second_group)] = value
+        else:
+            glyph_pairs.append((first, first_group, second, second_group, value))
+
+    first_classes, first_class_of_glyph = _class_codes(first_groups, referenced_first)
+    second_classes, second_class_of_glyph = _class_codes(second_groups, referenced_second)
+    second_count = len(second_classes) + 1
+    matrix = array('h', [0]) * ((len(first_classes) + 1) * second_count)
+    for (first_group, second_group), value in class_pairs.items():
+        matrix[first_classes[first_group] * second_count + second_classes[second_group]] = value
+
+    # Pairs with a class on one side are kept as they are; only glyph x glyph pairs become exceptions.
+    glyph_class_pairs = {}
+    class_glyph_pairs = {}
+    exceptions = {}
+    for first, first_group, second, second_group, value in glyph_pairs:
+        if second_group is not None:
+            glyph_class_pairs[(first, second_group)] = value
+        elif first_group is not None:
+            class_glyph_pairs[(first_group, second)] = value
+        else:
+            exceptions[(first, second)] = value
+    index_of = dict((name, i) for i, name in enumerate(glyph_names))
+    for (first_glyph, second_group), value in list(glyph_class_pairs.items()):
+        if matrix[first_class_of_glyph[index_of[first_glyph]] * second_count + second_classes[second_group]] == value:
+            conflicts.append(Conflict(REDUNDANT_EXCEPTION, first_glyph, SECOND_CLASS_PREFIX + second_group, value, 'same as the class pair'))
+            del glyph_class_pairs[(first_glyph, second_group)]
+    for (first_group, second_glyph), value in list(class_glyph_pairs.items()):
+        if matrix[first_classes[first_group] * second_count + second_class_of_glyph[index_of[second_glyph]]] == value:
+            conflicts.append(Conflict(REDUNDANT_EXCEPTION, FIRST_CLASS_PREFIX + first_group, second_glyph, value, 'same as the class pair'))
+            del class_glyph_pairs[(first_group, second_glyph)]
+    table = VerticalKerningTable(glyph_names, first_classes, second_classes, first_class_of_glyph, second_class_of_glyph, matrix, glyph_class_pairs, class_glyph_pairs, exceptions, conflicts, None)
+    for (first_glyph, second_glyph), value in list(exceptions.items()):
+        del exceptions[(first_glyph, second_glyph)]
+        # What the pair would get without the exception.
+        if table.value(first_glyph, second_glyph) == value:
+            conflicts.append(Conflict(REDUNDANT_EXCEPTION, first_glyph, second_glyph, value, 'same as the class pair'))
+        else:
+            exceptions[(first_glyph, second_glyph)] = value
+
+    table.unreferenced_groups = {
+        FIRST_GROUP:  sorted(group for group in known_first_groups - referenced_first if group is not None),
+        SECOND_GROUP: sorted(group for group in known_second_groups - referenced_second if group is not None),
+    }
+    return table
+
+def iter_kerning_pairs(kerning, glyph_name_for=None):
+    # Flattens a {first: {second: value}} kerning dictionary of one master. Glyph keys which are
+    # not class keys may be glyph ids, in which case `glyph_name_for` translates them.
+    for first, seconds in kerning.items():
+        if glyph_name_for and not first.startswith('@'):
+            first = glyph_name_for(first)
+        for second, value in seconds.items():
+            if glyph_name_for and not second.startswith('@'):
+                second = glyph_name_for(second)
+            if first is not None and second is not None:
+                yield first, second, value
+
+def format_report(table):
+    size = table.estimated_size()
+    lines = [
+        '{0} x {1} classes, {2} glyph x class pairs, {3} exceptions, about {4} bytes{5}'.format(
+            table.first_class_count, table.second_class_count, len(table.glyph_class_pairs) + len(table.class_glyph_pairs), len(table.exceptions), size['total'],
+            ' (needs to be split into several subtables)' if size['overflows'] else ''),
+    ]
+    for side, groups in sorted(table.unreferenced_groups.items()):
+        if groups:
+            lines.append('{0} groups without kerning: {1}'.format(side, ', '.join(groups)))
+    for conflict in table.conflicts:
+        lines.append('{0}: {1} {2} {3} ({4})'.format(conflict.kind, conflict.first, conflict.second, conflict.value, conflict.detail))
+    return lines
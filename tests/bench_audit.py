@@ -0,0 +1,22 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import multiprocessing
+import support
+import benchmark
+from bench_glyphs_reader import write_font
+from vgpp.audit import audit
+
+def setup_audit(file_count=8, glyph_count=5000, jobs=1):
+    paths = [write_font(glyph_count) for _ in range(file_count)]
+    return lambda: list(audit(paths, jobs=jobs))
+
+JOBS = multiprocessing.cpu_count()
+
+BENCHMARKS = [
+    ('audit: 8 files x 5k glyphs, 1 process', setup_audit),
+    ('audit: 8 files x 5k glyphs, {0} processes'.format(JOBS), lambda: setup_audit(jobs=JOBS)),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=1)
@@ -0,0 +1,24 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import support
+import benchmark
+from support import StubFont, StubLayer
+from vgpp.bulk_edit import apply_vertical_properties
+
+def setup_bulk_edit(glyph_count=5000):
+    font = StubFont()
+    layers = [font.add_glyph('uni{0:04X}'.format(0x4E00 + i), StubLayer()).layers['m01'] for i in range(glyph_count)]
+    values = [{'topMetricsKeyUI': '=uni4E00', 'vertOriginUI': '=40', 'topKerningGroup': 'kanji'}, {'topMetricsKeyUI': None, 'vertOriginUI': None, 'topKerningGroup': None}]
+    state = [0]
+    def bulk_edit():
+        state[0] ^= 1
+        apply_vertical_properties(layers, values[state[0]])
+    return bulk_edit
+
+BENCHMARKS = [
+    ('bulk_edit: 3 properties on 5000 layers', setup_bulk_edit),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
@@ -0,0 +1,49 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import support
+import benchmark
+from support import StubLayer
+from vgpp.capabilities import LayerCapabilities
+
+# The getters as they used to be: probing - respondsToSelector: on every read.
+
+def probing_vert_origin_ui(layer):
+    is_placeholder = False
+    if layer.pyobjc_instanceMethods.respondsToSelector_('vertOriginUIisPlaceholder:'):
+        _, is_placeholder = layer.pyobjc_instanceMethods.vertOriginUIisPlaceholder_(None)
+    if is_placeholder: return None
+    if layer.pyobjc_instanceMethods.respondsToSelector_('vertOriginKeyUI'):
+        return layer.pyobjc_instanceMethods.vertOriginKeyUI() if -1000000 < layer.pyobjc_instanceMethods.vertOrigin() < 1000000 else None
+    return "{0:.0f}".format(layer.pyobjc_instanceMethods.vertOrigin()) if -1000000 < layer.pyobjc_instanceMethods.vertOrigin() < 1000000 else None
+
+def probing_top_metrics_key_color(layer):
+    if layer.pyobjc_instanceMethods.respondsToSelector_('colorForMetricsState:') and layer.pyobjc_instanceMethods.respondsToSelector_('topMetricsKeyState'):
+        return layer.pyobjc_instanceMethods.colorForMetricsState_(layer.pyobjc_instanceMethods.topMetricsKeyState())
+    return None
+
+def setup_probing():
+    layers = [StubLayer(vert_origin=float(i)) for i in range(1000)]
+    def run():
+        for layer in layers:
+            probing_vert_origin_ui(layer)
+            probing_top_metrics_key_color(layer)
+    return run
+
+def setup_dispatch():
+    layers = [StubLayer(vert_origin=float(i)) for i in range(1000)]
+    capabilities = [LayerCapabilities.for_layer(layer) for layer in layers]
+    pairs = list(zip(capabilities, layers))
+    def run():
+        for capability, layer in pairs:
+            capability.vert_origin_ui(layer)
+            capability.top_metrics_key_color(layer)
+    return run
+
+BENCHMARKS = [
+    ('capabilities: probing getters x1000 layers',  setup_probing),
+    ('capabilities: dispatch table x1000 layers',   setup_dispatch),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS)
@@ -0,0 +1,35 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import random
+import support
+import benchmark
+from support import StubFont, StubLayer
+from vgpp.columns import VerticalMetricsColumns, VERT_ORIGIN
+
+def make_font(count=23000):
+    random.seed(count)
+    font = StubFont()
+    for i in range(count):
+        font.add_glyph('uni{0:05X}'.format(0x4E00 + i), StubLayer(vert_origin=float(random.randint(-100, 100))))
+    return font
+
+def read_row(glyph):
+    methods = glyph.layers['m01'].pyobjc_instanceMethods
+    return (methods.vertOrigin(), methods.vertWidth(), methods.TSB(), methods.BSB(), glyph.topKerningGroup, glyph.bottomKerningGroup)
+
+def setup_columns(strings=False):
+    # What the list asks for, one glyph at a time: the strings to draw the cells, the numbers to sort by.
+    glyphs = list(make_font().glyphs)
+    columns = VerticalMetricsColumns(read_row)
+    columns.fill(glyphs)
+    get = columns.string if strings else columns.value
+    return lambda: [get(glyph, VERT_ORIGIN) for glyph in glyphs]
+
+BENCHMARKS = [
+    ('columns: vertOrigin value of 23k glyphs',  setup_columns),
+    ('columns: vertOrigin string of 23k glyphs', lambda: setup_columns(strings=True)),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
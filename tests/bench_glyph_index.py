@@ -0,0 +1,33 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import random
+import support
+import benchmark
+from support import StubFont
+from vgpp.glyph_index import GlyphIndexMap
+
+def make_selection(count, selected=1000):
+    font = StubFont()
+    for i in range(count):
+        font.add_glyph('uni{0:05X}'.format(0x4E00 + i))
+    glyphs = list(font.glyphs)
+    random.seed(count)
+    return font, random.sample(glyphs, min(selected, count))
+
+def setup_linear(count):
+    font, selection = make_selection(count)
+    return lambda: sorted(selection, key=font.indexOfGlyph_)
+
+def setup_index_map(count):
+    font, selection = make_selection(count)
+    index_map = GlyphIndexMap(font.glyphs)
+    return lambda: index_map.sorted(selection)
+
+BENCHMARKS = []
+for count in (1000, 10000, 60000):
+    BENCHMARKS.append(('glyph index: indexOfGlyph_, 1k of {0}'.format(count), lambda count=count: setup_linear(count)))
+    BENCHMARKS.append(('glyph index: index map, 1k of {0}'.format(count), lambda count=count: setup_index_map(count)))
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
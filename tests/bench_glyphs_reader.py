@@ -0,0 +1,75 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import support
+import benchmark
+from vgpp.glyphs_reader import iter_glyphs_file, read_glyphs_file
+
+GLYPH = '''{{
+glyphname = uni{0:05X};
+kernTop = top{1};
+kernBottom = bottom{1};
+layers = (
+{{
+anchors = (
+{{
+name = top;
+position = "{{250, 700}}";
+}}
+);
+layerId = "M1";
+paths = (
+{{
+closed = 1;
+nodes = (
+"100 -10 OFFCURVE",
+"0 90 OFFCURVE",
+"0 200 CURVE SMOOTH",
+"0 600 LINE",
+"900 600 LINE",
+"900 -10 LINE"
+);
+}}
+);
+vertOrigin = {2};
+width = 1000;
+}}
+);
+topMetricsKey = "=uni04E00";
+unicode = {0:04X};
+}}'''
+
+def write_font(glyph_count):
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory)
+    path = os.path.join(directory, 'Bench.glyphs')
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write('{\nfamilyName = Bench;\nfontMaster = (\n{\nascender = 880;\ndescender = -120;\nid = "M1";\n}\n);\nglyphs = (\n')
+        f.write(',\n'.join(GLYPH.format(0x4E00 + i, i % 300, i % 50) for i in range(glyph_count)))
+        f.write('\n);\nunitsPerEm = 1000;\n}\n')
+    return path
+
+def setup_read(glyph_count=20000):
+    path = write_font(glyph_count)
+    return lambda: read_glyphs_file(path)
+
+def setup_stream(glyph_count=20000):
+    path = write_font(glyph_count)
+    def stream():
+        for glyph in iter_glyphs_file(path):
+            for layer in glyph.layers:
+                layer.TSB()
+    return stream
+
+BENCHMARKS = [
+    ('glyphs_reader: read 20k glyphs', setup_read),
+    ('glyphs_reader: stream 20k glyphs with TSB', setup_stream),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
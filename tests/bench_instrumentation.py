@@ -0,0 +1,33 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import support
+import benchmark
+from vgpp import instrumentation
+
+def getter():
+    return None
+
+def instrumented_getter():
+    with instrumentation.span('VGPPLayer.topMetricsKeyUI'):
+        return None
+
+def setup_plain():
+    return getter
+
+def setup_instrumented(enabled=False):
+    instrumentation.enable(enabled)
+    instrumentation.recorder.reset()
+    return instrumented_getter
+
+BENCHMARKS = [
+    ('instrumentation: bare getter', setup_plain),
+    ('instrumentation: getter in a span, off', setup_instrumented),
+    ('instrumentation: getter in a span, on', lambda: setup_instrumented(enabled=True)),
+]
+
+if __name__ == '__main__':
+    try:
+        benchmark.run(BENCHMARKS)
+    finally:
+        instrumentation.enable(False)
@@ -0,0 +1,49 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import support
+import benchmark
+import headless
+
+plugin = headless.load_plugin()
+
+DIRECTORY = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, DIRECTORY, True)
+
+def setup_export(glyph_count):
+    font = headless.font_of_size(glyph_count)
+    path = os.path.join(DIRECTORY, 'export.vertical.jsonl')
+    def run():
+        plugin.export_vertical_properties_of_font(font, path)
+    return run
+
+def setup_import(glyph_count, changed=True):
+    # Two fonts of the same glyphs with different vertical origins and sidebearings, imported into a third one
+    # in turns, so that every run applies the differences; or the same file again, with nothing to apply.
+    paths = []
+    for seed in (1, 2):
+        path = os.path.join(DIRECTORY, '{0}.vertical.jsonl'.format(seed))
+        plugin.export_vertical_properties_of_font(headless.make_font(glyph_count, seed=seed), path)
+        paths.append(path)
+    target = headless.make_font(glyph_count, seed=3)
+    plugin.import_vertical_properties_to_font(target, paths[0])
+    state = {'index': 0}
+    def run():
+        if changed:
+            state['index'] ^= 1
+        plugin.import_vertical_properties_to_font(target, paths[state['index']])
+    return run
+
+BENCHMARKS = [
+    ('interchange: export 60k x 3 masters',               lambda: setup_export(60000)),
+    ('interchange: import 60k x 3 masters, 10% changed',  lambda: setup_import(60000)),
+    ('interchange: import 60k x 3 masters, unchanged',    lambda: setup_import(60000, changed=False)),
+]
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main(BENCHMARKS, repeat=5))
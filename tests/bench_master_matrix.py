@@ -0,0 +1,47 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import support
+import benchmark
+from vgpp.master_matrix import MasterMatrix, key_state
+
+MASTERS = [('light', 100), ('regular', 400), ('bold', 700), ('heavy', 900)]
+
+class Glyph(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.stamp = 0
+
+def read_row(glyph, master_id):
+    return (80, 1000, 100, 100, key_state('=uni4E00', None, None))
+
+def make_glyphs(glyph_count):
+    return [Glyph('uni{0:05X}'.format(0x4E00 + i)) for i in range(glyph_count)]
+
+def new_matrix():
+    return MasterMatrix(MASTERS, read_row, change_stamp=lambda glyph: glyph.stamp)
+
+def setup_build(glyph_count=23000):
+    glyphs = make_glyphs(glyph_count)
+    return lambda: new_matrix().refresh(glyphs)
+
+def setup_refresh_one_edit(glyph_count=23000):
+    # What a repeated check costs after editing a single glyph.
+    glyphs = make_glyphs(glyph_count)
+    matrix = new_matrix()
+    matrix.refresh(glyphs)
+    list(matrix.findings())
+    def refresh():
+        glyphs[100].stamp += 1
+        matrix.refresh(glyphs)
+        return list(matrix.findings())
+    return refresh
+
+BENCHMARKS = [
+    ('master_matrix: build 23k glyphs x 4 masters', setup_build),
+    ('master_matrix: refresh + findings after 1 edit', setup_refresh_one_edit),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
@@ -0,0 +1,128 @@
+# encoding: utf-8
+
+# plugin.py itself, run headless against the stand-ins in tests/stubs/ with the synthetic fonts of tests/headless.py.
+# The stand-ins cost far less than the real Cocoa Bindings do, so these numbers are for spotting regressions in the
+# plugin's own code rather than for predicting the latency in Glyphs.
+
+from __future__ import division, print_function, unicode_literals
+import sys
+import support
+import benchmark
+import headless
+from headless import FONT_SIZES
+
+plugin = headless.load_plugin()
+
+def size_label(glyph_count):
+    return '{0}k'.format(glyph_count // 1000)
+
+def setup_update(glyph_count, changed=False):
+    # A select-all in the font view, refreshed again as is or with 10 glyphs swapped.
+    font = headless.font_of_size(glyph_count)
+    palette = headless.make_palette()
+    all_glyphs = list(font.glyphs)
+    selections = [all_glyphs[:-10], all_glyphs[10:]] if changed else [all_glyphs]
+    notification = headless.notification(font)
+    state = {'index': 0}
+    def run():
+        state['index'] = (state['index'] + 1) % len(selections)
+        font.selection = selections[state['index']]
+        palette.update(notification)
+    font.selection = selections[0]
+    palette.update(notification)
+    return run
+
+def setup_selected_layers(glyph_count):
+    font = headless.font_of_size(glyph_count)
+    font.currentTab = None
+    selection = list(font.glyphs)
+    def run():
+        font.selection = selection
+        return plugin.get_selected_layers_from_font(font)
+    return run
+
+def setup_glyphs_from_layers(glyph_count):
+    font = headless.font_of_size(glyph_count)
+    layers = [glyph.layers['m01'] for glyph in font.glyphs]
+    return lambda: plugin.get_glyphs_from_layers(layers)
+
+def setup_proxy_getters(glyph_count):
+    font = headless.font_of_size(glyph_count)
+    proxy = plugin.make_layer_proxy(font.glyphs[glyph_count // 2 + 1].layers['m01'])
+    def run():
+        return (proxy.topMetricsKeyUI, proxy.bottomMetricsKeyUI, proxy.vertOriginUI, proxy.vertWidthMetricsKeyUI, proxy.topMetricsKeyColor)
+    return run
+
+def setup_proxy_setters(glyph_count):
+    font = headless.font_of_size(glyph_count)
+    proxy = plugin.make_layer_proxy(font.glyphs[glyph_count // 2 + 2].layers['m01'])
+    keys = ['=uni4E00', None]
+    state = {'index': 0}
+    def run():
+        state['index'] ^= 1
+        proxy.topMetricsKeyUI = keys[state['index']]
+        proxy.vertOriginUI = '40' if state['index'] else '60'
+    return run
+
+def setup_customize_table_view(glyph_count, fresh=True):
+    # The columns go into the font view of a newly opened document, then every refresh checks for them again.
+    from GlyphsApp import _FontViewController
+    font = headless.font_of_size(glyph_count)
+    font.fontView = _FontViewController()
+    plugin.customize_table_view_in_font(font)
+    def run():
+        if fresh:
+            font.fontView = _FontViewController()
+        plugin.customize_table_view_in_font(font)
+    return run
+
+def setup_column_cells(glyph_count):
+    # The list of the font view drawing the Vertical Origin, TSB and BSB cells of every glyph, and sorting by them.
+    font = headless.font_of_size(glyph_count)
+    glyphs = list(font.glyphs)
+    def run():
+        for glyph in glyphs:
+            glyph.vgppVertOriginString(), glyph.vgppTSBString(), glyph.vgppBSBString(), glyph.vgppVertOrigin()
+    run()
+    return run
+
+def setup_startup():
+    # What Glyphs does on launch, whether or not the palette is ever expanded.
+    def run():
+        headless.reset_app()
+        return headless.make_palette()
+    return run
+
+def setup_first_refresh(glyph_count):
+    # Launch, then the first refresh with a glyph selected in a font view that has just been opened.
+    from GlyphsApp import _FontViewController
+    font = headless.font_of_size(glyph_count)
+    notification = headless.notification(font)
+    def run():
+        headless.reset_app()
+        font.fontView = _FontViewController()
+        headless.select_glyphs(font, 1)
+        palette = headless.make_palette()
+        palette.update(notification)
+    return run
+
+BENCHMARKS = [
+    ('plugin: startup',                    setup_startup),
+    ('plugin: startup + first refresh, 23k', lambda: setup_first_refresh(23000)),
+]
+for glyph_count in FONT_SIZES:
+    label = size_label(glyph_count)
+    BENCHMARKS += [
+        ('plugin: update, select all {0}, unchanged'.format(label),        lambda n=glyph_count: setup_update(n)),
+        ('plugin: update, select all {0}, 10 swapped'.format(label),       lambda n=glyph_count: setup_update(n, changed=True)),
+        ('plugin: get_selected_layers_from_font, {0}'.format(label),       lambda n=glyph_count: setup_selected_layers(n)),
+        ('plugin: get_glyphs_from_layers, {0}'.format(label),              lambda n=glyph_count: setup_glyphs_from_layers(n)),
+        ('plugin: VGPPLayer getters, {0} font'.format(label),              lambda n=glyph_count: setup_proxy_getters(n)),
+        ('plugin: VGPPLayer setters, {0} font'.format(label),              lambda n=glyph_count: setup_proxy_setters(n)),
+        ('plugin: insert_new_column x5, new font view, {0}'.format(label), lambda n=glyph_count: setup_customize_table_view(n)),
+        ('plugin: insert_new_column x5, again, {0}'.format(label),         lambda n=glyph_count: setup_customize_table_view(n, fresh=False)),
+        ('plugin: list column cells, {0}'.format(label),                   lambda n=glyph_count: setup_column_cells(n)),
+    ]
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main(BENCHMARKS, repeat=10))
@@ -0,0 +1,41 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import support
+import benchmark
+from support import FakeLayer, FakeLayerProxy
+from vgpp.selection import SelectionTracker
+
+def make_layers(count):
+    return [FakeLayer('layer{0}'.format(i)) for i in range(count)]
+
+def setup_rewrap(count):
+    # What the palette used to do: a new proxy (and four observers) per layer on every refresh.
+    layers = make_layers(count)
+    state = {'proxies': []}
+    def run():
+        for proxy in state['proxies']:
+            FakeLayerProxy.release(proxy)
+        state['proxies'] = [FakeLayerProxy(layer) for layer in layers]
+    return run
+
+def setup_tracker(count, changed=0):
+    layers = make_layers(count)
+    others = make_layers(changed)
+    tracker = SelectionTracker(FakeLayerProxy, FakeLayerProxy.release)
+    tracker.update(layers)
+    selections = [layers, layers[changed:] + others]
+    state = {'index': 0}
+    def run():
+        state['index'] ^= 1
+        tracker.update(selections[state['index']] if changed else layers)
+    return run
+
+BENCHMARKS = [
+    ('selection: rewrap 23k layers',             lambda: setup_rewrap(23000)),
+    ('selection: tracker, 23k layers unchanged', lambda: setup_tracker(23000)),
+    ('selection: tracker, 23k layers, 10 swapped', lambda: setup_tracker(23000, changed=10)),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
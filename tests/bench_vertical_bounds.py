@@ -0,0 +1,37 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import random
+import support
+import benchmark
+from vgpp import vertical_bounds
+from vgpp.vertical_bounds import LayerOutline, compute_vertical_bounds
+
+def make_layers(glyph_count):
+    # Ideograph-ish: a few strokes of lines and cubic curves per glyph.
+    random.seed(glyph_count)
+    layers = []
+    for i in range(glyph_count):
+        contours = []
+        for _ in range(4):
+            x, y = random.randint(50, 900), random.randint(-100, 800)
+            contours.append([
+                (x, y, 'l'), (x + 80, y, 'l'),
+                (x + 80, y + 40, 'o'), (x + 60, y + 80, 'o'), (x + 40, y + 80, 'c'),
+                (x + 20, y + 80, 'o'), (x, y + 40, 'o'), (x, y + 20, 'c'),
+            ])
+        layers.append(LayerOutline('uni{0:05X}'.format(0x4E00 + i), contours, [], 880, -120, random.choice((None, 0, 30)), None))
+    return layers
+
+def setup_compute(glyph_count=60000, use_numpy=False):
+    layers = make_layers(glyph_count)
+    return lambda: compute_vertical_bounds(layers, use_numpy=use_numpy)
+
+BENCHMARKS = [
+    ('vertical_bounds: 60k glyphs, pure Python', setup_compute),
+]
+if vertical_bounds.numpy is not None:
+    BENCHMARKS.append(('vertical_bounds: 60k glyphs, NumPy', lambda: setup_compute(use_numpy=True)))
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
@@ -0,0 +1,22 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import random
+import support
+import benchmark
+from vgpp.vkrn import compile_vertical_kerning
+
+def setup_compile(glyph_count=20000, group_count=300):
+    random.seed(glyph_count)
+    groups = ['group{0}'.format(i) for i in range(group_count)]
+    glyphs = [('uni{0:05X}'.format(0x4E00 + i), random.choice(groups), random.choice(groups)) for i in range(glyph_count)]
+    pairs = [('@MMK_T_' + random.choice(groups), '@MMK_B_' + random.choice(groups), random.randint(-100, 100)) for _ in range(20000)]
+    pairs += [(random.choice(glyphs)[0], random.choice(glyphs)[0], random.randint(-100, 100)) for _ in range(2000)]
+    return lambda: compile_vertical_kerning(glyphs, pairs)
+
+BENCHMARKS = [
+    ('vkrn: compile 20k glyphs, 300 groups, 22k pairs', setup_compile),
+]
+
+if __name__ == '__main__':
+    benchmark.run(BENCHMARKS, repeat=3)
@@ -0,0 +1,101 @@
+# encoding: utf-8
+
+# A tiny benchmark harness. Each tests/bench_*.py module exposes BENCHMARKS, a list of (name, setup) pairs
+# where setup() returns the callable to be timed.
+#
+# main() also keeps the results in a baseline file, tests/bench_baseline.json by default, and flags the
+# benchmarks that got slower than their baseline by more than the tolerance:
+#
+#     python tests/bench_plugin.py --save                 # record (merged into the existing baseline)
+#     python tests/bench_plugin.py --tolerance 0.5        # compare; exits with 1 on a regression
+#
+# Timings are the best of `repeat` runs, with the garbage collector off while timing. A benchmark over the
+# tolerance is measured once more from a fresh setup before it is flagged, as a single slow pass is more often
+# the machine than the code.
+
+from __future__ import division, print_function, unicode_literals
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import timeit
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+TOLERANCE = 0.25
+
+def measure(setup, repeat=5, number=None):
+    fn = setup()
+    timer = timeit.Timer(fn)
+    # The leftovers of the setup would otherwise be collected in the middle of a timed pass.
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if number is None:
+            number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best / number
+
+def _is_regression(seconds, baseline_seconds, tolerance):
+    return bool(baseline_seconds) and seconds / baseline_seconds > 1 + tolerance
+
+def run(benchmarks, repeat=5, baseline=None, tolerance=TOLERANCE):
+    # With a baseline ({name: seconds}), prints the ratio to it as well. Returns the results.
+    results = {}
+    baseline = baseline or {}
+    for name, setup in benchmarks:
+        seconds = measure(setup, repeat=repeat)
+        if _is_regression(seconds, baseline.get(name), tolerance):
+            seconds = min(seconds, measure(setup, repeat=repeat))
+        results[name] = seconds
+        line = '{0:<56} {1:>12.3f} us'.format(name, seconds * 1e6)
+        if baseline.get(name):
+            ratio = seconds / baseline[name]
+            line += '  x{0:.2f}{1}'.format(ratio, '  REGRESSION' if _is_regression(seconds, baseline[name], tolerance) else '')
+        print(line)
+    return results
+
+def regressions(results, baseline, tolerance=TOLERANCE):
+    return sorted(name for name, seconds in results.items() if _is_regression(seconds, baseline.get(name), tolerance))
+
+# - Baseline
+
+def machine():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'system': platform.system(),
+        'machine': platform.machine(),
+    }
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with io.open(path, encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+def save_baseline(results, path=BASELINE_PATH):
+    # Merged, so that every bench_*.py module can record its own part.
+    merged = load_baseline(path)
+    merged.update(results)
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'machine': machine(), 'results': merged}, indent=2, sort_keys=True, ensure_ascii=False) + '\n')
+
+def main(benchmarks, repeat=5, argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--save', action='store_true', help='record the results in the baseline file')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='path of the baseline file')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='slowdown allowed before flagging, 0.25 for 25%%')
+    args = parser.parse_args(argv)
+    baseline = load_baseline(args.baseline)
+    results = run(benchmarks, repeat=repeat, baseline=baseline, tolerance=args.tolerance)
+    if args.save:
+        save_baseline(results, args.baseline)
+        return 0
+    return 1 if regressions(results, baseline, args.tolerance) else 0
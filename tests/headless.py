@@ -0,0 +1,142 @@
+# encoding: utf-8
+
+# Runs plugin.py itself outside of Glyphs, against the stand-ins for objc, Foundation, AppKit and GlyphsApp
+# in tests/stubs/, with synthetic fonts of CJK size. The stand-ins emulate Cocoa Bindings and KVO closely
+# enough that a palette refresh makes the same calls into the plugin as it does in the app.
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import random
+import sys
+import types
+
+import support
+
+STUBS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+PLUGIN_PATH = os.path.join(support.RESOURCES_PATH, 'plugin.py')
+
+# Glyph counts of the synthetic fonts: a Latin + kana font, an Adobe-Japan1 sized font, and a pan-CJK font.
+FONT_SIZES = (1000, 23000, 60000)
+
+MASTERS = (('m01', 'Light', 100), ('m02', 'Regular', 400), ('m03', 'Bold', 700))
+
+def _use_stubs():
+    if STUBS_PATH not in sys.path:
+        sys.path.insert(0, STUBS_PATH)
+    import objc
+    if os.path.dirname(os.path.abspath(objc.__file__)) != STUBS_PATH:
+        raise RuntimeError('PyObjC is already loaded; run the headless tests in a process of their own.')
+
+_plugin = None
+
+def load_plugin():
+    # Execs plugin.py once, like MacOS/main.py does, and returns its namespace as a module.
+    global _plugin
+    if _plugin is None:
+        _use_stubs()
+        module = types.ModuleType(str('plugin'))
+        module.__file__ = PLUGIN_PATH
+        with io.open(PLUGIN_PATH, encoding='utf-8') as f:
+            source = f.read()
+        exec(compile(source, PLUGIN_PATH, 'exec'), module.__dict__)
+        _plugin = module
+    return _plugin
+
+def make_palette():
+    # What Glyphs does on launch: init, settings() then start().
+    plugin = load_plugin()
+    palette = plugin.VerticalGlyphPropertiesPalette.alloc().init()
+    palette.settings()
+    palette.start()
+    return palette
+
+def reset_app():
+    # Forgets the open fonts, and the callbacks, observers and menu items of the palettes made so far.
+    from Foundation import NSNotificationCenter
+    from GlyphsApp import Glyphs, GLYPH_MENU
+    if _plugin is not None:
+        for font in Glyphs.fonts:
+            _plugin.forget_font(font)
+    Glyphs.callbacks.clear()
+    del Glyphs.menu[GLYPH_MENU][:]
+    del Glyphs.fonts[:]
+    Glyphs.font = None
+    NSNotificationCenter.defaultCenter().observers = []
+
+def notification(obj):
+    from Foundation import NSNotification
+    from GlyphsApp import UPDATEINTERFACE
+    return NSNotification.notificationWithName_object_(UPDATEINTERFACE, obj)
+
+def flush_performs():
+    # Serves the - performSelector:withObject:afterDelay: requests, as the next run loop turn would.
+    from Foundation import pending_performs
+    count = 0
+    while pending_performs:
+        target, selector, obj = pending_performs.pop(0)
+        getattr(target, selector.replace(':', '_'))(obj)
+        count += 1
+    return count
+
+def logged_errors():
+    from GlyphsApp import logged_errors
+    return logged_errors
+
+def open_document(font):
+    # Opens the font in a new window and brings it to the front.
+    from GlyphsApp import Glyphs, DOCUMENTOPENED, DOCUMENTACTIVATED, _Document, _FontViewController
+    font.fontView = _FontViewController()
+    Glyphs.fonts.append(font)
+    Glyphs.font = font
+    Glyphs.post(DOCUMENTOPENED, _Document(font))
+    Glyphs.post(DOCUMENTACTIVATED, _Document(font))
+
+def close_document(font):
+    from GlyphsApp import Glyphs, DOCUMENTCLOSED, _Document
+    Glyphs.post(DOCUMENTCLOSED, _Document(font))
+    Glyphs.fonts.remove(font)
+    Glyphs.font = Glyphs.fonts[-1] if Glyphs.fonts else None
+
+def make_font(glyph_count, masters=MASTERS, seed=None):
+    # Ideographs with per-master metrics. About a third of them key their vertical metrics to a reference glyph,
+    # a tenth have their own vertical origin, and they come in vertical kerning groups of a few hundred.
+    _use_stubs()
+    from GlyphsApp import GSFont, GSFontMaster, GSGlyph, GSLayer
+    random.seed(glyph_count if seed is None else seed)
+    font = GSFont('Synthetic {0}'.format(glyph_count))
+    font.masters = [GSFontMaster(master_id, name, weight) for master_id, name, weight in masters]
+    font.selectedFontMaster = font.masters[0]
+    reference = 'uni4E00'
+    for i in range(glyph_count):
+        glyph = GSGlyph('uni{0:04X}'.format(0x4E00 + i))
+        if i % 3 == 0:
+            glyph.topKerningGroup = 'top{0}'.format(i % 200)
+            glyph.bottomKerningGroup = 'bottom{0}'.format(i % 150)
+        for master_id, _, weight in masters:
+            sidebearing = 40.0 + weight / 20.0
+            layer = GSLayer(master_id, TSB=sidebearing + random.randint(-5, 5), BSB=sidebearing + random.randint(-5, 5))
+            if i % 10 == 1:
+                layer._vert_origin = float(random.randint(0, 60))
+            if i % 3 == 1:
+                layer._top_key = '=' + reference
+                layer._bottom_key = '=' + reference
+            glyph.layers.append(layer)
+        font.glyphs.append(glyph)
+    return font
+
+_fonts = {}
+
+def font_of_size(glyph_count):
+    # Shared between the benchmarks of a run; building the 60k font takes a while.
+    font = _fonts.get(glyph_count)
+    if font is None:
+        font = _fonts[glyph_count] = make_font(glyph_count)
+    return font
+
+def select_glyphs(font, count, start=0):
+    # Selects glyphs in the font view and returns the selection.
+    font.currentTab = None
+    font.selectedLayers = []
+    font.selection = [font.glyphs[i] for i in range(start, start + count)]
+    return font.selection
@@ -0,0 +1,556 @@
+# encoding: utf-8
+
+# A stand-in for AppKit, just enough of it to exec plugin.py headless. See tests/headless.py.
+# Bindings are emulated the way Cocoa wires them: a bound control observes the key path of the object it is bound to
+# and pulls the value again whenever it changes, and an array controller forwards the changes of the selected objects
+# to the observers of its `selection.<key>` key paths.
+
+from __future__ import division, print_function, unicode_literals
+
+from Foundation import NSNotificationCenter, NSObject
+
+NSObservedObjectKey = 'NSObservedObject'
+NSObservedKeyPathKey = 'NSObservedKeyPath'
+NSOptionsKey = 'NSOptions'
+NSValueBinding = 'value'
+NSContentArrayBinding = 'contentArray'
+NSValueTransformerBindingOption = 'NSValueTransformer'
+
+NSViewFrameDidChangeNotification = 'NSViewFrameDidChangeNotification'
+NSWindowDidChangeOcclusionStateNotification = 'NSWindowDidChangeOcclusionStateNotification'
+
+NSFontFeatureSettingsAttribute = 'NSCTFontFeatureSettingsAttribute'
+NSFontFeatureTypeIdentifierKey = 'CTFeatureTypeIdentifier'
+NSFontFeatureSelectorIdentifierKey = 'CTFeatureSelectorIdentifier'
+
+class _Marker(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+NSNoSelectionMarker = _Marker('NSNoSelectionMarker')
+NSMultipleValuesMarker = _Marker('NSMultipleValuesMarker')
+NSNotApplicableMarker = _Marker('NSNotApplicableMarker')
+
+class NSColor(NSObject):
+
+    def __init__(self, name=None):
+        self.name = name
+
+    def __repr__(self):
+        return '<NSColor {0}>'.format(self.name)
+
+    @classmethod
+    def controlTextColor(cls):
+        return CONTROL_TEXT_COLOR
+
+    @classmethod
+    def systemRedColor(cls):
+        return SYSTEM_RED_COLOR
+
+CONTROL_TEXT_COLOR = NSColor('controlTextColor')
+SYSTEM_RED_COLOR = NSColor('systemRedColor')
+
+class NSFontDescriptor(NSObject):
+
+    def __init__(self, attributes=None):
+        self.attributes = dict(attributes or {})
+
+    def fontDescriptorByAddingAttributes_(self, attributes):
+        merged = dict(self.attributes)
+        merged.update(attributes)
+        return NSFontDescriptor(merged)
+
+class NSFont(NSObject):
+
+    def __init__(self, descriptor=None, size=11.0):
+        self._descriptor = descriptor or NSFontDescriptor()
+        self._size = size
+
+    @classmethod
+    def systemFontOfSize_(cls, size):
+        return cls(None, size)
+
+    @classmethod
+    def fontWithDescriptor_size_(cls, descriptor, size):
+        return cls(descriptor, size)
+
+    def fontDescriptor(self):
+        return self._descriptor
+
+    def fontName(self):
+        return '.AppleSystemUIFont'
+
+    def pointSize(self):
+        return self._size
+
+# - Controls
+
+class NSView(NSObject):
+
+    def __init__(self):
+        self._hidden = False
+        self._window = NSWindow()
+        self._height = 200.0
+        self._posts_frame_changed_notifications = False
+
+    def isHiddenOrHasHiddenAncestor(self):
+        return self._hidden
+
+    def setHidden_(self, hidden):
+        self._hidden = hidden
+
+    def window(self):
+        return self._window
+
+    def visibleRect(self):
+        return _Rect(0.0, 0.0, 160.0, self._height)
+
+    def setPostsFrameChangedNotifications_(self, flag):
+        self._posts_frame_changed_notifications = flag
+
+    def setFrameSize_(self, size):
+        # As Glyphs does to the view of a palette it collapses or expands.
+        self._height = size[1]
+        if self._posts_frame_changed_notifications:
+            NSNotificationCenter.defaultCenter().postNotificationName_object_userInfo_(NSViewFrameDidChangeNotification, self, None)
+
+class _Size(object):
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+class _Point(object):
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+class _Rect(object):
+
+    def __init__(self, x, y, width, height):
+        self.origin = _Point(x, y)
+        self.size = _Size(width, height)
+
+class NSWindow(NSObject):
+
+    def __init__(self):
+        self._visible = True
+
+    def isVisible(self):
+        return self._visible
+
+    def orderOut_(self, sender):
+        self._set_visible(False)
+
+    def orderFront_(self, sender):
+        self._set_visible(True)
+
+    def _set_visible(self, visible):
+        self._visible = visible
+        NSNotificationCenter.defaultCenter().postNotificationName_object_userInfo_(NSWindowDidChangeOcclusionStateNotification, self, None)
+
+class NSBindingMixin(object):
+
+    # The bound value is pulled again whenever the observed key path changes.
+
+    def bind_toObject_withKeyPath_options_(self, binding, obj, key_path, options):
+        bindings = self.__dict__.setdefault('_bindings', {})
+        if binding in bindings:
+            self.unbind_(binding)
+        bindings[binding] = {NSObservedObjectKey: obj, NSObservedKeyPathKey: key_path, NSOptionsKey: options or {}}
+        obj.addObserver_forKeyPath_options_context_(self, key_path, 0, binding)
+        self.pull_binding(binding)
+
+    def unbind_(self, binding):
+        info = self.__dict__.get('_bindings', {}).pop(binding, None)
+        if info is not None:
+            info[NSObservedObjectKey].removeObserver_forKeyPath_(self, info[NSObservedKeyPathKey])
+
+    def infoForBinding_(self, binding):
+        return self.__dict__.get('_bindings', {}).get(binding)
+
+    def pull_binding(self, binding):
+        info = self.__dict__['_bindings'][binding]
+        self.bound_values[binding] = info[NSObservedObjectKey].valueForKeyPath_(info[NSObservedKeyPathKey])
+
+    def observeValueForKeyPath_ofObject_change_context_(self, key_path, obj, change, context):
+        for binding, info in list(self.__dict__.get('_bindings', {}).items()):
+            if info[NSObservedObjectKey] is obj and info[NSObservedKeyPathKey] == key_path:
+                self.pull_binding(binding)
+
+class NSTextField(NSBindingMixin, NSObject):
+
+    def __init__(self, identifier=None):
+        self.identifier = identifier
+        self.bound_values = {}
+        self._font = NSFont.systemFontOfSize_(11.0)
+        self._next_key_view = None
+        self._delegate = None
+        self._tool_tip = None
+        self._tool_tip_rects = []
+
+    def __repr__(self):
+        return '<NSTextField {0}>'.format(self.identifier)
+
+    def font(self):
+        return self._font
+
+    def setFont_(self, font):
+        self._font = font
+
+    def setNextKeyView_(self, view):
+        self._next_key_view = view
+
+    def nextKeyView(self):
+        return self._next_key_view
+
+    def setDelegate_(self, delegate):
+        self._delegate = delegate
+
+    def setToolTip_(self, tool_tip):
+        self._tool_tip = tool_tip
+
+    def toolTip(self):
+        return self._tool_tip
+
+    def bounds(self):
+        return _Rect(0.0, 0.0, 100.0, 22.0)
+
+    def addToolTipRect_owner_userData_(self, rect, owner, data):
+        self._tool_tip_rects.append((rect, owner, data))
+        return len(self._tool_tip_rects)
+
+    def tool_tip_on_hover(self):
+        # What the pointer resting on the field shows: the owner of a tool tip rect is asked for the string then.
+        for tag, (rect, owner, data) in enumerate(self._tool_tip_rects, 1):
+            return owner.view_stringForToolTip_point_userData_(self, tag, rect.origin, data)
+        return self._tool_tip
+
+    def objectValue(self):
+        return self.bound_values.get(NSValueBinding)
+
+class _Selection(object):
+
+    # - [NSArrayController selection]: the shared value of the selected objects, or a marker.
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def valueForKeyPath_(self, key_path):
+        objects = self.controller.selectedObjects()
+        if not objects:
+            return NSNoSelectionMarker
+        values = [obj.valueForKeyPath_(key_path) for obj in objects]
+        first = values[0]
+        for value in values[1:]:
+            if value != first:
+                return NSMultipleValuesMarker
+        return first
+
+    valueForKey_ = valueForKeyPath_
+
+class NSArrayController(NSBindingMixin, NSObject):
+
+    def __init__(self, identifier=None):
+        self.identifier = identifier
+        self.bound_values = {}
+        self._content = []
+        self._selected = []
+        self._selected_ids = set()
+        self._selection = _Selection(self)
+        self._observed_keys = {}
+
+    def __repr__(self):
+        return '<NSArrayController {0}>'.format(self.identifier)
+
+    def pull_binding(self, binding):
+        # Not for the content the controller has just pushed itself.
+        if binding == NSContentArrayBinding and self.__dict__.get('_pushing'):
+            return
+        NSBindingMixin.pull_binding(self, binding)
+        if binding == NSContentArrayBinding:
+            self.setContent_(self.bound_values[binding])
+
+    def _push_content(self):
+        # What goes through - mutableArrayValueForKeyPath: of the object the content array is bound to.
+        info = self.infoForBinding_(NSContentArrayBinding)
+        if info is None:
+            return
+        self._pushing = True
+        try:
+            info[NSObservedObjectKey].setValue_forKey_(list(self._content), info[NSObservedKeyPathKey])
+        finally:
+            self._pushing = False
+        self.bound_values[NSContentArrayBinding] = self._content
+
+    def setContent_(self, content):
+        self._content = list(content or ())
+        # The selection is kept for the objects that are still there.
+        content_ids = set(id(obj) for obj in self._content)
+        self._set_selected([obj for obj in self._selected if id(obj) in content_ids])
+
+    def content(self):
+        return self._content
+
+    def arrangedObjects(self):
+        return self._content
+
+    def selectedObjects(self):
+        return self._selected
+
+    def selection(self):
+        return self._selection
+
+    def addSelectedObjects_(self, objects):
+        selected = list(self._selected)
+        for obj in objects:
+            if id(obj) not in self._selected_ids:
+                selected.append(obj)
+        self._set_selected(selected)
+        return True
+
+    def addObjects_(self, objects):
+        # With selectsInsertedObjects, the default, the objects inserted are added to the selection by index;
+        # only they are observed for the `selection.<key>` key paths, the rest of the selection is left alone.
+        objects = [obj for obj in objects if id(obj) not in self._selected_ids]
+        self._content = self._content + objects
+        self._push_content()
+        for key in self._observed_keys:
+            for obj in objects:
+                obj.addObserver_forKeyPath_options_context_(self, key, 0, None)
+        self._selected = self._selected + objects
+        self._selected_ids.update(id(obj) for obj in objects)
+        self.didChangeValueForKey_('selection')
+
+    def removeObjects_(self, objects):
+        removed_ids = set(id(obj) for obj in objects)
+        self._content = [obj for obj in self._content if id(obj) not in removed_ids]
+        self._push_content()
+        removed = [obj for obj in self._selected if id(obj) in removed_ids]
+        for key in self._observed_keys:
+            for obj in removed:
+                obj.removeObserver_forKeyPath_(self, key)
+        self._selected = [obj for obj in self._selected if id(obj) not in removed_ids]
+        self._selected_ids.difference_update(removed_ids)
+        self.didChangeValueForKey_('selection')
+
+    def _set_selected(self, objects):
+        for key in self._observed_keys:
+            for obj in self._selected:
+                obj.removeObserver_forKeyPath_(self, key)
+            for obj in objects:
+                obj.addObserver_forKeyPath_options_context_(self, key, 0, None)
+        self._selected = objects
+        self._selected_ids = set(id(obj) for obj in objects)
+        self.didChangeValueForKey_('selection')
+
+    # Observers of `selection.<key>` are told about the changes of <key> in any selected object.
+
+    def addObserver_forKeyPath_options_context_(self, observer, key_path, options, context):
+        NSObject.addObserver_forKeyPath_options_context_(self, observer, key_path, options, context)
+        first, _, key = key_path.partition('.')
+        if first == 'selection' and key:
+            count = self._observed_keys.get(key, 0)
+            if not count:
+                for obj in self._selected:
+                    obj.addObserver_forKeyPath_options_context_(self, key, 0, None)
+            self._observed_keys[key] = count + 1
+
+    def removeObserver_forKeyPath_(self, observer, key_path):
+        NSObject.removeObserver_forKeyPath_(self, observer, key_path)
+        first, _, key = key_path.partition('.')
+        if first == 'selection' and key in self._observed_keys:
+            self._observed_keys[key] -= 1
+            if not self._observed_keys[key]:
+                del self._observed_keys[key]
+                for obj in self._selected:
+                    obj.removeObserver_forKeyPath_(self, key)
+
+    def observeValueForKeyPath_ofObject_change_context_(self, key_path, obj, change, context):
+        if id(obj) in self._selected_ids and key_path in self._observed_keys:
+            for observer in list(self.__dict__.get('_kvo_observers', {}).get('selection.' + key_path, ())):
+                observer.observeValueForKeyPath_ofObject_change_context_('selection.' + key_path, self, change, None)
+        else:
+            NSBindingMixin.observeValueForKeyPath_ofObject_change_context_(self, key_path, obj, change, context)
+
+# - Table Views and Menus
+
+class NSCell(NSObject):
+
+    def __init__(self):
+        self._font = NSFont.systemFontOfSize_(11.0)
+
+    def font(self):
+        return self._font
+
+    def setFont_(self, font):
+        self._font = font
+
+class NSTableColumn(NSBindingMixin, NSObject):
+
+    def initWithIdentifier_(self, identifier):
+        self._identifier = identifier
+        self._title = identifier
+        self._hidden = False
+        self._data_cell = NSCell()
+        self._width = 60.0
+        self._min_width = 10.0
+        self._max_width = 1000.0
+        self._sort_descriptor = None
+        self.bound_values = {}
+        return self
+
+    def __repr__(self):
+        return '<NSTableColumn {0}>'.format(self._identifier)
+
+    def identifier(self):
+        return self._identifier
+
+    def title(self):
+        return self._title
+
+    def setTitle_(self, title):
+        self._title = title
+
+    def setHidden_(self, hidden):
+        self._hidden = hidden
+
+    def isHidden(self):
+        return self._hidden
+
+    def dataCell(self):
+        return self._data_cell
+
+    def width(self):
+        return self._width
+
+    def setWidth_(self, width):
+        self._width = width
+
+    def minWidth(self):
+        return self._min_width
+
+    def setMinWidth_(self, width):
+        self._min_width = width
+
+    def maxWidth(self):
+        return self._max_width
+
+    def setMaxWidth_(self, width):
+        self._max_width = width
+
+    def sortDescriptorPrototype(self):
+        return self._sort_descriptor
+
+    def setSortDescriptorPrototype_(self, descriptor):
+        self._sort_descriptor = descriptor
+
+    def pull_binding(self, binding):
+        # The list doesn't draw, so there's nothing to pull.
+        pass
+
+class NSMenuItem(NSObject):
+
+    def initWithTitle_action_keyEquivalent_(self, title, action, key_equivalent):
+        self._title = title
+        self._action = action
+        self._target = None
+        self._represented_object = None
+        return self
+
+    def __repr__(self):
+        return '<NSMenuItem {0}>'.format(self._title)
+
+    def title(self):
+        return self._title
+
+    def action(self):
+        return self._action
+
+    def setAction_(self, action):
+        self._action = action
+
+    def target(self):
+        return self._target
+
+    def setTarget_(self, target):
+        self._target = target
+
+    def representedObject(self):
+        return self._represented_object
+
+    def setRepresentedObject_(self, obj):
+        self._represented_object = obj
+
+class NSMenu(NSObject):
+
+    def __init__(self):
+        self._items = []
+
+    def itemArray(self):
+        return list(self._items)
+
+    def numberOfItems(self):
+        return len(self._items)
+
+    def itemWithTitle_(self, title):
+        for item in self._items:
+            if item.title() == title:
+                return item
+        return None
+
+    def addItem_(self, item):
+        self._items.append(item)
+
+    def insertItem_atIndex_(self, item, index):
+        self._items.insert(index, item)
+
+class NSTableHeaderView(NSObject):
+
+    def __init__(self):
+        self._menu = NSMenu()
+
+    def menu(self):
+        return self._menu
+
+class NSTableView(NSObject):
+
+    def __init__(self):
+        self._columns = []
+        self._header_view = NSTableHeaderView()
+        self.redraws = 0
+
+    def tableColumns(self):
+        return list(self._columns)
+
+    def numberOfColumns(self):
+        return len(self._columns)
+
+    def tableColumnWithIdentifier_(self, identifier):
+        for column in self._columns:
+            if column.identifier() == identifier:
+                return column
+        return None
+
+    def columnWithIdentifier_(self, identifier):
+        for index, column in enumerate(self._columns):
+            if column.identifier() == identifier:
+                return index
+        return -1
+
+    def addTableColumn_(self, column):
+        self._columns.append(column)
+
+    def moveColumn_toColumn_(self, old_index, new_index):
+        self._columns.insert(new_index, self._columns.pop(old_index))
+
+    def headerView(self):
+        return self._header_view
+
+    def setNeedsDisplay_(self, flag):
+        self.redraws += 1
@@ -0,0 +1,189 @@
+# encoding: utf-8
+
+# A stand-in for Foundation, just enough of it to exec plugin.py headless. See tests/headless.py.
+
+from __future__ import division, print_function, unicode_literals
+
+class NSObject(object):
+
+    # alloc/init and a synchronous, in-process key-value observing.
+
+    _kvo_affected = {}
+
+    @classmethod
+    def alloc(cls):
+        return cls.__new__(cls)
+
+    @classmethod
+    def new(cls):
+        return cls.alloc().init()
+
+    def init(self):
+        return self
+
+    @classmethod
+    def instancesRespondToSelector_(cls, selector):
+        if isinstance(selector, bytes):
+            selector = selector.decode('ascii')
+        return callable(getattr(cls, selector.replace(':', '_'), None))
+
+    def respondsToSelector_(self, selector):
+        return self.__class__.instancesRespondToSelector_(selector)
+
+    @classmethod
+    def cancelPreviousPerformRequestsWithTarget_(cls, target):
+        pass
+
+    def performSelector_withObject_afterDelay_(self, selector, obj, delay):
+        # Run loop-less: the perform requests are run by tests/headless.py when it flushes them.
+        pending_performs.append((self, selector, obj))
+
+    def hash(self):
+        return id(self)
+
+    # Key-value coding
+
+    def valueForKey_(self, key):
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            return self.valueForUndefinedKey_(key)
+        if callable(value) and getattr(value, '__self__', None) is self:
+            return value()
+        return value
+
+    def valueForKeyPath_(self, key_path):
+        key, _, rest = key_path.partition('.')
+        value = self.valueForKey_(key)
+        if rest:
+            return value.valueForKeyPath_(rest) if value is not None else None
+        return value
+
+    def valueForUndefinedKey_(self, key):
+        raise AttributeError(key)
+
+    def setValue_forKey_(self, value, key):
+        if hasattr(self, key):
+            setattr(self, key, value)
+        else:
+            self.setValue_forUndefinedKey_(value, key)
+
+    def setValue_forUndefinedKey_(self, value, key):
+        raise AttributeError(key)
+
+    # Key-value observing
+
+    def addObserver_forKeyPath_options_context_(self, observer, key_path, options, context):
+        observers = self.__dict__.setdefault('_kvo_observers', {})
+        observers.setdefault(key_path, []).append(observer)
+
+    def removeObserver_forKeyPath_(self, observer, key_path):
+        # By identity, as Cocoa compares the pointers.
+        objects = self.__dict__['_kvo_observers'][key_path]
+        for i, obj in enumerate(objects):
+            if obj is observer:
+                del objects[i]
+                return
+        raise ValueError('{0!r} is not registered as an observer of {1}'.format(observer, key_path))
+
+    def observationInfo(self):
+        observers = self.__dict__.get('_kvo_observers')
+        info = dict((key_path, list(objects)) for key_path, objects in observers.items() if objects) if observers else None
+        return info or None
+
+    def willChangeValueForKey_(self, key):
+        pass
+
+    def didChangeValueForKey_(self, key):
+        observers = self.__dict__.get('_kvo_observers')
+        if not observers:
+            return
+        keys = (key,) + self._kvo_affected.get(key, ())
+        for key_path, objects in list(observers.items()):
+            if not objects:
+                continue
+            first = key_path.partition('.')[0]
+            if first in keys:
+                for observer in list(objects):
+                    observer.observeValueForKeyPath_ofObject_change_context_(key_path, self, {}, None)
+
+    def observeValueForKeyPath_ofObject_change_context_(self, key_path, obj, change, context):
+        pass
+
+NSUndoManagerDidCloseUndoGroupNotification = 'NSUndoManagerDidCloseUndoGroupNotification'
+NSUndoManagerDidUndoChangeNotification     = 'NSUndoManagerDidUndoChangeNotification'
+NSUndoManagerDidRedoChangeNotification     = 'NSUndoManagerDidRedoChangeNotification'
+
+# Requests made with - performSelector:withObject:afterDelay:, oldest first.
+pending_performs = []
+
+class NSArray(list):
+
+    @classmethod
+    def arrayWithArray_(cls, array):
+        return cls(array)
+
+class NSString(object):
+    pass
+
+class NSValueTransformer(NSObject):
+    pass
+
+class NSSortDescriptor(NSObject):
+
+    @classmethod
+    def sortDescriptorWithKey_ascending_selector_(cls, key, ascending, selector):
+        descriptor = cls.alloc().init()
+        descriptor._key = key
+        descriptor._ascending = ascending
+        descriptor._selector = selector
+        return descriptor
+
+    def key(self):
+        return self._key
+
+    def selector(self):
+        return self._selector
+
+class NSNotification(NSObject):
+
+    @classmethod
+    def notificationWithName_object_(cls, name, obj):
+        notification = cls.alloc().init()
+        notification._name = name
+        notification._object = obj
+        notification._user_info = None
+        return notification
+
+    def name(self):
+        return self._name
+
+    def object(self):
+        return self._object
+
+    def userInfo(self):
+        return self._user_info
+
+class NSNotificationCenter(NSObject):
+
+    _default = None
+
+    @classmethod
+    def defaultCenter(cls):
+        if cls._default is None:
+            cls._default = cls.alloc().init()
+            cls._default.observers = []
+        return cls._default
+
+    def addObserver_selector_name_object_(self, observer, selector, name, obj):
+        self.observers.append((observer, selector, name, obj))
+
+    def removeObserver_(self, observer):
+        self.observers = [entry for entry in self.observers if entry[0] is not observer]
+
+    def postNotificationName_object_userInfo_(self, name, obj, user_info):
+        notification = NSNotification.notificationWithName_object_(name, obj)
+        notification._user_info = user_info
+        for observer, selector, observed_name, observed_object in list(self.observers):
+            if observed_name in (None, name) and observed_object in (None, obj):
+                getattr(observer, selector.replace(':', '_'))(notification)
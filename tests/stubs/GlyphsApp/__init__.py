@@ -0,0 +1,396 @@
+# encoding: utf-8
+
+# A stand-in for the GlyphsApp module, just enough of it to exec plugin.py headless. See tests/headless.py.
+# The layers speak the Glyphs 3 selectors of the vertical metrics and post KVO notifications when they change.
+
+from __future__ import division, print_function, unicode_literals
+
+from Foundation import NSObject, NSNotificationCenter, NSUndoManagerDidCloseUndoGroupNotification, NSUndoManagerDidUndoChangeNotification
+from AppKit import NSArrayController, NSMenuItem, NSTableColumn, NSTableView
+
+__all__ = [
+    'Glyphs', 'GSFont', 'GSFontMaster', 'GSGlyph', 'GSLayer', 'Message', 'LogError', 'GetSaveFile', 'GetOpenFile', 'NSMenuItem', 'NSObject',
+    'UPDATEINTERFACE', 'DOCUMENTOPENED', 'DOCUMENTACTIVATED', 'DOCUMENTWASSAVED', 'DOCUMENTCLOSED', 'GLYPH_MENU',
+]
+
+UPDATEINTERFACE   = 'GSUpdateInterface'
+DOCUMENTOPENED    = 'GSDocumentWasOpenedNotification'
+DOCUMENTACTIVATED = 'GSDocumentActivateNotification'
+DOCUMENTWASSAVED  = 'GSDocumentWasSavedSuccessfully'
+DOCUMENTCLOSED    = 'GSDocumentCloseNotification'
+
+GLYPH_MENU = 'Glyph'
+
+NOT_FOUND = 0x7fffffffffffffff
+
+METRICS_KEY_OUT_OF_SYNC = 1 << 0
+
+# Everything passed to LogError(), so that the headless runs can fail loudly on swallowed exceptions.
+logged_errors = []
+
+def LogError(message):
+    logged_errors.append(message)
+
+def Message(message, title='Alert', OKButton=None):
+    pass
+
+# What the file dialogs answer; set by the tests.
+file_dialog_paths = []
+
+def GetSaveFile(message=None, ProposedFileName=None, filetypes=None):
+    return file_dialog_paths.pop(0) if file_dialog_paths else None
+
+def GetOpenFile(message=None, allowsMultipleSelection=False, filetypes=None, path=None):
+    return file_dialog_paths.pop(0) if file_dialog_paths else None
+
+class _Defaults(dict):
+
+    def __missing__(self, key):
+        return None
+
+class _Application(object):
+
+    def __init__(self):
+        self.defaults = _Defaults()
+        self.font = None
+        self.fonts = []
+        self.menu = {GLYPH_MENU: []}
+        self.callbacks = {}
+
+    def localize(self, strings):
+        return strings.get('en')
+
+    def addCallback(self, function, event):
+        self.callbacks.setdefault(event, []).append(function)
+
+    def removeCallback(self, function, event=None):
+        for functions in self.callbacks.values():
+            while function in functions:
+                functions.remove(function)
+
+    def showMacroWindow(self):
+        pass
+
+    def post(self, event, obj):
+        # Calls the callbacks like Glyphs does, with a notification that has the object.
+        from Foundation import NSNotification
+        notification = NSNotification.notificationWithName_object_(event, obj)
+        for function in list(self.callbacks.get(event, ())):
+            function(notification)
+
+Glyphs = _Application()
+
+class _UndoManager(object):
+
+    def __init__(self):
+        self.groups = 0
+        self.action_name = None
+
+    def beginUndoGrouping(self):
+        self.groups += 1
+
+    def endUndoGrouping(self):
+        # Posted for the nested groups as well, like Cocoa does.
+        NSNotificationCenter.defaultCenter().postNotificationName_object_userInfo_(NSUndoManagerDidCloseUndoGroupNotification, self, None)
+
+    def undo(self):
+        # Nothing is undone; only what the observers hear about it.
+        NSNotificationCenter.defaultCenter().postNotificationName_object_userInfo_(NSUndoManagerDidUndoChangeNotification, self, None)
+
+    def setActionName_(self, name):
+        self.action_name = name
+
+class GSFontMaster(NSObject):
+
+    def __init__(self, master_id, name, weight, ascender=880, descender=-120):
+        self.id = master_id
+        self.name = name
+        self.axes = [weight]
+        self.weightValue = weight
+        self.ascender = ascender
+        self.descender = descender
+
+class _Layers(object):
+
+    # glyph.layers: by position or master id.
+
+    def __init__(self, glyph):
+        self._glyph = glyph
+        self._list = []
+        self._by_id = {}
+
+    def append(self, layer):
+        layer.parent = self._glyph
+        self._list.append(layer)
+        self._by_id.setdefault(layer.layerId, layer)
+
+    def __len__(self):
+        return len(self._list)
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._list[key]
+        return self._by_id.get(key)
+
+class GSLayer(NSObject):
+
+    def __init__(self, master_id, vert_origin=NOT_FOUND, vert_width=NOT_FOUND, TSB=100.0, BSB=100.0):
+        self.parent = None
+        self.layerId = master_id
+        self.associatedMasterId = master_id
+        self._vert_origin = vert_origin
+        self._vert_width = vert_width
+        self._TSB = TSB
+        self._BSB = BSB
+        self._top_key = None
+        self._bottom_key = None
+        self._vert_width_key = None
+
+    def __repr__(self):
+        return '<GSLayer {0} {1}>'.format(self.parent.name if self.parent else None, self.layerId)
+
+    @property
+    def pyobjc_instanceMethods(self):
+        return self
+
+    def _changed(self, key):
+        self.willChangeValueForKey_(key)
+        if self.parent is not None:
+            self.parent._last_change += 1
+        self.didChangeValueForKey_(key)
+
+    # Values
+
+    def vertOrigin(self):
+        return self._vert_origin
+
+    def setVertOrigin_(self, value):
+        self._vert_origin = value
+        self._changed('vertOrigin')
+
+    def vertWidth(self):
+        if self._vert_width != NOT_FOUND:
+            return self._vert_width
+        master = self.master
+        return master.ascender - master.descender if master else 1000.0
+
+    def setVertWidth_(self, value):
+        self._vert_width = value
+        self._changed('vertWidth')
+
+    def TSB(self):
+        return self._TSB
+
+    def BSB(self):
+        return self._BSB
+
+    @property
+    def master(self):
+        font = self.parent.parent if self.parent is not None else None
+        return font.master_for_id(self.associatedMasterId) if font is not None else None
+
+    # Metrics keys
+
+    def topMetricsKey(self):
+        return self._top_key
+
+    def bottomMetricsKey(self):
+        return self._bottom_key
+
+    def vertWidthMetricsKey(self):
+        return self._vert_width_key
+
+    def topMetricsKeyUI(self):
+        return self._top_key
+
+    def setTopMetricsKeyUI_(self, value):
+        self._top_key = value or None
+        self._changed('topMetricsKeyUI')
+
+    def bottomMetricsKeyUI(self):
+        return self._bottom_key
+
+    def setBottomMetricsKeyUI_(self, value):
+        self._bottom_key = value or None
+        self._changed('bottomMetricsKeyUI')
+
+    def vertWidthMetricsKeyUI(self):
+        return self._vert_width_key
+
+    def setVertWidthMetricsKeyUI_(self, value):
+        self._vert_width_key = value or None
+        self._changed('vertWidthMetricsKeyUI')
+
+    def vertOriginKeyUI(self):
+        return '{0:.0f}'.format(self._vert_origin)
+
+    def setVertOriginKeyUI_(self, value):
+        if value:
+            self._vert_origin = float(value)
+        self._changed('vertOrigin')
+
+    def topMetricsKeyState(self):
+        return 0
+
+    def bottomMetricsKeyState(self):
+        return 0
+
+    def vertWidthMetricsKeyState(self):
+        return 0
+
+    def colorForMetricsState_(self, state):
+        from AppKit import NSColor
+        return NSColor.systemRedColor() if state & METRICS_KEY_OUT_OF_SYNC else NSColor.controlTextColor()
+
+    def metricsValue_atHeight_(self, tag, height):
+        return 0.0
+
+    def validateLeftetricsKey_error_(self, value, error):
+        return (True, value, None)
+
+    def validateRightMetricsKey_error_(self, value, error):
+        return (True, value, None)
+
+    def syncTopMetrics(self):
+        pass
+
+    def syncBottomMetrics(self):
+        pass
+
+    def syncVertWidthMetrics(self):
+        pass
+
+class GSGlyph(NSObject):
+
+    def __init__(self, name):
+        self.name = name
+        self.parent = None
+        self._top_kerning_group = None
+        self._bottom_kerning_group = None
+        self.layers = _Layers(self)
+        self._last_change = 0
+
+    def _changed(self, key):
+        self.willChangeValueForKey_(key)
+        self._last_change += 1
+        self.didChangeValueForKey_(key)
+
+    @property
+    def topKerningGroup(self):
+        return self._top_kerning_group
+
+    @topKerningGroup.setter
+    def topKerningGroup(self, value):
+        self._top_kerning_group = value or None
+        self._changed('topKerningGroup')
+
+    @property
+    def bottomKerningGroup(self):
+        return self._bottom_kerning_group
+
+    @bottomKerningGroup.setter
+    def bottomKerningGroup(self, value):
+        self._bottom_kerning_group = value or None
+        self._changed('bottomKerningGroup')
+
+    def __repr__(self):
+        return '<GSGlyph {0}>'.format(self.name)
+
+    @property
+    def pyobjc_instanceMethods(self):
+        return self
+
+    def lastChange(self):
+        return self._last_change
+
+class _Glyphs(object):
+
+    # font.glyphs: by position or name, None for unknown names.
+
+    def __init__(self, font):
+        self._font = font
+        self._list = []
+        self._by_name = {}
+
+    def append(self, glyph):
+        glyph.parent = self._font
+        self._list.append(glyph)
+        self._by_name[glyph.name] = glyph
+
+    def __len__(self):
+        return len(self._list)
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._list[key]
+        return self._by_name.get(key)
+
+class _FontViewController(NSObject):
+
+    def __init__(self):
+        self._table_view = NSTableView()
+        self._glyphs_array_controller = NSArrayController('glyphs')
+        for identifier in ('Name', 'Left Group', 'Right Group', 'VerticalWidth'):
+            column = NSTableColumn.alloc().initWithIdentifier_(identifier)
+            self._table_view.addTableColumn_(column)
+            menu_item = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(identifier, 'toggleColumn:', '')
+            menu_item.setRepresentedObject_(column)
+            self._table_view.headerView().menu().addItem_(menu_item)
+
+    def listViewTableview(self):
+        return self._table_view
+
+    def glyphsArrayController(self):
+        return self._glyphs_array_controller
+
+class _Document(NSObject):
+
+    # What the document callbacks come with.
+
+    def __init__(self, font):
+        self.font = font
+
+class GSFont(NSObject):
+
+    def __init__(self, family_name='Untitled'):
+        self.familyName = family_name
+        self.masters = []
+        self.glyphs = _Glyphs(self)
+        self.kerningVertical = {}
+        self.selection = []
+        self.selectedLayers = []
+        self.currentTab = None
+        self.selectedFontMaster = None
+        self.fontView = _FontViewController()
+        self._undo_manager = _UndoManager()
+        self.update_interface_disabled = 0
+
+    def __repr__(self):
+        return '<GSFont {0}>'.format(self.familyName)
+
+    def master_for_id(self, master_id):
+        for master in self.masters:
+            if master.id == master_id:
+                return master
+        return None
+
+    def glyphAtIndex_(self, index):
+        return self.glyphs[index] if 0 <= index < len(self.glyphs) else None
+
+    def glyphForId_(self, glyph_id):
+        return None
+
+    def undoManager(self):
+        return self._undo_manager
+
+    def disableUpdateInterface(self):
+        self.update_interface_disabled += 1
+
+    def enableUpdateInterface(self):
+        self.update_interface_disabled -= 1
@@ -0,0 +1,56 @@
+# encoding: utf-8
+
+# A stand-in for GlyphsApp.plugins. See tests/headless.py.
+
+from __future__ import division, print_function, unicode_literals
+import os
+import xml.etree.ElementTree as ElementTree
+
+from Foundation import NSObject
+from AppKit import NSArrayController, NSTextField, NSView, NSContentArrayBinding
+
+__all__ = ['PalettePlugin']
+
+FILES_OWNER = '-2'
+
+CLASSES = {'arrayController': NSArrayController, 'textField': NSTextField, 'customView': NSView}
+
+BINDINGS = (('arrayController', (NSContentArrayBinding,)), ('textField', ('value', 'textColor')))
+
+_nibs = {}
+
+def _compile(path):
+    # Reads <name>.xib once into what loading it takes: the objects to make, the outlets of File's Owner, then the
+    # bindings of the array controllers to File's Owner and those of the text fields. Glyphs loads a compiled nib.
+    nib = _nibs.get(path)
+    if nib is None:
+        root = ElementTree.parse(path).getroot()
+        elements = dict((element.get('id'), element) for element in root.iter() if element.get('id'))
+        objects = [(element.get('id'), CLASSES[element.tag]) for element in root.iter() if element.tag in CLASSES]
+        outlets = [(outlet.get('property'), outlet.get('destination')) for outlet in elements[FILES_OWNER].iter('outlet')]
+        bindings = []
+        for tag, binding_names in BINDINGS:
+            for element in root.iter(tag):
+                for binding in element.iter('binding'):
+                    if binding.get('name') in binding_names:
+                        bindings.append((element.get('id'), binding.get('name'), binding.get('destination'), binding.get('keyPath')))
+        nib = _nibs[path] = (objects, outlets, bindings)
+    return nib
+
+class PalettePlugin(NSObject):
+
+    def windowController(self):
+        return self._window_controller
+
+    def loadNib(self, name, path):
+        self._window_controller = object()
+        object_classes, outlets, bindings = _compile(os.path.join(os.path.dirname(path), name + '.xib'))
+        objects = {FILES_OWNER: self}
+        for object_id, cls in object_classes:
+            objects[object_id] = cls(object_id) if cls is not NSView else cls()
+        for name, destination in outlets:
+            obj = objects.get(destination)
+            if obj is not None:
+                setattr(self, name, obj)
+        for object_id, binding, destination, key_path in bindings:
+            objects[object_id].bind_toObject_withKeyPath_options_(binding, objects[destination], key_path, {})
@@ -0,0 +1,93 @@
+# encoding: utf-8
+
+# A stand-in for PyObjC, just enough of it to exec plugin.py headless. See tests/headless.py.
+
+from __future__ import division, print_function, unicode_literals
+
+_C_ID   = b'@'
+_C_BOOL = b'Z'
+_C_CHR  = b'c'
+_C_PTR  = b'^'
+_C_OUT  = b'o'
+
+super = super
+
+def python_method(function):
+    return function
+
+def IBOutlet():
+    return None
+
+def pyobjc_id(obj):
+    return id(obj)
+
+def registerMetaDataForSelector(class_name, selector, metadata):
+    pass
+
+_classes = {}
+
+def lookUpClass(name):
+    cls = _classes.get(name)
+    if cls is None:
+        cls = _classes[name] = type(str(name), (object,), {})
+    return cls
+
+def Category(cls):
+    # `class GSGlyph(objc.Category(GSGlyph)): ...` adds the methods to GSGlyph and leaves the name bound to it.
+    class CategoryType(type):
+        def __new__(meta, name, bases, namespace):
+            for key, value in namespace.items():
+                if not key.startswith('__'):
+                    setattr(cls, key, value)
+            return cls
+    return type.__new__(CategoryType, str('Category'), (object,), {})
+
+class object_property(object):
+
+    # Stored in the `_name` attribute unless a getter is given. Assigning posts the KVO notifications like
+    # the automatic KVO of Cocoa does for an observed setter, including for the keys declared with `depends_on`.
+
+    def __init__(self, name=None, read_only=False, copy=False, dynamic=False, ivar=None, typestr=_C_ID, depends_on=None):
+        self.name = name
+        self.read_only = read_only
+        self.depends_on = tuple(depends_on or ())
+        self._getter = None
+        self._setter = None
+        self._validate = None
+
+    def __set_name__(self, owner, name):
+        self.name = self.name or name
+        if not hasattr(owner, '_' + self.name):
+            setattr(owner, '_' + self.name, None)
+        # Observers of this property hear about the changes to the keys it depends on.
+        affected = dict(getattr(owner, '_kvo_affected', {}))
+        for key in self.depends_on:
+            affected[key] = affected.get(key, ()) + (self.name,)
+        owner._kvo_affected = affected
+
+    def getter(self, function):
+        self._getter = function
+        return self
+
+    def setter(self, function):
+        self._setter = function
+        return self
+
+    def validate(self, function):
+        self._validate = function
+        return self
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self._getter is not None:
+            return self._getter(instance)
+        return getattr(instance, '_' + self.name)
+
+    def __set__(self, instance, value):
+        instance.willChangeValueForKey_(self.name)
+        if self._setter is not None:
+            self._setter(instance, value)
+        else:
+            setattr(instance, '_' + self.name, value)
+        instance.didChangeValueForKey_(self.name)
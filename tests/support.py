@@ -0,0 +1,260 @@
+# encoding: utf-8
+
+# Shared helpers for the headless tests and benchmarks.
+
+from __future__ import division, print_function, unicode_literals
+import os
+import sys
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES_PATH = os.path.join(ROOT_PATH, 'VerticalGlyphProperties.glyphsPalette', 'Contents', 'Resources')
+
+if RESOURCES_PATH not in sys.path:
+    sys.path.insert(0, RESOURCES_PATH)
+
+# - Test Doubles
+
+class FakeLayer(object):
+
+    # Stands in for GSLayer. Keeps track of the KVO observers registered to it.
+
+    def __init__(self, name='', parent=None):
+        self.name = name
+        self.parent = parent
+        self.observers = {}
+
+    def __repr__(self):
+        return '<FakeLayer {0}>'.format(self.name)
+
+    def addObserver_forKeyPath_options_context_(self, observer, key_path, options, context):
+        self.observers.setdefault(key_path, []).append(observer)
+
+    def removeObserver_forKeyPath_(self, observer, key_path):
+        self.observers[key_path].remove(observer)
+
+    @property
+    def observer_count(self):
+        return sum(len(e) for e in self.observers.values())
+
+class FakeLayerProxy(object):
+
+    # Mimics what VGPPLayer does in its `layer` setter.
+
+    key_paths = ('topMetricsKeyUI', 'bottomMetricsKeyUI', 'vertOrigin', 'vertWidthMetricsKeyUI')
+    registrations = 0
+
+    def __init__(self, layer):
+        self.layer = None
+        self.set_layer(layer)
+
+    def set_layer(self, value):
+        if self.layer is not None:
+            for key_path in self.key_paths:
+                self.layer.removeObserver_forKeyPath_(self, key_path)
+                FakeLayerProxy.registrations += 1
+        self.layer = value
+        if value is not None:
+            for key_path in self.key_paths:
+                value.addObserver_forKeyPath_options_context_(self, key_path, 0, None)
+                FakeLayerProxy.registrations += 1
+
+    @staticmethod
+    def release(proxy):
+        proxy.set_layer(None)
+
+def selector_to_attribute(selector):
+    if isinstance(selector, bytes):
+        selector = selector.decode('ascii')
+    return selector.replace(':', '_')
+
+class StubLayer(object):
+
+    # A GSLayer look-alike with the Glyphs 3 selectors for the vertical metrics.
+    # `pyobjc_instanceMethods` resolves to the object itself just like PyObjC does for the real thing.
+
+    copies = 0
+
+    def __init__(self, vert_origin=0.0, vert_width=1000.0, TSB=100.0, BSB=100.0, state=0, master_id='m01', parent=None):
+        self.associatedMasterId = master_id
+        self.parent = parent
+        self._vert_origin = vert_origin
+        self._vert_width = vert_width
+        self._TSB = TSB
+        self._BSB = BSB
+        self._state = state
+        self._keys = {'top': '', 'bottom': '', 'vertWidth': '', 'vertOrigin': ''}
+
+    @classmethod
+    def instancesRespondToSelector_(cls, selector):
+        return hasattr(cls, selector_to_attribute(selector))
+
+    def respondsToSelector_(self, selector):
+        return hasattr(self, selector_to_attribute(selector))
+
+    @property
+    def pyobjc_instanceMethods(self):
+        return self
+
+    def vertOrigin(self):
+        return self._vert_origin
+
+    def setVertOrigin_(self, value):
+        self._vert_origin = value
+
+    def vertWidth(self):
+        return self._vert_width
+
+    def setVertWidth_(self, value):
+        self._vert_width = value
+
+    def TSB(self):
+        return self._TSB
+
+    def BSB(self):
+        return self._BSB
+
+    def vertOriginKeyUI(self):
+        return self._keys['vertOrigin'] or '{0:.0f}'.format(self._vert_origin)
+
+    def setVertOriginKeyUI_(self, value):
+        self._keys['vertOrigin'] = value
+
+    def topMetricsKey(self):
+        return self._keys['top']
+
+    def bottomMetricsKey(self):
+        return self._keys['bottom']
+
+    def vertWidthMetricsKey(self):
+        return self._keys['vertWidth']
+
+    def topMetricsKeyUI(self):
+        return self._keys['top']
+
+    def setTopMetricsKeyUI_(self, value):
+        self._keys['top'] = value
+
+    def bottomMetricsKeyUI(self):
+        return self._keys['bottom']
+
+    def setBottomMetricsKeyUI_(self, value):
+        self._keys['bottom'] = value
+
+    def vertWidthMetricsKeyUI(self):
+        return self._keys['vertWidth']
+
+    def setVertWidthMetricsKeyUI_(self, value):
+        self._keys['vertWidth'] = value
+
+    def topMetricsKeyState(self):
+        return self._state
+
+    def bottomMetricsKeyState(self):
+        return self._state
+
+    def vertWidthMetricsKeyState(self):
+        return self._state
+
+    def colorForMetricsState_(self, state):
+        return 'red' if state & 1 else 'black'
+
+    def metricsValue_atHeight_(self, tag, height):
+        return 0.0
+
+    def copy(self):
+        StubLayer.copies += 1
+        duplicated = self.__class__.__new__(self.__class__)
+        duplicated.__dict__.update(self.__dict__)
+        duplicated._keys = dict(self._keys)
+        return duplicated
+
+class StubLegacyLayer(StubLayer):
+
+    # The Glyphs 2 flavour: no metrics key state, placeholders passed by reference.
+
+    topMetricsKeyState = None
+    bottomMetricsKeyState = None
+    vertWidthMetricsKeyState = None
+    colorForMetricsState_ = None
+    vertOriginKeyUI = None
+    setVertOriginKeyUI_ = None
+
+    @classmethod
+    def instancesRespondToSelector_(cls, selector):
+        return getattr(cls, selector_to_attribute(selector), None) is not None
+
+    def respondsToSelector_(self, selector):
+        return getattr(self, selector_to_attribute(selector), None) is not None
+
+    def vertOriginUIisPlaceholder_(self, placeholder):
+        return (self.vertOriginUI(), self._vert_origin >= 1000000)
+
+    def vertOriginUI(self):
+        return '{0:.0f}'.format(self._vert_origin)
+
+    def setVertOriginUI_(self, value):
+        self._keys['vertOrigin'] = value
+
+    def vertWidthMetricsKeyUIisPlaceholder_(self, placeholder):
+        return (self._keys['vertWidth'], not self._keys['vertWidth'])
+
+class StubGlyphs(object):
+
+    # font.glyphs: indexable by position or name, None for unknown names like GlyphsApp does.
+
+    def __init__(self, glyphs=()):
+        self._list = []
+        self._by_name = {}
+        for glyph in glyphs:
+            self.append(glyph)
+
+    def append(self, glyph):
+        self._list.append(glyph)
+        self._by_name[glyph.name] = glyph
+
+    def __len__(self):
+        return len(self._list)
+
+    def __iter__(self):
+        return iter(self._list)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._list[key]
+        return self._by_name.get(key)
+
+class StubGlyph(object):
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.layers = {}
+        self.topKerningGroup = None
+        self.bottomKerningGroup = None
+
+    def __repr__(self):
+        return '<StubGlyph {0}>'.format(self.name)
+
+    def add_layer(self, layer):
+        layer.parent = self
+        self.layers[layer.associatedMasterId] = layer
+        return layer
+
+class StubFont(object):
+
+    def __init__(self):
+        self.glyphs = StubGlyphs()
+
+    def add_glyph(self, name, *layers):
+        glyph = StubGlyph(name, self)
+        for layer in layers:
+            glyph.add_layer(layer)
+        self.glyphs.append(glyph)
+        return glyph
+
+    def indexOfGlyph_(self, glyph):
+        # Linear, like the host.
+        for index, other in enumerate(self.glyphs):
+            if other is glyph:
+                return index
+        return 0x7fffffffffffffff
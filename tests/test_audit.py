@@ -0,0 +1,192 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from vgpp.audit import audit, main
+
+FONT = '''{{
+fontMaster = (
+{{
+ascender = 880;
+descender = -120;
+id = "M1";
+weight = {weight};
+}}
+);
+glyphs = (
+{{
+glyphname = H;
+kernTop = H;
+layers = (
+{{
+layerId = "M1";
+paths = (
+{{
+closed = 1;
+nodes = (
+"100 0 LINE",
+"100 700 LINE",
+"500 700 LINE",
+"500 0 LINE"
+);
+}}
+);
+vertOrigin = {origin};
+}}
+);
+}},
+{{
+glyphname = O;
+kernTop = {group};
+topMetricsKey = "=H";
+layers = (
+{{
+layerId = "M1";
+paths = (
+{{
+closed = 1;
+nodes = (
+"100 0 LINE",
+"100 {height} LINE",
+"500 {height} LINE",
+"500 0 LINE"
+);
+}}
+);
+vertOrigin = {origin};
+}}
+);
+}}{extra}
+);
+}}
+'''
+
+EXTRA = ''',
+{
+glyphname = period;
+layers = (
+{
+layerId = "M1";
+}
+);
+}'''
+
+MULTI_MASTER_LAYER = '''{{
+layerId = "{0}";
+vertOrigin = {1};
+}}'''
+
+MULTI_MASTER_FONT = '''{{
+fontMaster = (
+{{
+id = "L";
+weight = Light;
+weightValue = 100;
+}},
+{{
+id = "B";
+weight = Bold;
+weightValue = 200;
+}},
+{{
+id = "R";
+weight = Regular;
+weightValue = 150;
+}}
+);
+glyphs = (
+{{
+glyphname = A;
+layers = (
+{0}
+);
+}}
+);
+}}
+'''
+
+class AuditTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = [
+            self.write('Light.glyphs', weight='Light', origin=80, group='H', height=700, extra=EXTRA),
+            self.write('Bold.glyphs', weight='Bold', origin=60, group='O', height=650, extra=''),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, **values):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(FONT.format(**values))
+        return path
+
+    def kinds(self, findings):
+        return sorted((finding['kind'], finding.get('glyph')) for finding in findings)
+
+    def test_findings(self):
+        findings = list(audit(self.paths, jobs=1))
+        self.assertEqual(self.kinds(findings), [
+            ('group-mismatch', 'O'),
+            ('missing-glyph', 'period'),
+            ('out-of-sync', 'O'),
+            ('value-mismatch', 'H'),
+            ('value-mismatch', 'O'),
+        ])
+        out_of_sync = [finding for finding in findings if finding['kind'] == 'out-of-sync'][0]
+        self.assertEqual((out_of_sync['file'], out_of_sync['master'], out_of_sync['metric']), (self.paths[1], 'Bold', 'TSB'))
+        missing = [finding for finding in findings if finding['kind'] == 'missing-glyph'][0]
+        self.assertEqual(missing['files'], [self.paths[1]])
+
+    def test_process_pool(self):
+        self.assertEqual(self.kinds(audit(self.paths, jobs=2)), self.kinds(audit(self.paths, jobs=1)))
+
+    def test_unreadable_file(self):
+        path = os.path.join(self.directory, 'Broken.glyphs')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write('{\nglyphs = (\n{\nglyphname = A;\n')
+        findings = list(audit([path, self.paths[0]], jobs=1))
+        self.assertEqual(self.kinds(findings), [('file-error', None)])
+
+    def test_file_the_checks_choke_on(self):
+        # A value of the wrong type gets past the reader; the worker reports it and the other files are still audited.
+        path = os.path.join(self.directory, 'Odd.glyphs')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write('{\nfontMaster = (\n{\nid = "M1";\n}\n);\nglyphs = (\n{\nglyphname = A;\nlayers = (\n{\nlayerId = "M1";\nvertOrigin = (1);\n}\n);\n}\n);\n}\n')
+        for jobs in (1, 2):
+            findings = list(audit([path] + self.paths, jobs=jobs))
+            errors = [finding for finding in findings if finding['kind'] == 'file-error']
+            self.assertEqual([finding['file'] for finding in errors], [path])
+            self.assertTrue(errors[0]['detail'].startswith('TypeError'))
+            self.assertIn(('group-mismatch', 'O'), self.kinds(findings))
+
+    def test_masters_within_file(self):
+        layers = ',\n'.join(MULTI_MASTER_LAYER.format(master_id, origin) for master_id, origin in (('L', 80), ('B', 70), ('R', 90)))
+        path = os.path.join(self.directory, 'Family.glyphs')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(MULTI_MASTER_FONT.format(layers))
+        findings = list(audit([path], jobs=1))
+        self.assertEqual(self.kinds(findings), [('non-monotonic', 'A'), ('value-mismatch', 'A')])
+        findings = [finding for finding in findings if finding['kind'] == 'non-monotonic']
+        self.assertEqual(findings[0]['values'], [['Light', 80], ['Regular', 90], ['Bold', 70]])
+
+    def test_main_writes_json_lines(self):
+        output = os.path.join(self.directory, 'audit.jsonl')
+        status = main(['--jobs', '1', '--ignore', 'value-mismatch', '--output', output] + self.paths)
+        self.assertEqual(status, 1)
+        with io.open(output, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[-1]['kind'], 'summary')
+        self.assertEqual(lines[-1]['findings']['value-mismatch'], 0)
+        self.assertEqual(len(lines), 4)
+
+if __name__ == '__main__':
+    unittest.main()
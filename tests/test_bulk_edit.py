@@ -0,0 +1,76 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont, StubLayer, StubLegacyLayer
+from vgpp.bulk_edit import NOT_FOUND, ChangeGate, apply_vertical_properties, shared_value
+
+class ApplyVerticalPropertiesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = StubFont()
+        self.layers = [self.font.add_glyph('g{0}'.format(i), StubLayer()).layers['m01'] for i in range(4)]
+
+    def test_layer_properties(self):
+        self.layers[0].setTopMetricsKeyUI_('=H')
+        result = apply_vertical_properties(self.layers, {'topMetricsKeyUI': '=H', 'vertOriginUI': '=V'})
+        self.assertEqual([layer.topMetricsKeyUI() for layer in self.layers], ['=H'] * 4)
+        self.assertEqual([layer.vertOriginKeyUI() for layer in self.layers], ['=V'] * 4)
+        # The layer already holding the key isn't touched again.
+        self.assertEqual(result.changes, {'topMetricsKeyUI': 3, 'vertOriginUI': 4})
+        self.assertEqual(len(result), 7)
+        self.assertEqual(result.layers, self.layers)
+
+    def test_reset(self):
+        layer = self.layers[0]
+        layer.setVertWidthMetricsKeyUI_('=H')
+        layer.setVertWidth_(900.0)
+        apply_vertical_properties([layer], {'vertWidthMetricsKeyUI': None})
+        self.assertEqual(layer.vertWidthMetricsKeyUI(), '')
+        self.assertEqual(layer.vertWidth(), NOT_FOUND)
+
+    def test_legacy_layers(self):
+        layer = self.font.add_glyph('legacy', StubLegacyLayer()).layers['m01']
+        apply_vertical_properties([layer], {'vertOriginUI': '40'})
+        self.assertEqual(layer._keys['vertOrigin'], '40')
+
+    def test_glyph_properties_once_per_glyph(self):
+        glyph = self.font.add_glyph('multi', StubLayer(master_id='m01'), StubLayer(master_id='m02'))
+        result = apply_vertical_properties(list(glyph.layers.values()) + self.layers, {'topKerningGroup': 'kanji', 'bottomKerningGroup': ''})
+        self.assertEqual(result.changes, {'topKerningGroup': 5})
+        self.assertEqual(result.glyphs[0], glyph)
+        self.assertEqual(set(g.topKerningGroup for g in self.font.glyphs), set(['kanji']))
+        self.assertEqual(result.layers, [])
+
+    def test_unknown_property(self):
+        with self.assertRaises(KeyError):
+            apply_vertical_properties(self.layers, {'LSB': 10})
+
+class ChangeGateTest(unittest.TestCase):
+
+    def test_hold_while_closed(self):
+        gate = ChangeGate()
+        a, b = object(), object()
+        self.assertFalse(gate.hold(a, 'vertOriginUI'))
+        gate.close()
+        gate.close()
+        self.assertTrue(gate.hold(a, 'vertOriginUI'))
+        self.assertTrue(gate.hold(a, 'topMetricsKeyUI'))
+        self.assertTrue(gate.hold(b, 'vertOriginUI'))
+        self.assertIsNone(gate.open())
+        objects, key_paths = gate.open()
+        self.assertEqual(len(objects), 2)
+        self.assertEqual(key_paths, set(['vertOriginUI', 'topMetricsKeyUI']))
+        self.assertFalse(gate.closed)
+        self.assertFalse(gate.hold(a, 'vertOriginUI'))
+
+class SharedValueTest(unittest.TestCase):
+
+    def test_markers(self):
+        self.assertEqual(shared_value([], 'none', 'multiple'), 'none')
+        self.assertEqual(shared_value(['=H', '=H'], 'none', 'multiple'), '=H')
+        self.assertEqual(shared_value(iter(['=H', None]), 'none', 'multiple'), 'multiple')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubLayer, StubLegacyLayer
+from vgpp.capabilities import LayerCapabilities
+
+class LayerCapabilitiesTest(unittest.TestCase):
+
+    def test_resolved_once_per_class(self):
+        self.assertIs(LayerCapabilities.for_layer(StubLayer()), LayerCapabilities.for_layer(StubLayer()))
+        self.assertIsNot(LayerCapabilities.for_layer(StubLayer()), LayerCapabilities.for_layer(StubLegacyLayer()))
+
+    def test_glyphs3_accessors(self):
+        layer = StubLayer(vert_origin=12.0, state=1)
+        capabilities = LayerCapabilities.for_layer(layer)
+        self.assertEqual(capabilities.vert_origin_ui(layer), '12')
+        self.assertFalse(capabilities.top_metrics_key_is_in_sync(layer))
+        self.assertEqual(capabilities.top_metrics_key_color(layer), 'red')
+        capabilities.set_vert_origin_ui(layer, '=H')
+        self.assertEqual(capabilities.vert_origin_ui(layer), '=H')
+
+    def test_glyphs2_accessors(self):
+        layer = StubLegacyLayer(vert_origin=12.0)
+        capabilities = LayerCapabilities.for_layer(layer)
+        self.assertIsNone(capabilities.top_metrics_key_state)
+        self.assertIsNone(capabilities.top_metrics_key_color)
+        self.assertEqual(capabilities.vert_origin_ui(layer), '12')
+        self.assertIsNone(capabilities.vert_width_metrics_key_ui(layer))
+        layer.setVertWidthMetricsKeyUI_('=H')
+        self.assertEqual(capabilities.vert_width_metrics_key_ui(layer), '=H')
+        self.assertTrue(capabilities.top_metrics_key_is_in_sync(layer))
+        layer.setVertOrigin_(float(1 << 40))
+        self.assertIsNone(capabilities.vert_origin_ui(layer))
+
+if __name__ == '__main__':
+    unittest.main()
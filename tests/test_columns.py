@@ -0,0 +1,70 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont, StubLayer
+from vgpp.columns import VerticalMetricsColumns, VERT_ORIGIN
+from vgpp.metrics_keys import TSB
+
+def read_row(glyph):
+    methods = glyph.layers['m01'].pyobjc_instanceMethods
+    return (methods.vertOrigin(), methods.vertWidth(), methods.TSB(), methods.BSB(), glyph.topKerningGroup, glyph.bottomKerningGroup)
+
+class VerticalMetricsColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = StubFont()
+        for name, vert_origin, group in (('a', 30.0, 'x'), ('b', 0x7fffffffffffffff, None), ('c', -10.4, 'w')):
+            self.font.add_glyph(name, StubLayer(vert_origin=vert_origin)).topKerningGroup = group
+        self.stamps = {}
+        self.reads = 0
+        def counting_read_row(glyph):
+            self.reads += 1
+            return read_row(glyph)
+        self.columns = VerticalMetricsColumns(counting_read_row, change_stamp=lambda glyph: self.stamps.get(glyph.name, 0))
+
+    def test_values_and_strings(self):
+        a, b, c = self.font.glyphs
+        self.assertEqual(self.columns.value(a, VERT_ORIGIN), 30.0)
+        self.assertIsNone(self.columns.value(b, VERT_ORIGIN))
+        self.assertEqual(self.columns.string(b, VERT_ORIGIN), '')
+        self.assertEqual(self.columns.string(c, VERT_ORIGIN), '-10')
+        self.assertEqual(self.columns.value(c, TSB), 100.0)
+        self.assertEqual(self.reads, 3)
+
+    def test_refresh(self):
+        a = self.font.glyphs['a']
+        self.columns.fill(self.font.glyphs)
+        a.layers['m01'].setVertOrigin_(40.0)
+        self.assertEqual(self.columns.value(a, VERT_ORIGIN), 30.0)
+        self.stamps['a'] = 1
+        # The stamps are only looked at again once the font has changed.
+        self.assertEqual(self.columns.value(a, VERT_ORIGIN), 30.0)
+        self.columns.advance()
+        self.assertEqual(self.columns.value(a, VERT_ORIGIN), 40.0)
+        self.assertEqual(self.columns.value(self.font.glyphs['b'], VERT_ORIGIN), None)
+        a.layers['m01'].setVertOrigin_(50.0)
+        self.columns.invalidate(a)
+        self.assertEqual(self.columns.value(a, VERT_ORIGIN), 50.0)
+        self.assertEqual(self.reads, 5)
+
+    def test_cells_ask_for_the_stamp_once_per_change(self):
+        asked = []
+        def change_stamp(glyph):
+            asked.append(glyph.name)
+            return 0
+        columns = VerticalMetricsColumns(read_row, change_stamp=change_stamp)
+        a = self.font.glyphs['a']
+        for i in range(3):
+            columns.string(a, VERT_ORIGIN)
+        self.assertEqual(asked, ['a'])
+        columns.advance()
+        for i in range(3):
+            columns.value(a, VERT_ORIGIN)
+        self.assertEqual(asked, ['a', 'a'])
+        self.assertIn(a, columns)
+        self.assertNotIn(self.font.glyphs['b'], columns)
+
+if __name__ == '__main__':
+    unittest.main()
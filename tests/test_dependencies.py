@@ -0,0 +1,93 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont, StubLegacyLayer
+from vgpp.dependencies import MetricsKeyCycleError, MetricsKeyGraph, metrics_key_graph_from_font, refresh_metrics_key_graph, sync_vertical_metrics
+from vgpp.metrics_keys import TSB, BSB, VERT_WIDTH
+
+class SyncingLayer(StubLegacyLayer):
+
+    synced = []
+
+    def syncTopMetrics(self):
+        SyncingLayer.synced.append(self.parent.name)
+
+class MetricsKeyGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = MetricsKeyGraph()
+        self.graph.set_keys('B', {TSB: '=A'})
+        self.graph.set_keys('C', {TSB: '=B', BSB: '=|A'})
+        self.graph.set_keys('D', {VERT_WIDTH: '=C*0.5'})
+        self.graph.set_keys('E', {TSB: '=X'})
+
+    def test_resync_only_dependents_in_order(self):
+        self.assertEqual(self.graph.resync_order(['A']), ['B', 'C', 'D'])
+        self.assertEqual(self.graph.resync_order(['C']), ['C', 'D'])
+        self.assertEqual(self.graph.resync_order(['D']), ['D'])
+        self.assertEqual(sorted(self.graph.resync_order()), ['B', 'C', 'D', 'E'])
+
+    def test_incremental_update(self):
+        self.graph.set_key('D', VERT_WIDTH, '=E')
+        self.assertEqual(self.graph.resync_order(['A']), ['B', 'C'])
+        self.assertEqual(self.graph.dependents_of('C'), set())
+        self.graph.remove_glyph('B')
+        self.assertEqual(self.graph.resync_order(['A']), ['C'])
+
+    def test_cycles(self):
+        self.graph.set_key('A', TSB, '=D')
+        self.assertEqual(sorted(self.graph.cycles()[0]), ['A', 'B', 'C', 'D'])
+        with self.assertRaises(MetricsKeyCycleError):
+            self.graph.resync_order(['B'])
+        self.assertEqual(self.graph.resync_order(['E']), ['E'])
+
+    def test_invalid_keys(self):
+        self.graph.set_key('F', TSB, '=A+')
+        self.assertIn(('F', TSB), self.graph.invalid_keys)
+
+class SyncVerticalMetricsTest(unittest.TestCase):
+
+    def test_sync_from_font(self):
+        font = StubFont()
+        font.add_glyph('A', SyncingLayer())
+        for name, key in (('B', '=A'), ('C', '=B'), ('D', '')):
+            layer = SyncingLayer()
+            layer.setTopMetricsKeyUI_(key)
+            font.add_glyph(name, layer)
+        graph = metrics_key_graph_from_font(font, 'm01')
+        SyncingLayer.synced = []
+        self.assertEqual(sync_vertical_metrics(font, 'm01', graph, ['A']), ['B', 'C'])
+        self.assertEqual(SyncingLayer.synced, ['B', 'C'])
+
+    def test_refresh_reads_only_changed_glyphs(self):
+        font = StubFont()
+        font.add_glyph('A', SyncingLayer())
+        font.add_glyph('B', SyncingLayer())
+        stamps = {'A': 0, 'B': 0}
+        change_stamp = lambda glyph: stamps[glyph.name]
+        graph = metrics_key_graph_from_font(font, 'm01', change_stamp)
+        self.assertEqual(refresh_metrics_key_graph(graph, font, 'm01', change_stamp), 0)
+        # Changed behind the graph's back, e.g. from a script.
+        font.glyphs['B'].layers['m01'].setTopMetricsKeyUI_('=A')
+        stamps['B'] += 1
+        self.assertEqual(refresh_metrics_key_graph(graph, font, 'm01', change_stamp), 1)
+        self.assertEqual(graph.resync_order(['A']), ['B'])
+        font.glyphs = type(font.glyphs)([font.glyphs['A']])
+        refresh_metrics_key_graph(graph, font, 'm01', change_stamp)
+        self.assertEqual(graph.resync_order(['A']), [])
+        self.assertEqual(graph.stamps, {'A': 0})
+
+    def test_hyphenated_glyph_names(self):
+        font = StubFont()
+        for name, key in (('a', ''), ('a-cy', ''), ('b-cy', '=a-cy'), ('c', '=a-20')):
+            layer = SyncingLayer()
+            layer.setTopMetricsKeyUI_(key)
+            font.add_glyph(name, layer)
+        graph = metrics_key_graph_from_font(font, 'm01')
+        self.assertEqual(graph.references_of('b-cy'), set(['a-cy']))
+        self.assertEqual(graph.references_of('c'), set(['a']))
+
+if __name__ == '__main__':
+    unittest.main()
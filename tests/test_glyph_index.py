@@ -0,0 +1,49 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont, StubGlyph
+from vgpp.glyph_index import NOT_FOUND, GlyphIndexMap
+
+class GlyphIndexMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = StubFont()
+        for i in range(10):
+            self.font.add_glyph('g{0}'.format(i))
+        self.index_map = GlyphIndexMap(self.font.glyphs)
+
+    def test_index_of(self):
+        glyphs = list(self.font.glyphs)
+        self.assertEqual([self.index_map.index_of(g) for g in glyphs], list(range(10)))
+        self.assertEqual(self.index_map.sorted(reversed(glyphs)), glyphs)
+        self.assertEqual(self.index_map.index_of(StubGlyph('other')), NOT_FOUND)
+
+    def test_rebuilds_after_reorder(self):
+        glyphs = self.font.glyphs._list
+        glyphs.insert(0, glyphs.pop())
+        self.assertEqual(self.index_map.index_of(glyphs[0]), 0)
+        self.assertEqual(self.index_map.index_of(glyphs[5]), 5)
+        self.assertEqual(self.index_map.rebuilds, 2)
+
+    def test_unknown_glyphs(self):
+        others = [StubGlyph('other{0}'.format(i)) for i in range(100)]
+        for glyph in others:
+            self.assertEqual(self.index_map.index_of(glyph), NOT_FOUND)
+        self.assertEqual(self.index_map.rebuilds, 1)
+        glyphs = list(self.font.glyphs)
+        self.assertEqual(self.index_map.sorted(others + glyphs[::-1])[:10], glyphs)
+        self.assertEqual(self.index_map.rebuilds, 2)
+
+    def test_rebuilds_after_insert_and_replace(self):
+        glyphs = self.font.glyphs._list
+        glyph = StubGlyph('new')
+        glyphs.append(glyph)
+        self.assertEqual(self.index_map.index_of(glyph), 10)
+        glyphs[3] = replacement = StubGlyph('replacement')
+        self.assertEqual(self.index_map.sorted([glyphs[5], replacement]), [replacement, glyphs[5]])
+        self.assertEqual(self.index_map.rebuilds, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,326 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from vgpp.capabilities import LayerCapabilities
+from vgpp.glyphs_reader import NOT_FOUND, GlyphsFileError, GlyphsFileReader, iter_glyphs_file, read_glyphs_file
+from vgpp.outlines import contour_bounds
+
+GLYPHS2_FILE = '''{
+.appVersion = "1342";
+customParameters = (
+{
+name = "Don't care";
+value = "{ ( } ) \\"quoted\\"";
+}
+);
+familyName = "Test \\U00E9";
+fontMaster = (
+{
+ascender = 880;
+capHeight = 700;
+descender = -120;
+id = "M1";
+weightValue = 100;
+},
+{
+ascender = 900;
+descender = -100;
+id = "M2";
+weight = Bold;
+weightValue = 200;
+}
+);
+glyphs = (
+{
+glyphname = H;
+kernTop = H;
+kernBottom = B;
+layers = (
+{
+layerId = "M1";
+paths = (
+{
+closed = 1;
+nodes = (
+"100 0 LINE",
+"100 700 LINE",
+"500 700 LINE",
+"500 0 LINE"
+);
+}
+);
+vertOrigin = 80;
+width = 600;
+},
+{
+layerId = "M2";
+paths = (
+{
+closed = 1;
+nodes = (
+"100 -10 LINE",
+"100 720 LINE",
+"500 720 LINE",
+"500 -10 LINE"
+);
+}
+);
+width = 600;
+}
+);
+unicode = 0048;
+},
+{
+glyphname = O;
+topMetricsKey = "=H";
+vertWidthMetricsKey = "=H+100";
+layers = (
+{
+layerId = "M1";
+paths = (
+{
+closed = 1;
+nodes = (
+"300 -10 OFFCURVE",
+"400 0 OFFCURVE",
+"400 100 CURVE SMOOTH",
+"400 200 OFFCURVE",
+"300 720 OFFCURVE",
+"200 720 CURVE SMOOTH",
+"100 720 OFFCURVE",
+"0 200 OFFCURVE",
+"0 100 CURVE SMOOTH",
+"0 0 OFFCURVE",
+"100 -10 OFFCURVE",
+"200 -10 CURVE SMOOTH"
+);
+}
+);
+vertWidth = 1000;
+width = 400;
+},
+{
+layerId = "M2";
+width = 400;
+}
+);
+},
+{
+glyphname = Hdot;
+layers = (
+{
+components = (
+{
+name = H;
+},
+{
+name = H;
+transform = "{1, 0, 0, 1, 0, 50}";
+}
+);
+layerId = "M1";
+width = 600;
+}
+);
+}
+);
+kerningVertical = {
+M1 = {
+"@MMK_T_B" = {
+"@MMK_B_H" = -20;
+};
+};
+};
+unitsPerEm = 1000;
+}
+'''
+
+GLYPHS3_FILE = '''{
+.formatVersion = 3;
+familyName = Test;
+fontMaster = (
+{
+axesValues = (
+100
+);
+id = m01;
+metricValues = (
+{
+pos = 800;
+},
+{
+pos = -200;
+},
+{
+over = -16;
+}
+);
+name = Regular;
+}
+);
+glyphs = (
+{
+glyphname = A;
+kernBottom = A;
+layers = (
+{
+layerId = m01;
+shapes = (
+{
+closed = 1;
+nodes = (
+(0,100,l),
+(400,100,l),
+(400,600,l),
+(0,600,l)
+);
+}
+);
+vertOrigin = 100;
+width = 400;
+}
+);
+metricTop = "=H";
+},
+{
+glyphname = B;
+layers = (
+{
+layerId = m01;
+metricVertWidth = "=A";
+shapes = (
+{
+pos = (0,-50);
+ref = A;
+}
+);
+width = 400;
+}
+);
+}
+);
+metrics = (
+{
+type = ascender;
+},
+{
+type = descender;
+},
+{
+type = baseline;
+}
+);
+unitsPerEm = 1000;
+}
+'''
+
+class GlyphsReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, contents):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(contents)
+        return path
+
+    def test_glyphs2_file(self):
+        font = read_glyphs_file(self.write('Test.glyphs', GLYPHS2_FILE), with_kerning=True)
+        self.assertEqual(font.familyName, 'Test é')
+        self.assertEqual(font.unitsPerEm, 1000)
+        self.assertEqual([(master.id, master.ascender, master.descender) for master in font.masters], [('M1', 880, -120), ('M2', 900, -100)])
+        self.assertEqual(font.masters[1].name, 'Bold')
+        self.assertEqual([glyph.name for glyph in font.glyphs], ['H', 'O', 'Hdot'])
+        glyph = font.glyphs['H']
+        self.assertEqual((glyph.topKerningGroup, glyph.bottomKerningGroup), ('H', 'B'))
+        layer = glyph.layers['M1']
+        self.assertEqual(layer.vertOrigin(), 80)
+        self.assertEqual(layer.vertWidth(), 1000)
+        # The top of the vertical box is at 880 - 80, the bottom 1000 below.
+        self.assertEqual((layer.TSB(), layer.BSB()), (100, 200))
+        self.assertEqual(glyph.layers['M2'].vertOrigin(), NOT_FOUND)
+        self.assertEqual((glyph.layers['M2'].TSB(), glyph.layers['M2'].BSB()), (180, 90))
+        self.assertEqual(font.kerningVertical, {'M1': {'@MMK_T_B': {'@MMK_B_H': -20}}})
+
+    def test_curve_bounds(self):
+        layer = read_glyphs_file(self.write('Test.glyphs', GLYPHS2_FILE)).glyphs['O'].layers['M1']
+        self.assertEqual(layer.bounds(), (0, -10, 400, 720))
+
+    def test_component_bounds(self):
+        font = read_glyphs_file(self.write('Test.glyphs', GLYPHS2_FILE))
+        self.assertEqual(font.glyphs['Hdot'].layers['M1'].bounds(), (100, 0, 500, 750))
+
+    def test_metrics_keys_in_sync(self):
+        font = read_glyphs_file(self.write('Test.glyphs', GLYPHS2_FILE))
+        layer = font.glyphs['O'].layers['M1']
+        capabilities = LayerCapabilities.for_layer(layer)
+        self.assertEqual(layer.topMetricsKeyUI(), '=H')
+        self.assertIsNone(layer.bottomMetricsKeyUI())
+        self.assertFalse(capabilities.top_metrics_key_is_in_sync(layer))
+        self.assertTrue(capabilities.bottom_metrics_key_is_in_sync(layer))
+        self.assertFalse(capabilities.vert_width_metrics_key_is_in_sync(layer))
+        capabilities.sync_metrics['vertWidth'](layer)
+        self.assertEqual(layer.vertWidth(), 1100)
+        self.assertTrue(capabilities.vert_width_metrics_key_is_in_sync(layer))
+        self.assertIsNone(capabilities.sync_metrics['TSB'])
+
+    def test_glyphs3_file(self):
+        font = read_glyphs_file(self.write('Test.glyphs', GLYPHS3_FILE))
+        self.assertEqual(font.format_version, 3)
+        master = font.masters[0]
+        self.assertEqual((master.id, master.name, master.ascender, master.descender, master.axes), ('m01', 'Regular', 800, -200, (100,)))
+        glyph = font.glyphs['A']
+        layer = glyph.layers['m01']
+        self.assertEqual(glyph.bottomKerningGroup, 'A')
+        self.assertEqual(layer.topMetricsKeyUI(), '=H')
+        self.assertEqual((layer.TSB(), layer.BSB()), (100, 400))
+        other = font.glyphs['B'].layers['m01']
+        self.assertEqual(other.vertWidthMetricsKeyUI(), '=A')
+        self.assertEqual(other.bounds(), (0, 50, 400, 550))
+
+    def test_small_chunks(self):
+        path = self.write('Test.glyphs', GLYPHS2_FILE)
+        expected = read_glyphs_file(path)
+        for chunk_size in (1, 2, 7, 64):
+            font = GlyphsFileReader(path, chunk_size=chunk_size).read()
+            self.assertEqual(font.familyName, expected.familyName)
+            self.assertEqual([glyph.layers[0].bounds() for glyph in font.glyphs], [glyph.layers[0].bounds() for glyph in expected.glyphs])
+        path = self.write('Test3.glyphs', GLYPHS3_FILE)
+        self.assertEqual(GlyphsFileReader(path, chunk_size=3).read().masters[0].descender, -200)
+
+    def test_truncated_file(self):
+        # Cut anywhere, the file is reported as broken rather than crashing the reader.
+        contents = GLYPHS2_FILE.rstrip()
+        for end in range(len(contents)):
+            path = self.write('Truncated.glyphs', contents[:end])
+            with self.assertRaises(GlyphsFileError, msg='cut at {0}'.format(end)):
+                read_glyphs_file(path, with_outlines=True, with_kerning=True)
+
+    def test_streaming(self):
+        glyphs = list(iter_glyphs_file(self.write('Test.glyphs', GLYPHS2_FILE)))
+        self.assertEqual([glyph.name for glyph in glyphs], ['H', 'O', 'Hdot'])
+        self.assertEqual(len(glyphs[0].parent.glyphs), 0)
+        self.assertEqual(glyphs[0].layers['M1'].TSB(), 100)
+
+class OutlinesTest(unittest.TestCase):
+
+    def test_contour_bounds(self):
+        self.assertIsNone(contour_bounds([]))
+        self.assertEqual(contour_bounds([(0, 0, 'l'), (10, 20, 'l'), (5, -5, 'l')]), (0, -5, 10, 20))
+        # A closed curve from (0, 0) up to (0, 100) and back, bulging out to x = 75.
+        bounds = contour_bounds([(0, 0, 'l'), (100, 0, 'o'), (100, 100, 'o'), (0, 100, 'c')])
+        self.assertAlmostEqual(bounds[2], 75)
+        self.assertEqual((bounds[1], bounds[3]), (0, 100))
+
+if __name__ == '__main__':
+    unittest.main()
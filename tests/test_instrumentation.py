@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from support import StubLayer
+from vgpp import capabilities, instrumentation
+from vgpp.instrumentation import NULL_SPAN, LAYER_COPIES, Recorder, format_report, is_requested
+
+class SyncingStubLayer(StubLayer):
+
+    def syncTopMetrics(self):
+        pass
+
+class RecorderTest(unittest.TestCase):
+
+    def test_disabled(self):
+        recorder = Recorder()
+        self.assertIs(recorder.span('update'), NULL_SPAN)
+        with recorder.span('update'):
+            pass
+        recorder.count(LAYER_COPIES)
+        self.assertEqual(recorder.report(), {'spans': [], 'counters': {}})
+
+    def test_spans_and_counters(self):
+        recorder = Recorder(sample_size=10)
+        recorder.enabled = True
+        for _ in range(20):
+            with recorder.span('getter'):
+                pass
+        with recorder.span('update'):
+            with recorder.span('getter'):
+                pass
+        recorder.count(LAYER_COPIES, 3)
+        report = recorder.report()
+        spans = dict((span['name'], span) for span in report['spans'])
+        self.assertEqual(spans['getter']['calls'], 21)
+        self.assertEqual(spans['update']['calls'], 1)
+        self.assertEqual(len(recorder.stats['getter'].samples), 10)
+        self.assertLessEqual(spans['getter']['p95_ms'], spans['getter']['max_ms'])
+        self.assertEqual(report['counters'], {LAYER_COPIES: 3})
+        self.assertEqual(len(format_report(report)), 4)
+
+    def test_span_records_on_exception(self):
+        recorder = Recorder()
+        recorder.enabled = True
+        with self.assertRaises(KeyError):
+            with recorder.span('failing'):
+                raise KeyError('x')
+        self.assertEqual(recorder.stats['failing'].calls, 1)
+
+    def test_chrome_trace(self):
+        recorder = Recorder()
+        recorder.enabled = True
+        with recorder.span('update'):
+            pass
+        recorder.count(LAYER_COPIES)
+        directory = tempfile.mkdtemp()
+        try:
+            path = recorder.dump_trace(os.path.join(directory, 'trace.json'))
+            with io.open(path, encoding='utf-8') as f:
+                trace = json.load(f)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual([(event['name'], event['ph']) for event in trace['traceEvents']], [('update', 'X'), (LAYER_COPIES, 'C')])
+        self.assertGreaterEqual(trace['traceEvents'][0]['dur'], 0)
+
+    def test_is_requested(self):
+        self.assertTrue(is_requested(environ={'VGPP_INSTRUMENTATION': '1'}))
+        self.assertFalse(is_requested(environ={'VGPP_INSTRUMENTATION': '0'}, defaults={instrumentation.DEFAULTS_KEY: True}))
+        self.assertTrue(is_requested(environ={}, defaults={instrumentation.DEFAULTS_KEY: True}))
+        self.assertFalse(is_requested(environ={}, defaults={}))
+
+class LayerCopyCountTest(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.enable(False)
+        instrumentation.recorder.reset()
+
+    def test_copy_fallback_is_counted(self):
+        layer = SyncingStubLayer()
+        layer.setTopMetricsKeyUI_('=H')
+        capabilities._top_metrics_key_is_in_sync_by_copy(layer)
+        self.assertEqual(instrumentation.report()['counters'], {})
+        instrumentation.enable()
+        capabilities._top_metrics_key_is_in_sync_by_copy(layer)
+        self.assertEqual(instrumentation.report()['counters'], {LAYER_COPIES: 1})
+
+if __name__ == '__main__':
+    unittest.main()
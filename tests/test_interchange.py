@@ -0,0 +1,198 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from vgpp.bulk_edit import apply_vertical_properties, TOP_METRICS_KEY_UI, VERT_WIDTH_METRICS_KEY_UI, VERT_WIDTH_VALUE
+from vgpp.interchange import (
+    InterchangeError, VerticalPropertiesDiff, VerticalPropertiesReader, VerticalPropertiesWriter, LAYER_FIELDS,
+    export_vertical_properties, layer_changes, match_masters,
+)
+from vgpp.kerning_groups import TOP_KERNING_GROUP
+
+try:
+    import headless
+    plugin = headless.load_plugin()
+    from GlyphsApp import GSGlyph
+except RuntimeError:
+    headless = None
+
+def layer_values(**values):
+    return tuple(values.get(name) for name in LAYER_FIELDS)
+
+class Master(object):
+
+    def __init__(self, master_id, name):
+        self.id = master_id
+        self.name = name
+
+class FormatTest(unittest.TestCase):
+
+    def write(self, rows, masters=('Light', 'Bold'), block_size=2):
+        stream = io.StringIO()
+        writer = VerticalPropertiesWriter(stream, masters, block_size)
+        for row in rows:
+            writer.add(*row)
+        writer.close()
+        return stream.getvalue()
+
+    def test_round_trip(self):
+        rows = [
+            ('uni4E00', ('top1', None), [layer_values(topMetricsKeyUI='=uni4E01', vertWidth=1000.0), layer_values(vertOriginUI='880')]),
+            ('uni4E01', (None, 'bottom1'), [None, layer_values(vertWidthMetricsKeyUI='=uni4E00')]),
+            ('uni4E02', ('top1', 'bottom1'), [layer_values(topMetricsKeyUI='=uni4E01'), None]),
+        ]
+        reader = VerticalPropertiesReader(io.StringIO(self.write(rows)))
+        self.assertEqual(reader.masters, ['Light', 'Bold'])
+        self.assertEqual([(name, glyph_values, list(layers)) for name, glyph_values, layers in reader], rows)
+
+    def test_strings_are_written_once(self):
+        rows = [('uni{0:04X}'.format(0x4E00 + i), ('top1', 'bottom1'), [layer_values(topMetricsKeyUI='=uni4E00')]) for i in range(5)]
+        lines = self.write(rows, masters=('Regular',)).splitlines()
+        self.assertEqual(len(lines), 1 + 3)
+        blocks = [json.loads(line) for line in lines[1:]]
+        self.assertEqual([block['strings'] for block in blocks], [['top1', 'bottom1', '=uni4E00'], [], []])
+        self.assertEqual(blocks[1][TOP_KERNING_GROUP], [0, 0])
+
+    def test_unknown_and_missing_columns(self):
+        lines = self.write([('uni4E00', ('top1', None), [layer_values(topMetricsKeyUI='=uni4E01', vertWidth=950)])], masters=('Regular',)).splitlines()
+        block = json.loads(lines[1])
+        del block[TOP_METRICS_KEY_UI]
+        block['somethingNew'] = [[1]]
+        records = list(VerticalPropertiesReader(io.StringIO('\n'.join([lines[0], json.dumps(block)]))))
+        self.assertEqual(records, [('uni4E00', ('top1', None), [layer_values(vertWidth=950)])])
+
+    def test_not_a_vertical_properties_file(self):
+        with self.assertRaises(InterchangeError):
+            VerticalPropertiesReader(io.StringIO('{"format": "something-else"}\n'))
+        with self.assertRaises(InterchangeError):
+            VerticalPropertiesReader(io.StringIO(''))
+        with self.assertRaises(InterchangeError):
+            list(VerticalPropertiesReader(io.StringIO(self.write([]) + '{"glyphs": \n')))
+
+    def test_broken_values(self):
+        lines = self.write([('uni4E00', ('top1', None), [layer_values(vertWidth=950), None])], block_size=1).splitlines()
+        block = json.loads(lines[1])
+        for name, value in ((TOP_KERNING_GROUP, [5]), (TOP_KERNING_GROUP, ['top1']), (VERT_WIDTH_VALUE, [['wide'], [None]]), ('strings', [1]), ('layers', [])):
+            broken = dict(block)
+            broken[name] = value
+            with self.assertRaises(InterchangeError):
+                list(VerticalPropertiesReader(io.StringIO('\n'.join([lines[0], json.dumps(broken)]))))
+
+class MatchTest(unittest.TestCase):
+
+    def test_masters_by_name_then_by_position(self):
+        target = [Master('a', 'Light'), Master('b', 'Regular'), Master('c', 'Bold')]
+        self.assertEqual(match_masters(['Bold', 'Light'], target), ['c', 'a'])
+        self.assertEqual(match_masters(['W0', 'Regular', 'W9', 'W10'], target), ['a', 'b', 'c', None])
+        self.assertEqual(match_masters(['Regular', 'W1'], target), ['b', None])
+
+    def test_layer_changes(self):
+        target = layer_values(topMetricsKeyUI='=uni4E00', vertWidth=1000)
+        self.assertEqual(layer_changes(target, target), [])
+        self.assertEqual(layer_changes(layer_values(vertWidth=1000), target), [(TOP_METRICS_KEY_UI, None)])
+        # The width of a keyed layer follows from the key.
+        self.assertEqual(layer_changes(layer_values(vertWidthMetricsKeyUI='=uni4E01', vertWidth=900), layer_values()), [(VERT_WIDTH_METRICS_KEY_UI, '=uni4E01')])
+        # Taking the key off resets the width as well, which is then written again.
+        self.assertEqual(
+            layer_changes(layer_values(vertWidth=1000), layer_values(vertWidthMetricsKeyUI='=uni4E01', vertWidth=1000)),
+            [(VERT_WIDTH_METRICS_KEY_UI, None), (VERT_WIDTH_VALUE, 1000)])
+
+@unittest.skipIf(headless is None, 'PyObjC is loaded; the stand-in fonts cannot be used in this process.')
+class FontTest(unittest.TestCase):
+
+    def setUp(self):
+        self.source = headless.make_font(60, seed=1)
+        self.target = headless.make_font(60, seed=2)
+        glyph = self.source.glyphs[4]
+        glyph.topKerningGroup = 'top-source'
+        glyph.layers['m02'].setTopMetricsKeyUI_('=uni4E05')
+        glyph.layers['m03'].setVertWidthMetricsKeyUI_('=uni4E01')
+
+    def export(self, font):
+        stream = io.StringIO()
+        export_vertical_properties(stream, font, block_size=16)
+        return stream.getvalue()
+
+    def import_(self, text, font):
+        diff = VerticalPropertiesDiff(VerticalPropertiesReader(io.StringIO(text)), font)
+        changes = 0
+        for layers, values in diff:
+            changes += len(apply_vertical_properties(layers, values))
+        return diff, changes
+
+    def test_round_trip(self):
+        text = self.export(self.source)
+        diff, changes = self.import_(text, self.target)
+        self.assertEqual(diff.records, 60)
+        self.assertGreater(diff.changed_records, 0)
+        self.assertGreater(changes, 0)
+        self.assertEqual(self.export(self.target), text)
+        self.assertEqual(self.target.glyphs[4].topKerningGroup, 'top-source')
+        self.assertEqual(self.target.glyphs[4].layers['m02'].topMetricsKeyUI(), '=uni4E05')
+
+    def test_only_the_differences_are_applied(self):
+        text = self.export(self.source)
+        diff, changes = self.import_(text, headless.make_font(60, seed=1))
+        self.assertEqual(diff.changed_records, 1)
+        self.assertEqual(changes, 3)
+        diff, changes = self.import_(text, self.source)
+        self.assertEqual((diff.changed_records, changes), (0, 0))
+
+    def test_masters_by_name(self):
+        self.target.masters.reverse()
+        edits = list(VerticalPropertiesDiff(VerticalPropertiesReader(io.StringIO(self.export(self.source))), self.target))
+        layer_ids = set(layers[0].layerId for layers, values in edits if values.get(VERT_WIDTH_METRICS_KEY_UI) == '=uni4E01')
+        self.assertEqual(layer_ids, set(['m03']))
+
+    def test_missing_glyphs(self):
+        text = self.export(self.source)
+        diff, _ = self.import_(text, headless.make_font(40, seed=1))
+        self.assertEqual(diff.missing_glyphs, 20)
+        self.assertEqual(diff.unmatched_masters, [])
+
+    def test_groups_without_a_matching_layer(self):
+        # The file has no layer of either glyph, and the second one has no layer in the font at all.
+        self.target.glyphs.append(GSGlyph('uni9F98'))
+        stream = io.StringIO()
+        writer = VerticalPropertiesWriter(stream, ['Light'])
+        writer.add(self.target.glyphs[4].name, ('top-source', None), [None])
+        writer.add('uni9F98', ('top-source', None), [None])
+        writer.close()
+        diff, changes = self.import_(stream.getvalue(), self.target)
+        self.assertEqual(self.target.glyphs[4].topKerningGroup, 'top-source')
+        self.assertEqual((diff.changed_records, changes, diff.skipped_groups), (1, 1, 1))
+
+    def test_broken_block_leaves_the_font_alone(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'source.vertical.jsonl')
+        lines = self.export(self.source).splitlines()
+        # The third of four blocks refers to a string that doesn't exist.
+        block = json.loads(lines[3])
+        block[TOP_KERNING_GROUP][0] = 1000
+        lines[3] = json.dumps(block)
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        before = self.export(self.target)
+        with self.assertRaises(InterchangeError):
+            plugin.import_vertical_properties_to_font(self.target, path)
+        self.assertEqual(self.export(self.target), before)
+        self.assertEqual(self.target.undoManager().groups, 0)
+
+    def test_vert_origin_reset(self):
+        layer = self.target.glyphs[1].layers['m01']
+        self.source.glyphs[1].layers['m01'].setVertOrigin_(0x7fffffffffffffff)
+        self.import_(self.export(self.source), self.target)
+        self.assertEqual(layer.vertOrigin(), 0x7fffffffffffffff)
+        self.source.glyphs[1].layers['m01'].setVertOriginKeyUI_('12')
+        self.import_(self.export(self.source), self.target)
+        self.assertEqual(layer.vertOrigin(), 12.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont
+from vgpp.kerning_groups import VerticalGroupIndex, TOP_KERNING_GROUP, BOTTOM_KERNING_GROUP
+
+class VerticalGroupIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = StubFont()
+        for name, top, bottom in (('a', 'kana', 'kana'), ('b', 'kana', None), ('c', 'kanji', 'kanji'), ('d', 'latin', None)):
+            glyph = self.font.add_glyph(name)
+            glyph.topKerningGroup = top
+            glyph.bottomKerningGroup = bottom
+        self.index = VerticalGroupIndex.from_glyphs(self.font.glyphs)
+
+    def test_members_and_counts(self):
+        self.assertEqual(sorted(g.name for g in self.index.members(TOP_KERNING_GROUP, 'kana')), ['a', 'b'])
+        self.assertEqual(self.index.count(BOTTOM_KERNING_GROUP, 'kana'), 1)
+        self.assertEqual(self.index.count(BOTTOM_KERNING_GROUP, 'latin'), 0)
+        self.assertEqual(self.index.groups(TOP_KERNING_GROUP), ['kana', 'kanji', 'latin'])
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete(TOP_KERNING_GROUP, 'ka'), ['kana', 'kanji'])
+        self.assertEqual(self.index.complete(TOP_KERNING_GROUP, 'kan', limit=1), ['kana'])
+        self.assertEqual(self.index.complete(TOP_KERNING_GROUP, 'x'), [])
+
+    def test_incremental_updates(self):
+        d = self.font.glyphs['d']
+        d.topKerningGroup = 'kanji'
+        self.index.refresh_glyph(d)
+        self.assertEqual(self.index.groups(TOP_KERNING_GROUP), ['kana', 'kanji'])
+        self.assertEqual(self.index.count(TOP_KERNING_GROUP, 'kanji'), 2)
+        self.index.remove_glyph(self.font.glyphs['c'])
+        self.assertEqual(self.index.groups(BOTTOM_KERNING_GROUP), ['kana'])
+        self.assertIsNone(self.index.group_of(self.font.glyphs['c'], TOP_KERNING_GROUP))
+
+    def test_refresh_by_change_stamp(self):
+        stamps = dict((glyph.name, 0) for glyph in self.font.glyphs)
+        change_stamp = lambda glyph: stamps[glyph.name]
+        index = VerticalGroupIndex.from_glyphs(self.font.glyphs, change_stamp=change_stamp)
+        self.assertEqual(index.refresh(self.font.glyphs, change_stamp), 0)
+        # Changed behind the index's back, e.g. in Glyph Info.
+        b = self.font.glyphs['b']
+        b.topKerningGroup = 'kanji'
+        stamps['b'] += 1
+        self.assertEqual(index.refresh(self.font.glyphs, change_stamp), 1)
+        self.assertEqual(sorted(g.name for g in index.members(TOP_KERNING_GROUP, 'kanji')), ['b', 'c'])
+        index.refresh([g for g in self.font.glyphs if g.name != 'd'], change_stamp)
+        self.assertEqual(index.groups(TOP_KERNING_GROUP), ['kana', 'kanji'])
+
+if __name__ == '__main__':
+    unittest.main()
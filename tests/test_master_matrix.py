@@ -0,0 +1,122 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from test_glyphs_reader import GLYPHS2_FILE
+from vgpp.glyphs_reader import read_glyphs_file
+from vgpp.master_matrix import MasterMatrix, MISSING_KEY, NON_MONOTONIC, TOP_METRICS_KEY, format_finding, key_state, master_matrix_from_headless_font
+from vgpp.metrics_keys import TSB, BSB
+
+MASTERS = [('bold', 700), ('light', 300), ('regular', 400)]
+
+class Glyph(object):
+
+    def __init__(self, name, rows):
+        # {master id: (vertOrigin, vertWidth, TSB, BSB, (top key, bottom key, vertWidth key))}
+        self.name = name
+        self.rows = rows
+        self.stamp = 0
+
+def read_row(glyph, master_id):
+    row = glyph.rows.get(master_id)
+    return None if row is None else row[:4] + (key_state(*row[4]),)
+
+NO_KEYS = (None, None, None)
+
+def glyphs():
+    return [
+        Glyph('A', {
+            'light':   (80, 1000, 100, 100, NO_KEYS),
+            'regular': (70, 1000, 90, 90, NO_KEYS),
+            'bold':    (60, 1000, 80, 80, NO_KEYS),
+        }),
+        Glyph('B', {
+            'light':   (80, 1000, 100, 100, ('=A', None, None)),
+            'regular': (90, 1000, 100, 100, ('=A', None, None)),
+            'bold':    (60, 1000, 100, 100, (None, None, None)),
+        }),
+        Glyph('C', {
+            'light':   (80, 1000, 100, 100, ('=A', None, None)),
+            'bold':    (0x7fffffffffffffff, 1000, 100, 100, ('=A', None, None)),
+        }),
+    ]
+
+class MasterMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        self.glyphs = glyphs()
+        self.matrix = MasterMatrix(MASTERS, read_row, change_stamp=lambda glyph: glyph.stamp)
+        self.matrix.refresh(self.glyphs)
+
+    def test_values(self):
+        matrix = self.matrix
+        self.assertEqual(len(matrix), 3)
+        self.assertEqual(matrix.value('A', 'regular', 'vertOrigin'), 70)
+        self.assertEqual(matrix.row('A', TSB), [80, 100, 90])
+        self.assertEqual(matrix.row('C', 'vertOrigin'), [None, 80, None])
+        self.assertEqual(matrix.key_states('C')[2], 0)
+        self.assertTrue(matrix.key_states('B')[1] & TOP_METRICS_KEY)
+
+    def test_findings(self):
+        findings = list(self.matrix.findings())
+        self.assertEqual([(finding['kind'], finding['glyph']) for finding in findings], [(MISSING_KEY, 'B'), (NON_MONOTONIC, 'B')])
+        self.assertEqual((findings[0]['metric'], findings[0]['with'], findings[0]['without']), (TSB, ['light', 'regular'], ['bold']))
+        self.assertEqual(findings[1]['values'], [('light', 80), ('regular', 90), ('bold', 60)])
+        self.assertEqual(list(self.matrix.findings(kinds=(MISSING_KEY,)))[0]['glyph'], 'B')
+
+    def test_incremental_update(self):
+        matrix = self.matrix
+        self.assertEqual(matrix.refresh(self.glyphs), 0)
+        glyph = self.glyphs[1]
+        glyph.rows['regular'] = (70, 1000, 100, 100, NO_KEYS)
+        glyph.rows['light'] = (80, 1000, 100, 100, NO_KEYS)
+        glyph.stamp += 1
+        self.assertEqual(matrix.refresh(self.glyphs), 1)
+        self.assertEqual(list(matrix.findings()), [])
+        matrix.set_key('A', 'bold', BSB, '=B')
+        matrix.set_value('A', 'regular', TSB, 120)
+        self.assertEqual([finding['kind'] for finding in matrix.findings_of('A')], [MISSING_KEY, NON_MONOTONIC])
+        matrix.invalidate('A')
+        self.assertEqual(matrix.refresh(self.glyphs), 1)
+        self.assertEqual(matrix.findings_of('A'), [])
+
+    def test_removed_glyph(self):
+        matrix = self.matrix
+        matrix.refresh(self.glyphs[::2])
+        self.assertEqual(matrix.glyph_names, ['A', 'C'])
+        self.assertEqual(matrix.row('C', 'vertOrigin'), [None, 80, None])
+        self.assertEqual(len(matrix.values['vertOrigin']), 6)
+        self.assertEqual(list(matrix.findings()), [])
+
+    def test_format(self):
+        lines = [format_finding(finding, lambda master_id: master_id.title()) for finding in self.matrix.findings()]
+        self.assertEqual(lines, [
+            'B: TSB key only in Light, Regular, not in Bold',
+            'B: vertOrigin goes up and down across weights (Light 80, Regular 90, Bold 60)',
+        ])
+
+class HeadlessFontTest(unittest.TestCase):
+
+    def test_headless_font(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'Test.glyphs')
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(GLYPHS2_FILE)
+            font = read_glyphs_file(path)
+        finally:
+            shutil.rmtree(directory)
+        matrix = master_matrix_from_headless_font(font)
+        self.assertEqual(matrix.master_ids, ['M1', 'M2'])
+        self.assertEqual(matrix.row('H', 'vertOrigin'), [80, None])
+        self.assertEqual(matrix.row('Hdot', 'vertWidth'), [1000, None])
+        # Keys of the glyph apply to every layer.
+        self.assertEqual(list(matrix.findings()), [])
+
+if __name__ == '__main__':
+    unittest.main()
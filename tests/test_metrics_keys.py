@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import StubFont, StubLegacyLayer, StubLayer
+from vgpp.capabilities import LayerCapabilities
+from vgpp import metrics_keys
+from vgpp.metrics_keys import TSB, BSB, VERT_WIDTH, MetricsKeyError, evaluate_metrics_key, metrics_key_is_in_sync, metrics_key_references, parse_metrics_key
+
+METRICS = {
+    'H':       {TSB: 80.0, BSB: 120.0, VERT_WIDTH: 1000.0},
+    'n':       {TSB: 300.0, BSB: 60.0, VERT_WIDTH: 500.0},
+    'uni4E00': {TSB: 400.0, BSB: 410.0, VERT_WIDTH: 1000.0},
+    'a':       {TSB: 500.0, BSB: 0.0, VERT_WIDTH: 1000.0},
+    'cy':      {TSB: 20.0, BSB: 0.0, VERT_WIDTH: 1000.0},
+    'a-cy':    {TSB: 490.0, BSB: 10.0, VERT_WIDTH: 1000.0},
+    None:      {TSB: 1.0, BSB: 2.0, VERT_WIDTH: 3.0},
+}
+
+def lookup(name, metric):
+    return METRICS[name][metric] if name in METRICS else None
+
+def is_glyph_name(name):
+    return name in METRICS
+
+class MetricsKeyTest(unittest.TestCase):
+
+    def test_evaluate(self):
+        self.assertEqual(evaluate_metrics_key('=H', TSB, lookup), 80.0)
+        self.assertEqual(evaluate_metrics_key('=|n', TSB, lookup), 60.0)
+        self.assertEqual(evaluate_metrics_key('=uni4E00+20', BSB, lookup), 430.0)
+        self.assertEqual(evaluate_metrics_key('=H*0.5', VERT_WIDTH, lookup), 500.0)
+        self.assertEqual(evaluate_metrics_key('=40', TSB, lookup), 40.0)
+        self.assertEqual(evaluate_metrics_key('=(H - n) / 2', TSB, lookup), -110.0)
+        self.assertEqual(evaluate_metrics_key('=|', TSB, lookup), 2.0)
+        self.assertIsNone(evaluate_metrics_key('=missing', TSB, lookup))
+        self.assertIsNone(evaluate_metrics_key('', TSB, lookup))
+
+    def test_in_sync_with_halves(self):
+        odd = lambda name, metric: 101.0
+        # 50.5, which the host stores rounded either way.
+        for value in (50.0, 51.0):
+            self.assertTrue(metrics_key_is_in_sync('=H*0.5', TSB, value, odd))
+        self.assertFalse(metrics_key_is_in_sync('=H*0.5', TSB, 52.0, odd))
+        self.assertTrue(metrics_key_is_in_sync('=H', TSB, 80.4, lookup))
+        self.assertFalse(metrics_key_is_in_sync('=H', TSB, 81.0, lookup))
+
+    def test_references(self):
+        self.assertEqual(metrics_key_references('=|n+H*2'), [('n', True), ('H', False)])
+
+    def test_hyphenated_names(self):
+        # The longest name the font has wins; a hyphen is a minus otherwise.
+        self.assertEqual(evaluate_metrics_key('=a-cy', TSB, lookup, is_glyph_name), 490.0)
+        self.assertEqual(evaluate_metrics_key('=a-cy', TSB, lookup), 480.0)
+        self.assertEqual(evaluate_metrics_key('=a-cy-20', TSB, lookup, is_glyph_name), 470.0)
+        self.assertEqual(evaluate_metrics_key('=H-20', TSB, lookup, is_glyph_name), 60.0)
+        self.assertEqual(evaluate_metrics_key('=|a-cy', TSB, lookup, is_glyph_name), 10.0)
+        self.assertEqual(metrics_key_references('=n-a-cy', is_glyph_name), [('n', False), ('a-cy', False)])
+        self.assertEqual(metrics_key_references('=a-cy', lambda name: False), [('a', False), ('cy', False)])
+
+    def test_memo_is_bounded(self):
+        limit = metrics_keys.PARSED_KEYS_LIMIT
+        self.addCleanup(setattr, metrics_keys, 'PARSED_KEYS_LIMIT', limit)
+        metrics_keys.PARSED_KEYS_LIMIT = 10
+        for i in range(25):
+            parse_metrics_key('=H+{0}'.format(i))
+            self.assertLessEqual(len(metrics_keys._parsed_keys), 10)
+
+    def test_errors(self):
+        for key in ('H', '=H+', '=(H', '=H$'):
+            with self.assertRaises(MetricsKeyError):
+                evaluate_metrics_key(key, TSB, lookup)
+
+class LegacyInSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.font = StubFont()
+        self.font.add_glyph('H', StubLegacyLayer(TSB=80.0, BSB=120.0))
+        self.layer = StubLegacyLayer(TSB=80.0, BSB=100.0)
+        self.font.add_glyph('uni4E01', self.layer)
+        self.capabilities = LayerCapabilities.for_layer(self.layer)
+
+    def test_in_sync_without_copying(self):
+        copies = StubLayer.copies
+        self.layer.setTopMetricsKeyUI_('=H')
+        self.layer.setBottomMetricsKeyUI_('=H')
+        self.assertTrue(self.capabilities.top_metrics_key_is_in_sync(self.layer))
+        self.assertFalse(self.capabilities.bottom_metrics_key_is_in_sync(self.layer))
+        self.layer.setBottomMetricsKeyUI_('=H-20')
+        self.assertTrue(self.capabilities.bottom_metrics_key_is_in_sync(self.layer))
+        self.assertEqual(StubLayer.copies, copies)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,317 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import support
+
+try:
+    import headless
+    plugin = headless.load_plugin()
+except RuntimeError:
+    plugin = None
+
+from AppKit import NSFontFeatureSettingsAttribute, NSMultipleValuesMarker, NSNoSelectionMarker
+from GlyphsApp import Glyphs, DOCUMENTACTIVATED, file_dialog_paths
+
+class _TextView(object):
+
+    def __init__(self, string):
+        self._string = string
+
+    def string(self):
+        return self._string
+
+@unittest.skipIf(plugin is None, 'PyObjC is loaded; plugin.py cannot run against the stand-ins in this process.')
+class PaletteTest(unittest.TestCase):
+
+    def setUp(self):
+        del headless.logged_errors()[:]
+        headless.reset_app()
+        self.palette = headless.make_palette()
+        self.font = headless.make_font(100)
+        headless.open_document(self.font)
+
+    def tearDown(self):
+        self.assertEqual(headless.logged_errors(), [])
+
+    def refresh(self):
+        self.palette.update(headless.notification(self.font))
+
+    def test_nothing_selected(self):
+        self.refresh()
+        self.assertFalse(self.palette.enabled)
+        self.assertIs(self.palette.topMetricsKeyTextField.bound_values['value'], NSNoSelectionMarker)
+
+    def test_selected_layers_of_the_font_view(self):
+        headless.select_glyphs(self.font, 3, start=10)
+        layers = plugin.get_selected_layers_from_font(self.font)
+        self.assertEqual([layer.parent.name for layer in layers], ['uni4E0A', 'uni4E0B', 'uni4E0C'])
+        self.assertTrue(all(layer.layerId == 'm01' for layer in layers))
+        self.assertEqual(plugin.get_glyphs_from_layers(reversed(layers)), tuple(layer.parent for layer in layers))
+
+    def test_selected_layers_of_the_edit_view(self):
+        headless.select_glyphs(self.font, 3)
+        self.font.currentTab = object()
+        self.font.selectedLayers = [self.font.glyphs[5].layers['m02']]
+        self.assertEqual(plugin.get_selected_layers_from_font(self.font), self.font.selectedLayers)
+
+    def test_single_glyph(self):
+        headless.select_glyphs(self.font, 1, start=1)
+        self.refresh()
+        self.assertTrue(self.palette.enabled)
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E00')
+        self.assertEqual(self.palette.vertOriginTextField.bound_values['value'], self.font.glyphs[1].layers['m01'].vertOriginKeyUI())
+
+    def test_mixed_selection(self):
+        headless.select_glyphs(self.font, 10)
+        self.refresh()
+        self.assertEqual(len(self.palette.selectionTracker), 10)
+        self.assertIs(self.palette.topMetricsKeyTextField.bound_values['value'], NSMultipleValuesMarker)
+
+    def test_unchanged_selection_reuses_the_proxies(self):
+        headless.select_glyphs(self.font, 10)
+        self.refresh()
+        proxies = list(self.palette.selectionTracker.proxies)
+        self.refresh()
+        self.assertEqual([id(e) for e in self.palette.selectionTracker.proxies], [id(e) for e in proxies])
+
+    def test_proxies_are_released_after_the_swap(self):
+        headless.select_glyphs(self.font, 5)
+        self.refresh()
+        released = []
+        def release(proxy):
+            # The array controller must have let go of the proxy by now, or a binding may still read it.
+            self.assertNotIn(proxy, self.palette.selectedLayersArrayController.arrangedObjects())
+            released.append(proxy.layer)
+            plugin.release_layer_proxy(proxy)
+        self.palette.selectionTracker.release_proxy = release
+        headless.select_glyphs(self.font, 5, start=3)
+        self.refresh()
+        self.assertEqual([layer.parent.name for layer in released], ['uni4E00', 'uni4E01', 'uni4E02'])
+        self.font.selection = []
+        self.refresh()
+        self.assertEqual(len(released), 8)
+        self.assertFalse(self.palette.enabled)
+
+    def test_small_change_of_a_large_selection(self):
+        headless.select_glyphs(self.font, 40)
+        self.refresh()
+        layers_controller = self.palette.selectedLayersArrayController
+        glyphs_controller = self.palette.selectedGlyphsArrayController
+        kept = self.palette.selectionTracker.proxies[5]
+        headless.select_glyphs(self.font, 40, start=3)
+        self.refresh()
+        names = sorted(glyph.name for glyph in list(self.font.glyphs)[3:43])
+        self.assertEqual(sorted(proxy.layer.parent.name for proxy in layers_controller.selectedObjects()), names)
+        self.assertEqual(sorted(glyph.name for glyph in glyphs_controller.selectedObjects()), names)
+        self.assertEqual(sorted(glyph.name for glyph in self.palette.selectedGlyphs), names)
+        self.assertEqual(len(self.palette.selectedLayers), 40)
+        self.assertIs(self.palette.selectionTracker.proxies[2], kept)
+        # The proxies that stayed are still observed through the controller, and the new ones are too.
+        self.font.glyphs[42].layers['m01'].setTopMetricsKeyUI_('=uni4E02')
+        self.font.glyphs[8].layers['m01'].setTopMetricsKeyUI_('=uni4E02')
+        self.assertIs(self.palette.topMetricsKeyTextField.bound_values['value'], NSMultipleValuesMarker)
+        self.palette.selectionEditor.setValue_forKey_('=uni4E02', 'topMetricsKeyUI')
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E02')
+        self.assertEqual(set(self.font.glyphs[i].layers['m01'].topMetricsKeyUI() for i in range(3, 43)), set(['=uni4E02']))
+
+    def test_proxy_getters_and_setters(self):
+        headless.select_glyphs(self.font, 1, start=2)
+        self.refresh()
+        proxy = self.palette.selectionTracker.proxies[0]
+        layer = self.font.glyphs[2].layers['m01']
+        self.assertIsNone(proxy.topMetricsKeyUI)
+        proxy.topMetricsKeyUI = '=uni4E05'
+        self.assertEqual(layer.topMetricsKeyUI(), '=uni4E05')
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E05')
+        proxy.vertOriginUI = '42'
+        self.assertEqual(layer.vertOrigin(), 42.0)
+        self.assertEqual(proxy.vertOriginUI, '42')
+
+    def test_edit_applies_to_the_whole_selection(self):
+        headless.select_glyphs(self.font, 5)
+        self.refresh()
+        self.palette.selectionEditor.setValue_forKey_('=uni4E06', 'topMetricsKeyUI')
+        self.assertEqual([self.font.glyphs[i].layers['m01'].topMetricsKeyUI() for i in range(5)], ['=uni4E06'] * 5)
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E06')
+        self.assertEqual(self.font.undoManager().groups, 1)
+
+    def test_failed_edit_still_refreshes_the_palette(self):
+        headless.select_glyphs(self.font, 2)
+        self.refresh()
+        layers = [self.font.glyphs[i].layers['m01'] for i in range(2)]
+        def edits():
+            yield layers, {'topMetricsKeyUI': '=uni4E06'}
+            raise ValueError('bad edit')
+        with self.assertRaises(ValueError):
+            plugin.apply_vertical_property_edits(self.font, edits())
+        self.assertFalse(plugin.layer_change_gate.closed)
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E06')
+        self.assertEqual(self.font.undoManager().groups, 1)
+
+    def test_sync_picks_up_keys_changed_outside_the_palette(self):
+        self.assertEqual(plugin.get_metrics_key_graph(self.font, 'm01').dependents_of('uni4E02'), set())
+        # An unselected glyph, as from a script; a selected one, as from the metrics fields of Glyphs.
+        self.font.glyphs[3].layers['m01'].setTopMetricsKeyUI_('=uni4E02')
+        # Not seen until the font reports a change, which Glyphs does as the edit closes its undo group.
+        self.assertEqual(plugin.get_metrics_key_graph(self.font, 'm01').dependents_of('uni4E02'), set())
+        self.font.undoManager().endUndoGrouping()
+        headless.select_glyphs(self.font, 1, start=5)
+        self.refresh()
+        self.font.glyphs[5].layers['m01'].setBottomMetricsKeyUI_('=uni4E02')
+        self.assertEqual(plugin.metrics_key_graphs[(id(self.font), 'm01')].keys_of('uni4E05').get(plugin.BSB), '=uni4E02')
+        self.assertEqual(plugin.get_metrics_key_graph(self.font, 'm01').dependents_of('uni4E02'), set(['uni4E03', 'uni4E05']))
+        groups = self.font.undoManager().groups
+        headless.select_glyphs(self.font, 1, start=2)
+        Glyphs.font = self.font
+        self.palette.syncVerticalMetrics_(None)
+        self.assertEqual(self.font.undoManager().groups, groups + 1)
+        self.assertEqual(self.font.undoManager().action_name, 'Sync Vertical Metrics')
+
+    def test_edits_of_the_palette_keep_the_caches_up_to_date(self):
+        graph = plugin.get_metrics_key_graph(self.font, 'm01')
+        index = plugin.get_vertical_group_index(self.font)
+        layer = self.font.glyphs[4].layers['m01']
+        plugin.apply_vertical_properties_to_layers(self.font, [layer], {'topMetricsKeyUI': '=uni4E02', plugin.TOP_KERNING_GROUP: 'top-palette'})
+        # Patched as the edit went; its undo group leaves nothing to re-read.
+        self.assertFalse(plugin.needs_refresh(('metrics_key_graph', id(self.font), 'm01'), self.font))
+        self.assertFalse(plugin.needs_refresh(('vertical_group_index', id(self.font)), self.font))
+        self.assertEqual(graph.dependents_of('uni4E02'), set(['uni4E04']))
+        self.assertEqual(index.members(plugin.TOP_KERNING_GROUP, 'top-palette'), [self.font.glyphs[4]])
+        self.font.undoManager().undo()
+        self.assertTrue(plugin.needs_refresh(('metrics_key_graph', id(self.font), 'm01'), self.font))
+
+    def test_groups_changed_outside_the_palette(self):
+        headless.select_glyphs(self.font, 1, start=3)
+        self.refresh()
+        text_field = self.palette.topKerningGroupTextField
+        self.assertEqual(text_field.tool_tip_on_hover(), '1 glyphs in top3')
+        self.assertIsNone(self.palette.bottomMetricsKeyTextField.tool_tip_on_hover())
+        # Unselected glyphs, as from the Top Group column of the font view or a script.
+        self.font.glyphs[7].topKerningGroup = 'top3'
+        self.font.glyphs[8].topKerningGroup = 'topmost'
+        self.font.undoManager().endUndoGrouping()
+        self.assertEqual(text_field.tool_tip_on_hover(), '2 glyphs in top3')
+        members = plugin.select_glyphs_in_vertical_group(self.font, plugin.TOP_KERNING_GROUP, 'top3')
+        self.assertEqual([glyph.name for glyph in members], ['uni4E03', 'uni4E07'])
+        completions, _ = self.palette.control_textView_completions_forPartialWordRange_indexOfSelectedItem_(text_field, _TextView('topm'), [], None, 0)
+        self.assertEqual(completions, ['topmost'])
+
+    def test_interface_is_prepared_on_first_refresh(self):
+        text_fields = [self.palette.topMetricsKeyTextField, self.palette.vertOriginTextField, self.palette.bottomKerningGroupTextField]
+        self.assertIsNone(self.palette.selectionEditor)
+        self.assertNotIn(NSFontFeatureSettingsAttribute, text_fields[0].font().fontDescriptor().attributes)
+        self.refresh()
+        self.assertIsNotNone(self.palette.selectionEditor)
+        self.assertIn(NSFontFeatureSettingsAttribute, text_fields[0].font().fontDescriptor().attributes)
+        self.assertTrue(all(text_field.font() is text_fields[0].font() for text_field in text_fields))
+        other = headless.make_palette()
+        other.update(headless.notification(self.font))
+        self.assertIs(other.vertOriginTextField.font(), text_fields[0].font())
+
+    def test_columns_are_added_once_per_font(self):
+        table_view = self.font.fontView.listViewTableview()
+        identifiers = [column.identifier() for column in table_view.tableColumns()]
+        self.assertEqual(identifiers, ['Name', 'Left Group', 'Right Group', 'Top Group', 'Bottom Group', 'Vertical Origin', 'VerticalWidth', 'TSB', 'BSB'])
+        titles = [item.title() for item in table_view.headerView().menu().itemArray()]
+        headless.open_document(headless.make_font(10))
+        Glyphs.post(DOCUMENTACTIVATED, self.font)
+        plugin.customize_table_view_in_font(self.font)
+        self.assertEqual([column.identifier() for column in table_view.tableColumns()], identifiers)
+        self.assertEqual([item.title() for item in table_view.headerView().menu().itemArray()], titles)
+        self.assertEqual(len(Glyphs.font.fontView.listViewTableview().tableColumns()), len(identifiers))
+
+    def test_columns_follow_changes_made_outside_the_palette(self):
+        glyph = self.font.glyphs[3]
+        layer = glyph.layers['m01']
+        table_view = self.font.fontView.listViewTableview()
+        self.assertEqual(glyph.valueForKey_('vgppVertOriginString'), '')
+        self.assertEqual(glyph.valueForKey_('vgppTSB'), layer.TSB())
+        # As from the Vertical Origin field of Glyphs; the cells see it once the undo group of the edit is closed.
+        layer.setVertOrigin_(12.0)
+        redraws = table_view.redraws
+        self.font.undoManager().endUndoGrouping()
+        self.assertEqual(table_view.redraws, redraws + 1)
+        self.assertEqual(glyph.valueForKey_('vgppVertOrigin'), 12.0)
+        self.assertEqual(glyph.valueForKey_('vgppVertOriginString'), '12')
+        # Switching masters comes with an interface update.
+        self.font.selectedFontMaster = self.font.masters[1]
+        self.palette.update_interface(headless.notification(self.font))
+        self.assertEqual(glyph.valueForKey_('vgppTSB'), glyph.layers['m02'].TSB())
+        self.assertEqual(plugin.GSGlyph.keyPathsForValuesAffectingVgppVertOrigin(), set(['layer0.vertOrigin']))
+        self.assertIn('layer0.vertWidth', plugin.GSGlyph.keyPathsForValuesAffectingVgppBSB())
+        self.assertEqual(plugin.GSGlyph.keyPathsForValuesAffectingVgppBSBString(), set(['vgppBSB']))
+
+    def test_refresh_skipped_while_hidden(self):
+        window = self.palette.dialog.window()
+        window.orderOut_(None)
+        headless.select_glyphs(self.font, 1, start=1)
+        self.palette.update_interface(headless.notification(self.font))
+        headless.flush_performs()
+        self.assertFalse(self.palette.enabled)
+        window.orderFront_(None)
+        headless.flush_performs()
+        self.assertTrue(self.palette.enabled)
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E00')
+        # Collapsed, then expanded again.
+        self.palette.dialog.setFrameSize_((160.0, 0.0))
+        headless.select_glyphs(self.font, 1, start=3)
+        self.palette.update_interface(headless.notification(self.font))
+        headless.flush_performs()
+        self.assertEqual([glyph.name for glyph in self.palette.selectedGlyphs], ['uni4E01'])
+        self.palette.dialog.setFrameSize_((160.0, 200.0))
+        headless.flush_performs()
+        self.assertEqual([glyph.name for glyph in self.palette.selectedGlyphs], ['uni4E03'])
+
+    def test_refresh_leaves_the_font_view_alone(self):
+        font = headless.make_font(10)
+        headless.select_glyphs(font, 1)
+        self.palette.update(headless.notification(font))
+        self.assertTrue(self.palette.enabled)
+        self.assertEqual(len(font.fontView.listViewTableview().tableColumns()), 4)
+
+    def test_closing_forgets_the_font(self):
+        headless.select_glyphs(self.font, 3)
+        self.refresh()
+        font_id = plugin.objc.pyobjc_id(self.font)
+        self.assertIn(font_id, plugin.glyph_index_maps)
+        headless.close_document(self.font)
+        self.assertFalse(self.palette.enabled)
+        self.assertEqual(len(self.palette.selectionTracker), 0)
+        self.assertEqual(self.font.glyphs[0].layers['m01'].observationInfo(), None)
+        self.assertNotIn(font_id, plugin.glyph_index_maps)
+        self.assertNotIn(font_id, plugin.customized_fonts)
+        self.assertNotIn(font_id, plugin.font_change_observers)
+        self.assertIsNone(plugin.font_change_counter.count(self.font))
+
+    def test_export_and_import(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'source.vertical.jsonl')
+        self.font.glyphs[3].layers['m01'].setTopMetricsKeyUI_('=uni4E09')
+        # Keep the reports for the Macro panel out of the test output.
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        self.addCleanup(setattr, sys, 'stdout', stdout)
+        file_dialog_paths[:] = [path]
+        self.palette.exportVerticalProperties_(None)
+        target = headless.make_font(100, seed=7)
+        headless.open_document(target)
+        headless.select_glyphs(target, 1, start=3)
+        self.palette.update(headless.notification(target))
+        file_dialog_paths[:] = [path]
+        self.palette.importVerticalProperties_(None)
+        self.assertEqual(target.glyphs[3].layers['m01'].topMetricsKeyUI(), '=uni4E09')
+        self.assertEqual(target.undoManager().groups, 1)
+        self.assertEqual(target.undoManager().action_name, 'Import Vertical Properties')
+        self.assertEqual(self.palette.topMetricsKeyTextField.bound_values['value'], '=uni4E09')
+        diff, result = plugin.import_vertical_properties_to_font(target, path)
+        self.assertEqual((diff.records, diff.changed_records, len(result)), (100, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
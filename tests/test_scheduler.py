@@ -0,0 +1,68 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from vgpp.scheduler import CoalescingScheduler
+
+class CoalescingSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.refreshed = []
+        self.scheduled = 0
+        self.visible = True
+        def schedule():
+            self.scheduled += 1
+        self.scheduler = CoalescingScheduler(self.refreshed.append, schedule, lambda: self.visible)
+
+    def test_coalesces_bursts(self):
+        for i in range(100):
+            self.scheduler.notify(i)
+        self.assertEqual(self.scheduled, 1)
+        self.assertTrue(self.scheduler.flush())
+        self.assertFalse(self.scheduler.flush())
+        self.assertEqual(self.refreshed, [99])
+        stats = self.scheduler.stats()
+        self.assertEqual(stats['callbacks_received'], 100)
+        self.assertEqual(stats['callbacks_coalesced'], 99)
+        self.assertEqual(stats['refreshes_performed'], 1)
+
+    def test_skips_while_hidden(self):
+        self.visible = False
+        self.scheduler.notify('a')
+        self.assertEqual(self.scheduled, 0)
+        self.assertEqual(self.scheduler.stats()['callbacks_skipped'], 1)
+        self.visible = True
+        self.scheduler.notify('b')
+        self.visible = False
+        self.assertFalse(self.scheduler.flush())
+        self.assertEqual(self.refreshed, [])
+
+    def test_resumes_what_was_skipped(self):
+        self.visible = False
+        self.scheduler.notify('a')
+        self.scheduler.notify('b')
+        self.assertFalse(self.scheduler.resume())
+        self.visible = True
+        self.assertTrue(self.scheduler.resume())
+        self.assertFalse(self.scheduler.resume())
+        self.assertEqual(self.scheduled, 1)
+        self.assertTrue(self.scheduler.flush())
+        self.assertEqual(self.refreshed, ['b'])
+        # Hidden again by the time the refresh comes.
+        self.scheduler.notify('c')
+        self.visible = False
+        self.assertFalse(self.scheduler.flush())
+        self.visible = True
+        self.assertTrue(self.scheduler.resume())
+        self.assertTrue(self.scheduler.flush())
+        self.assertEqual(self.refreshed, ['b', 'c'])
+
+    def test_nothing_to_resume(self):
+        self.scheduler.notify('a')
+        self.scheduler.flush()
+        self.assertFalse(self.scheduler.resume())
+        self.assertEqual(self.scheduled, 1)
+
+if __name__ == '__main__':
+    unittest.main()
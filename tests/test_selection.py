@@ -0,0 +1,66 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import support
+from support import FakeLayer, FakeLayerProxy
+from vgpp.selection import GlyphCounter, SelectionTracker
+
+class SelectionTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.layers = [FakeLayer(str(i)) for i in range(5)]
+        self.tracker = SelectionTracker(FakeLayerProxy, FakeLayerProxy.release)
+
+    def test_reuses_proxies(self):
+        change = self.tracker.update(self.layers)
+        self.assertEqual(len(change.added), 5)
+        proxies = self.tracker.proxies
+        change = self.tracker.update(list(self.layers))
+        self.assertFalse(change.changed)
+        self.assertEqual([id(p) for p in proxies], [id(p) for p in self.tracker.proxies])
+        self.assertTrue(all(layer.observer_count == 4 for layer in self.layers))
+
+    def test_reports_only_the_difference(self):
+        self.tracker.update(self.layers[:3])
+        change = self.tracker.update(self.layers[1:4])
+        self.assertEqual([p.layer for p in change.added], [self.layers[3]])
+        self.assertEqual([p.layer for p in change.removed], [None])
+        self.assertEqual(self.layers[0].observer_count, 0)
+        self.assertEqual([p.layer for p in self.tracker.proxies], self.layers[1:4])
+
+    def test_deferred_release(self):
+        self.tracker.update(self.layers[:3])
+        change = self.tracker.update(self.layers[1:], release=False)
+        self.assertEqual([p.layer for p in change.removed], [self.layers[0]])
+        self.assertEqual(self.layers[0].observer_count, 4)
+        self.tracker.release(change.removed)
+        self.assertEqual(self.layers[0].observer_count, 0)
+
+    def test_reorder(self):
+        self.tracker.update(self.layers)
+        change = self.tracker.update(reversed(self.layers))
+        self.assertTrue(change.reordered)
+        self.assertFalse(change.added or change.removed)
+        self.assertEqual([p.layer for p in self.tracker.proxies], self.layers[::-1])
+
+    def test_duplicates_and_clear(self):
+        self.tracker.update(self.layers[:2] + self.layers[:2])
+        self.assertEqual(len(self.tracker), 2)
+        change = self.tracker.clear()
+        self.assertEqual(len(change.removed), 2)
+        self.assertTrue(all(layer.observer_count == 0 for layer in self.layers))
+
+class GlyphCounterTest(unittest.TestCase):
+
+    def test_glyphs_entering_and_leaving(self):
+        counter = GlyphCounter()
+        self.assertEqual(counter.reset(['a', 'b', 'b']), (['a', 'b'], []))
+        # A second layer of a selected glyph, and one of two layers of another glyph leaving.
+        self.assertEqual(counter.update(['a', 'c'], ['b']), (['c'], []))
+        self.assertEqual(counter.update([], ['a', 'b']), ([], ['b']))
+        self.assertEqual(counter.update(['b'], ['a']), (['b'], ['a']))
+        self.assertEqual(len(counter), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import support
+from test_glyphs_reader import GLYPHS2_FILE
+from vgpp import vertical_bounds
+from vgpp.glyphs_reader import read_glyphs_file
+from vgpp.vertical_bounds import LayerOutline, compute_vertical_bounds, format_report, outlines_from_headless_font
+
+SQUARE = [(100, 0, 'l'), (100, 700, 'l'), (500, 700, 'l'), (500, 0, 'l')]
+# Bulges down to y = -75 between the on-curve points at 0.
+BOWL = [(0, 0, 'l'), (0, -100, 'o'), (100, -100, 'o'), (100, 0, 'c')]
+
+def layers():
+    return [
+        LayerOutline('square', [SQUARE], [], 880, -120, None, None),
+        LayerOutline('centered', [SQUARE], [], 880, -120, 30, None),
+        LayerOutline('bowl', [BOWL, SQUARE], [], 880, -120, 230, 1000),
+        LayerOutline('empty', [], [], 880, -120, None, None),
+        LayerOutline('composite', [], [('square', (1, 0, 0, 1, 0, 100)), ('missing', (1, 0, 0, 1, 0, 0))], 880, -120, -70, None),
+        LayerOutline('narrow', [SQUARE], [], 880, -120, 80, 800),
+    ]
+
+class ComputeVerticalBoundsTest(unittest.TestCase):
+
+    use_numpy = False
+
+    def compute(self, **kwargs):
+        return compute_vertical_bounds(layers(), use_numpy=self.use_numpy, **kwargs)
+
+    def test_sidebearings(self):
+        result = self.compute()
+        self.assertEqual(len(result), 6)
+        row = result['square']
+        self.assertEqual((row.y_min, row.y_max, row.TSB, row.BSB), (0, 700, 180, 120))
+        self.assertEqual((row.vert_origin, row.vert_width), (None, None))
+        row = result['narrow']
+        self.assertEqual((row.TSB, row.BSB), (100, 0))
+
+    def test_curve_extrema(self):
+        row = self.compute()['bowl']
+        self.assertAlmostEqual(row.y_min, -75)
+        self.assertEqual(row.y_max, 700)
+        # 880 - (700 - 75 + 1000) / 2, rounded
+        self.assertEqual(row.suggested_vert_origin, 68)
+
+    def test_components(self):
+        row = self.compute()['composite']
+        self.assertEqual((row.y_min, row.y_max), (100, 800))
+        self.assertEqual(row.suggested_vert_origin, -70)
+
+    def test_empty_layer(self):
+        row = self.compute()['empty']
+        self.assertEqual((row.y_min, row.TSB, row.suggested_vert_origin), (None, None, None))
+
+    def test_suggestions(self):
+        result = self.compute()
+        # 880 - (700 + 0 + 1000) / 2
+        self.assertEqual(result['square'].suggested_vert_origin, 30)
+        self.assertEqual(result['centered'].suggested_vert_origin, 30)
+        self.assertEqual(result['narrow'].suggested_vert_width, 800)
+        self.assertEqual(result['narrow'].suggested_vert_origin, 130)
+        self.assertEqual([row.key for row in result.differences()], ['square', 'bowl', 'narrow'])
+        self.assertEqual([row.key for row in result.differences(tolerance=100)], ['bowl'])
+
+    def test_realistic_mix(self):
+        # Ideographs fill the em box a little unevenly, kana sit higher, the ideographic comma low; all with the
+        # default vertOrigin, except for one ideograph and one comma centered by hand.
+        rng = random.Random(3)
+        def box(y_min, y_max):
+            return [[(50, y_min, 'l'), (50, y_max, 'l'), (950, y_max, 'l'), (950, y_min, 'l')]]
+        glyphs = []
+        for i in range(200):
+            glyphs.append(('uni{0:04X}'.format(0x4E00 + i), 'kanji', box(-80 + rng.randint(-12, 12), 840 + rng.randint(-12, 12)), None))
+        for i in range(80):
+            glyphs.append(('uni{0:04X}'.format(0x3042 + i), 'kana', box(-40 + rng.randint(-8, 8), 680 + rng.randint(-8, 8)), None))
+        for i in range(4):
+            glyphs.append(('comma{0}'.format(i), 'punct', box(-80 + rng.randint(-4, 4), 100 + rng.randint(-4, 4)), None))
+        glyphs.append(('uni4FFF', 'kanji', box(-80, 840), 150))
+        glyphs.append(('comma.vert', 'punct', box(-80, 100), 370))
+        glyphs.append(('odd', 'odd', box(-40, 680), None))
+        outlines = [LayerOutline(name, contours, [], 880, -120, vert_origin, None) for name, _, contours, vert_origin in glyphs]
+        group_of = dict((name, group) for name, group, _, _ in glyphs).get
+        result = compute_vertical_bounds(outlines, use_numpy=self.use_numpy)
+        # Centering alone would flag nearly everything.
+        self.assertGreater(sum(1 for row in result.rows() if row.suggested_vert_origin != 0), 200)
+        rows = dict((row.key, row) for row in result.differences(group_of=group_of))
+        # The group of one falls back to the whole master, where the ideographs set the norm.
+        self.assertEqual(sorted(rows), ['comma.vert', 'odd', 'uni4FFF'])
+        # Back in line with their group, give or take the spread of the group.
+        self.assertAlmostEqual(rows['uni4FFF'].suggested_vert_origin, 0, delta=5)
+        self.assertAlmostEqual(rows['comma.vert'].suggested_vert_origin, 0, delta=5)
+        # Without the groups, the kana and commas stand out from the ideographs instead.
+        expected = [name for name, group, _, _ in glyphs if group in ('kana', 'punct', 'odd') and name != 'comma.vert'] + ['uni4FFF']
+        self.assertEqual(sorted(row.key for row in result.differences()), sorted(expected))
+
+    def test_without_keeping_vert_width(self):
+        row = self.compute(keep_vert_width=False)['narrow']
+        self.assertEqual((row.suggested_vert_width, row.suggested_vert_origin), (1000, 30))
+
+    def test_report(self):
+        lines = format_report(self.compute(), name_of=lambda key: key.upper())
+        self.assertEqual(lines[0], 'SQUARE: vertOrigin default -> 30, vertWidth default -> 1000 (TSB 180, BSB 120)')
+
+class HeadlessFontTest(unittest.TestCase):
+
+    def test_same_as_headless_layers(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'Test.glyphs')
+            with io.open(path, 'w', encoding='utf-8') as f:
+                f.write(GLYPHS2_FILE)
+            font = read_glyphs_file(path, with_outlines=True)
+        finally:
+            shutil.rmtree(directory)
+        result = compute_vertical_bounds(outlines_from_headless_font(font))
+        self.assertEqual(len(result), 5)
+        for glyph_name, master_id in (('H', 'M1'), ('H', 'M2'), ('Hdot', 'M1')):
+            layer = font.glyphs[glyph_name].layers[master_id]
+            row = result[(glyph_name, master_id)]
+            self.assertEqual((row.TSB, row.BSB), (layer.TSB(), layer.BSB()))
+        self.assertIsNone(result[('O', 'M2')].TSB)
+
+@unittest.skipIf(vertical_bounds.numpy is None, 'NumPy is not installed')
+class ComputeVerticalBoundsNumPyTest(ComputeVerticalBoundsTest):
+
+    use_numpy = True
+
+    def test_same_as_python(self):
+        python = compute_vertical_bounds(layers(), use_numpy=False)
+        numpy = compute_vertical_bounds(layers(), use_numpy=True)
+        for a, b in zip(python.rows(), numpy.rows()):
+            self.assertEqual(a.key, b.key)
+            for x, y in zip(a[1:], b[1:]):
+                if x is None:
+                    self.assertIsNone(y)
+                else:
+                    self.assertAlmostEqual(x, y)
+
+if __name__ == '__main__':
+    unittest.main()
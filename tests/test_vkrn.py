@@ -0,0 +1,95 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import support
+from test_glyphs_reader import GLYPHS2_FILE
+from vgpp.glyphs_reader import read_glyphs_file
+from vgpp.vkrn import FRACTIONAL_VALUE, MISSING_GROUP, REDUNDANT_EXCEPTION, UNKNOWN_GLYPH, VALUE_OVERFLOW, compile_vertical_kerning, format_report, iter_kerning_pairs
+
+GLYPHS = [
+    # name, top group, bottom group
+    ('a',   'kana',  'kana'),
+    ('b',   'kana',  'kana'),
+    ('c',   'kanji', 'kanji'),
+    ('d',   None,    'punct'),
+]
+
+class VerticalKerningCompilerTest(unittest.TestCase):
+
+    def compile(self, pairs):
+        return compile_vertical_kerning(GLYPHS, pairs)
+
+    def test_class_matrix(self):
+        table = self.compile([('@MMK_T_kana', '@MMK_B_kanji', -20), ('@MMK_T_kanji', '@MMK_B_kana', -10)])
+        self.assertEqual(table.first_class_count, 3)
+        self.assertEqual(table.second_class_count, 3)
+        self.assertEqual(table.value('a', 'c'), -20)
+        self.assertEqual(table.value('c', 'b'), -10)
+        self.assertEqual(table.value('d', 'a'), 0)
+        self.assertEqual(table.unreferenced_groups['bottomKerningGroup'], ['punct'])
+        self.assertEqual(table.referenced_groups['topKerningGroup'], ['kana', 'kanji'])
+        self.assertFalse(table.conflicts)
+        self.assertFalse(table.estimated_size()['overflows'])
+
+    def test_exceptions(self):
+        table = self.compile([('@MMK_T_kana', '@MMK_B_kanji', -20), ('a', 'c', -30), ('b', 'c', -20), ('d', '@MMK_B_kana', 5)])
+        self.assertEqual(table.value('a', 'c'), -30)
+        self.assertEqual(table.value('d', 'b'), 5)
+        self.assertNotIn(('b', 'c'), table.exceptions)
+        self.assertEqual(table.class_glyph_pairs, {})
+        self.assertEqual(table.glyph_class_pairs, {('d', 'kana'): 5})
+        self.assertEqual([c.kind for c in table.conflicts], [REDUNDANT_EXCEPTION])
+
+    def test_glyph_pairs_win_over_glyph_class_pairs(self):
+        pairs = [('a', 'b', 10), ('a', '@MMK_B_kana', 20), ('@MMK_T_kana', 'b', 30), ('@MMK_T_kana', '@MMK_B_kana', 40)]
+        for ordered in (pairs, pairs[::-1]):
+            table = self.compile(ordered)
+            self.assertEqual(table.value('a', 'b'), 10)
+            self.assertEqual(table.value('a', 'a'), 20)
+            self.assertEqual(table.value('b', 'b'), 30)
+            self.assertEqual(table.value('b', 'a'), 40)
+            self.assertEqual(len(table.exceptions), 1)
+            self.assertFalse(table.conflicts)
+
+    def test_redundant_glyph_class_pairs(self):
+        table = self.compile([('@MMK_T_kana', '@MMK_B_kana', 40), ('a', '@MMK_B_kana', 40), ('a', 'b', 40)])
+        self.assertEqual(table.glyph_class_pairs, {})
+        self.assertEqual(table.exceptions, {})
+        self.assertEqual([c.kind for c in table.conflicts], [REDUNDANT_EXCEPTION, REDUNDANT_EXCEPTION])
+
+    def test_conflicts(self):
+        table = self.compile([('@MMK_T_nothing', '@MMK_B_kana', -20), ('x', 'a', 10), ('a', 'b', 40000)])
+        self.assertEqual(sorted(c.kind for c in table.conflicts), [MISSING_GROUP, UNKNOWN_GLYPH, VALUE_OVERFLOW])
+        self.assertTrue(any(line.startswith(MISSING_GROUP) for line in format_report(table)))
+
+    def test_float_values(self):
+        table = self.compile([('@MMK_T_kana', '@MMK_B_kanji', -20.0), ('a', 'c', -30.0), ('d', '@MMK_B_kana', 5.4)])
+        self.assertEqual(table.value('a', 'c'), -30)
+        self.assertEqual(table.value('b', 'c'), -20)
+        self.assertEqual(table.value('d', 'a'), 5)
+        self.assertEqual([(c.kind, c.value) for c in table.conflicts], [(FRACTIONAL_VALUE, 5.4)])
+
+    def test_kerning_of_a_glyphs_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'Test.glyphs')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(GLYPHS2_FILE)
+        font = read_glyphs_file(path, with_kerning=True)
+        glyphs = [(glyph.name, glyph.topKerningGroup, glyph.bottomKerningGroup) for glyph in font.glyphs]
+        table = compile_vertical_kerning(glyphs, iter_kerning_pairs(font.kerningVertical['M1']))
+        self.assertEqual(table.value('H', 'H'), -20)
+        self.assertFalse(table.conflicts)
+
+    def test_iter_kerning_pairs(self):
+        ids = {'ID-A': 'a', 'ID-C': 'c'}
+        pairs = sorted(iter_kerning_pairs({'ID-A': {'ID-C': -5, '@MMK_B_kana': 3}}, ids.get))
+        self.assertEqual(pairs, [('a', '@MMK_B_kana', 3), ('a', 'c', -5)])
+
+if __name__ == '__main__':
+    unittest.main()